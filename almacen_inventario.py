@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# ================================
+# Almacén local del inventario normalizado
+# ================================
+
+# Cada versión vive en <directorio>/<hash del CSV>/ con:
+#   inventario.feather  -> inventario ya normalizado (Arrow sin compresión, se abre con mmap)
+#   celdas.npy, posiciones.npy -> arreglos del índice espacial (np.load con mmap_mode)
+#   meta.json           -> perfil de formatos, parámetros del índice y fecha de creación
+#
+# Los archivos se abren con mmap y las columnas se arman sin copiar (ver _tabla_a_dataframe):
+# varios procesos de la app que abren la misma versión comparten las mismas páginas del
+# caché del sistema, así que la memoria del host no crece con el número de procesos.
+# Un proceso cargador puede publicar una versión (publicada.txt); los procesos de la app
+# siguen ese puntero y cambian de versión cuando se reemplaza, de forma atómica.
+DIRECTORIO_ALMACEN = os.environ.get(
+    "ESPECTACULARES_ALMACEN", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".almacen_inventario")
+)
+# Subir este número cuando cambie la normalización; las versiones anteriores se ignoran
+VERSION_ALMACEN = 3
+VERSIONES_A_CONSERVAR = 3
+ARCHIVO_ULTIMA = "ultima.txt"
+ARCHIVO_PUBLICADA = "publicada.txt"
+
+def _ruta_version(hash_archivo, directorio):
+    return os.path.join(directorio, hash_archivo)
+
+def guardar_inventario(df, hash_archivo, indice_espacial=None, directorio=DIRECTORIO_ALMACEN, publicar=False):
+    """Escribe el inventario normalizado (y su índice espacial) como una versión del almacén.
+
+    Se escribe en una carpeta temporal y se renombra al final, así que una escritura
+    interrumpida nunca deja una versión a medias. Con `publicar` la versión pasa a ser
+    la que siguen los procesos de la app en modo compartido.
+    """
+    destino = _ruta_version(hash_archivo, directorio)
+    os.makedirs(directorio, exist_ok=True)
+    # Nombre único por escritura: dos sesiones (hilos) o procesos pueden guardar la misma versión a la vez
+    temporal = tempfile.mkdtemp(prefix=f"{hash_archivo}.tmp-", dir=directorio)
+    try:
+        _escribir_version(df, hash_archivo, indice_espacial, temporal)
+        _instalar_version(temporal, destino)
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+    _escribir_puntero(ARCHIVO_ULTIMA, hash_archivo, directorio)
+    if publicar:
+        publicar_version(hash_archivo, directorio)
+    _podar_versiones(directorio)
+
+def _escribir_version(df, hash_archivo, indice_espacial, temporal):
+    # NaN se queda como NaN (no como nulo de Arrow): LATITUD_DECIMAL/LONGITUD_DECIMAL tienen NaN
+    # en las coordenadas inválidas y solo las columnas sin nulos se abren sin copiar
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    for posicion, (nombre, serie) in enumerate(df.items()):
+        if isinstance(serie.dtype, np.dtype) and serie.dtype.kind == "f":
+            tabla = tabla.set_column(posicion, nombre, pa.array(serie.to_numpy(), from_pandas=False))
+    feather.write_feather(tabla, os.path.join(temporal, "inventario.feather"), compression="uncompressed")
+    meta = {
+        "version": VERSION_ALMACEN,
+        "hash": hash_archivo,
+        "filas": len(df),
+        "creado": time.time(),
+        "perfil_formatos": df.attrs.get("perfil_formatos"),
+        "indice": None,
+    }
+    if indice_espacial is not None:
+        np.save(os.path.join(temporal, "celdas.npy"), indice_espacial["celdas"])
+        np.save(os.path.join(temporal, "posiciones.npy"), indice_espacial["posiciones"])
+        meta["indice"] = {clave: indice_espacial[clave] for clave in ["tamano_celda", "filas", "columnas", "total"]}
+    with open(os.path.join(temporal, "meta.json"), "w", encoding="utf-8") as archivo:
+        json.dump(meta, archivo, ensure_ascii=False, default=lambda valor: valor.item())
+
+def _leer_meta(ruta):
+    """meta.json de una versión si es de VERSION_ALMACEN; None si falta, está dañado o es de otra"""
+    try:
+        with open(os.path.join(ruta, "meta.json"), encoding="utf-8") as archivo:
+            meta = json.load(archivo)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == VERSION_ALMACEN else None
+
+def _instalar_version(temporal, destino):
+    """Pone la carpeta temporal en `destino` sin que un lector vea una versión a medias.
+
+    La carpeta de una versión se nombra por el hash del CSV, así que si ya hay una válida
+    tiene el mismo contenido y se deja como está (los lectores nunca la ven desaparecer).
+    Una de otra VERSION_ALMACEN (los lectores ya la ignoran) se aparta con un renombrado
+    antes de instalar la nueva. Si otro escritor la instala primero, gana el suyo.
+    """
+    if _leer_meta(destino) is not None:
+        return
+    if os.path.isdir(destino):
+        apartada = tempfile.mkdtemp(prefix=f"{os.path.basename(destino)}.tmp-anterior-", dir=os.path.dirname(destino))
+        try:
+            os.replace(destino, os.path.join(apartada, "version"))
+        except OSError:
+            pass
+        shutil.rmtree(apartada, ignore_errors=True)
+    try:
+        # rename no reemplaza una carpeta con contenido: si otro escritor ya instaló la suya, falla
+        os.rename(temporal, destino)
+    except OSError:
+        if _leer_meta(destino) is None:
+            raise
+
+def _tabla_a_dataframe(tabla):
+    """DataFrame sobre los buffers de la tabla Arrow sin copiarlos.
+
+    Las columnas numéricas y booleanas sin nulos se vuelven arreglos de NumPy de solo
+    lectura que apuntan al archivo mapeado; las de texto quedan como columnas de pandas
+    respaldadas por Arrow, que también apuntan al archivo. El resto se convierte normal.
+    """
+    columnas = {}
+    for nombre, columna in zip(tabla.column_names, tabla.columns):
+        tipo = columna.type
+        if (columna.num_chunks == 1 and columna.null_count == 0
+                and (pa.types.is_integer(tipo) or pa.types.is_floating(tipo))):
+            columnas[nombre] = columna.chunk(0).to_numpy(zero_copy_only=True)
+        else:
+            columnas[nombre] = columna.to_pandas()
+    return pd.DataFrame(columnas, copy=False)
+
+def cargar_inventario(hash_archivo, directorio=DIRECTORIO_ALMACEN):
+    """Abre una versión guardada; devuelve (df, indice_espacial) o None si no existe o no sirve"""
+    ruta = _ruta_version(hash_archivo, directorio)
+    meta = _leer_meta(ruta)
+    if meta is None:
+        return None
+    try:
+        df = _tabla_a_dataframe(feather.read_table(os.path.join(ruta, "inventario.feather"), memory_map=True))
+        indice_espacial = None
+        if meta["indice"] is not None:
+            indice_espacial = dict(meta["indice"])
+            indice_espacial["celdas"] = np.load(os.path.join(ruta, "celdas.npy"), mmap_mode="r")
+            indice_espacial["posiciones"] = np.load(os.path.join(ruta, "posiciones.npy"), mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    if meta["perfil_formatos"] is not None:
+        df.attrs["perfil_formatos"] = meta["perfil_formatos"]
+    os.utime(ruta)
+    return df, indice_espacial
+
+def ultima_version(directorio=DIRECTORIO_ALMACEN):
+    """Hash de la última versión guardada, o None si el almacén está vacío"""
+    try:
+        with open(os.path.join(directorio, ARCHIVO_ULTIMA), encoding="utf-8") as archivo:
+            hash_archivo = archivo.read().strip()
+    except OSError:
+        return None
+    return hash_archivo if os.path.isdir(_ruta_version(hash_archivo, directorio)) else None
+
+def version_publicada(directorio=DIRECTORIO_ALMACEN):
+    """Hash de la versión publicada por el proceso cargador, o None si no hay"""
+    try:
+        with open(os.path.join(directorio, ARCHIVO_PUBLICADA), encoding="utf-8") as archivo:
+            hash_archivo = archivo.read().strip()
+    except OSError:
+        return None
+    return hash_archivo if os.path.isdir(_ruta_version(hash_archivo, directorio)) else None
+
+def publicar_version(hash_archivo, directorio=DIRECTORIO_ALMACEN):
+    """Hace que los procesos de la app pasen a usar una versión ya guardada"""
+    _escribir_puntero(ARCHIVO_PUBLICADA, hash_archivo, directorio)
+
+def _escribir_puntero(nombre, hash_archivo, directorio):
+    """Reemplaza el archivo puntero de una vez: quien lo lee ve la versión anterior o la nueva"""
+    descriptor, temporal = tempfile.mkstemp(prefix=f"{nombre}.tmp-", dir=directorio)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+        archivo.write(hash_archivo)
+    os.replace(temporal, os.path.join(directorio, nombre))
+
+def _podar_versiones(directorio, conservar=VERSIONES_A_CONSERVAR):
+    """Borra las versiones menos usadas recientemente más allá de `conservar` (nunca la
+    publicada). Los procesos que todavía tengan mapeada una versión borrada la siguen
+    leyendo: el sistema libera los archivos cuando se cierra el último mapeo."""
+    publicada = version_publicada(directorio)
+    versiones = [
+        os.path.join(directorio, nombre) for nombre in os.listdir(directorio)
+        if ".tmp-" not in nombre and nombre != publicada and os.path.isdir(os.path.join(directorio, nombre))
+    ]
+    versiones.sort(key=os.path.getmtime, reverse=True)
+    for ruta in versiones[conservar:]:
+        shutil.rmtree(ruta, ignore_errors=True)
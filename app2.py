@@ -1,18 +1,28 @@
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-from pptx import Presentation
-from geopy.distance import geodesic
 from datetime import datetime
-import folium
-from folium.plugins import MarkerCluster
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from copy import deepcopy
-from pptx.opc.constants import RELATIONSHIP_TYPE as RT
-import re
 import io
+import os
+from inventario import hash_contenido, leer_inventario, filtrar_candidatos
+from indice_espacial import construir_indice_espacial
+from indice_texto import construir_indice_texto, buscar_texto
+from busqueda import (procesar_busqueda_multiple_en_cache, procesar_busqueda_mejores_multiple, filas_de_consulta,
+                      CRITERIOS_ORDEN, RADIO_MAXIMO_KM)
+from cache_distancias import crear_cache_distancias
+from motor import folio_propuesta
+from almacen_inventario import guardar_inventario, cargar_inventario, ultima_version, version_publicada
+from registro_inventario import crear_registro, adquirir_inventario, liberar_inventario
+from exportacion import escribir_excel
+from plantilla_pptx import compilar_plantilla, generar_presentacion
+from historial import crear_historial, huella_consulta, crear_entrada, registrar_consulta, reemplazar_consulta, consultas_en_orden, aportes_union
+from artefactos import crear_cache_artefactos, clave_artefacto, obtener_artefacto, MAXIMO_MAPAS
+from mapa import construir_mapa, mascara_marcadores_validos, UMBRAL_MAPA_COMPACTO
+from calidad import MOTIVOS, tiene_calidad, resumen_calidad, caras_con_problemas
+from rendimiento import crear_medidor, etapa, cambiar_memoria
+from seleccion import (opciones_lugar, seleccion_de, agregar_claves, claves_dentro_de,
+                       claves_bajo_presupuesto, filas_seleccionadas, combinar_selecciones)
 
 # ================================
 # Funciones de lógica de negocio
@@ -21,26 +31,7 @@ import io
 def generar_folio(lugares_multiples=None):
     """Genera un folio único con formato NEGOCIO-FECHA"""
     try:
-        ahora = datetime.now()
-        
-        # Verificar si session_state existe y tiene nombre_negocio
-        if (hasattr(st, 'session_state') and 
-            hasattr(st.session_state, 'nombre_negocio') and 
-            st.session_state.nombre_negocio and 
-            st.session_state.nombre_negocio.strip()):
-            
-            nombre_negocio = st.session_state.nombre_negocio.strip()
-            nombre_limpio = re.sub(r'[^a-zA-Z0-9]', '', nombre_negocio)[:15] if nombre_negocio else "NEGOCIO"
-        else:
-            # Fallback al primer lugar si no hay nombre de negocio
-            if lugares_multiples and len(lugares_multiples) > 0:
-                primer_lugar = lugares_multiples[0].get("nombre", "LUGAR")
-                nombre_limpio = re.sub(r'[^a-zA-Z0-9]', '', primer_lugar)[:15] if primer_lugar else "LUGAR"
-            else:
-                nombre_limpio = "NEGOCIO"
-        
-        folio = f"{nombre_limpio}-{ahora.year}{ahora.month:02d}{ahora.day:02d}-{ahora.hour:02d}{ahora.minute:02d}"
-        return folio
+        return folio_propuesta(st.session_state.get("nombre_negocio", ""), lugares_multiples)
     except Exception as e:
         # Fallback seguro
         ahora = datetime.now()
@@ -61,241 +52,47 @@ def incrementar_folio(lugares_multiples=None):
         ahora = datetime.now()
         st.session_state.folio_actual = f"NEGOCIO-{ahora.year}{ahora.month:02d}{ahora.day:02d}-{ahora.hour:02d}{ahora.minute:02d}"
 
-def analizar_formato_coordenada(coord_str):
-    if pd.isna(coord_str) or coord_str == "" or str(coord_str).strip() == "":
-        return "vacía", None, None, None
-    coord_str = str(coord_str).strip()
-    patron_grados_dir = r'(\d+)°\s*(\d+)\'\s*(\d+\.?\d*)\"\s*([NSWE])'
-    coincidencia = re.search(patron_grados_dir, coord_str, re.IGNORECASE)
-    if coincidencia:
-        grados = float(coincidencia.group(1))
-        minutos = float(coincidencia.group(2))
-        segundos = float(coincidencia.group(3))
-        direccion = coincidencia.group(4).upper()
-        decimal = grados + minutos/60 + segundos/3600
-        if direccion in ['S', 'W']: decimal = -decimal
-        return "grados_dir", decimal, direccion, None
-    patron_grados_sig = r'([+-]?\d+\.\d+)'
-    coincidencia = re.search(patron_grados_sig, coord_str)
-    if coincidencia:
-        decimal = float(coincidencia.group(1))
-        return "grados_sig", decimal, None, None
-    patron_dms = r'([+-]?\d+)\s+(\d+)\s+(\d+\.?\d*)'
-    coincidencia = re.search(patron_dms, coord_str)
-    if coincidencia:
-        grados = float(coincidencia.group(1))
-        minutos = float(coincidencia.group(2))
-        segundos = float(coincidencia.group(3))
-        decimal = abs(grados) + minutos/60 + segundos/3600
-        if grados < 0: decimal = -decimal
-        return "dms", decimal, None, None
-    patron_dm = r'([+-]?\d+)°\s*(\d+\.\d+)'
-    coincidencia = re.search(patron_dm, coord_str)
-    if coincidencia:
-        grados = float(coincidencia.group(1))
-        minutos = float(coincidencia.group(2))
-        decimal = abs(grados) + minutos/60
-        if grados < 0: decimal = -decimal
-        return "dm", decimal, None, None
-    if "," in coord_str and "." not in coord_str:
-        try:
-            coord_europeo = coord_str.replace(",", ".")
-            decimal = float(coord_europeo)
-            return "decimal_eu", decimal, None, None
-        except ValueError:
-            pass
-    if coord_str.count(",") >= 2:
-        try:
-            coord_sin_comas = coord_str.replace(",", "")
-            decimal = float(coord_sin_comas)
-            return "decimal_miles", decimal, None, None
-        except ValueError:
-            pass
-    try:
-        decimal = float(coord_str)
-        return "decimal", decimal, None, None
-    except ValueError:
-        pass
-    return "desconocido", None, None, None
-
-def ajustar_valor_utm(valor, es_latitud=True):
-    if valor is None: return None
-    valor_abs = abs(valor)
-    if es_latitud and (-90 <= valor <= 90): return valor
-    elif not es_latitud and (-180 <= valor <= 180): return valor
-    if valor_abs > 180:
-        if valor_abs >= 1000000000: divisor = 10000000
-        elif valor_abs >= 100000000: divisor = 1000000
-        elif valor_abs >= 10000000: divisor = 100000
-        elif valor_abs >= 1000000: divisor = 10000
-        elif valor_abs >= 100000: divisor = 1000
-        else: divisor = 1000
-        valor_ajustado = valor / divisor
-        if es_latitud and (-90 <= valor_ajustado <= 90): return valor_ajustado
-        elif not es_latitud and (-180 <= valor_ajustado <= 180): return valor_ajustado
-        else: return valor / (divisor * 10)
-    return valor
-
-def estandarizar_coordenada_universal(coord_str, formato, valor_raw=None, direccion=None, es_latitud=True):
-    if pd.isna(coord_str) or coord_str == "": return None
-    coord_str = str(coord_str).strip()
-    try:
-        if formato in ["grados_dir", "grados_sig", "dms", "dm"] and valor_raw is not None:
-            valor = valor_raw
-        elif formato == "decimal_eu":
-            valor = float(coord_str.replace(",", "."))
-        elif formato == "decimal_miles":
-            valor = float(coord_str.replace(",", ""))
-        elif formato == "decimal":
-            valor = float(coord_str)
-        elif formato == "desconocido":
-            numeros = re.findall(r'[+-]?\d+\.?\d*', coord_str)
-            valor = float(numeros[0]) if numeros else None
-        else:
-            valor = None
-        if valor is None: return None
-        return ajustar_valor_utm(valor, es_latitud)
-    except (ValueError, TypeError):
-        return None
-
-def detectar_inversion_universal(lat_str, lon_str):
-    formato_lat, valor_lat, dir_lat, _ = analizar_formato_coordenada(lat_str)
-    formato_lon, valor_lon, dir_lon, _ = analizar_formato_coordenada(lon_str)
-    if valor_lat is None or valor_lon is None: return False, formato_lat, formato_lon, ["no_analizable"]
-    valor_abs_lat, valor_abs_lon = abs(valor_lat), abs(valor_lon)
-    es_patron_utm_invertido = ((valor_abs_lat > 1000000 or valor_abs_lon > 1000000) and
-                              (valor_abs_lat < 1000000000 and valor_abs_lon < 1000000000) and
-                              (valor_lat < 0 and valor_lon > 0))
-    if es_patron_utm_invertido: return True, formato_lat, formato_lon, ["patron_utm_invertido"]
-    rango_lat_absoluto, rango_lon_absoluto = (-90, 90), (-180, 180)
-    lat_en_rango_valido = rango_lat_absoluto[0] <= valor_lat <= rango_lat_absoluto[1]
-    lon_en_rango_valido = rango_lon_absoluto[0] <= valor_lon <= rango_lon_absoluto[1]
-    direcciones_invertidas = (dir_lat in ['E', 'W'] and dir_lon in ['N', 'S']) if dir_lat and dir_lon else False
-    lat_podria_ser_lon = (rango_lon_absoluto[0] <= valor_lat <= rango_lon_absoluto[1] and not lat_en_rango_valido)
-    lon_podria_ser_lat = (rango_lat_absoluto[0] <= valor_lon <= rango_lat_absoluto[1] and not lon_en_rango_valido)
-    diferencia_magnitud = abs(abs(valor_lat) - abs(valor_lon))
-    lat_mayor_que_lon = abs(valor_lat) > abs(valor_lon) + 10
-    signos_atipicos = (valor_lat < 0 and valor_lon > 0)
-    criterios = []
-    if direcciones_invertidas: criterios.append("direcciones_cardinales")
-    if not lat_en_rango_valido and not lon_en_rango_valido and lat_podria_ser_lon and lon_podria_ser_lat: criterios.append("valores_fuera_de_rango")
-    if lat_mayor_que_lon and diferencia_magnitud > 20: criterios.append("diferencia_magnitud")
-    if signos_atipicos: criterios.append("signos_atipicos")
-    probable_inversion = len(criterios) >= 2
-    return probable_inversion, formato_lat, formato_lon, criterios
-
-def duplicar_slide(prs, slide):
-    new_slide = prs.slides.add_slide(slide.slide_layout)
-    for shp in slide.shapes:
-        el = deepcopy(shp.element)
-        new_slide.shapes._spTree.insert_element_before(el, 'p:extLst')
-    for rel in slide.part.rels.values():
-        try:
-            if rel.reltype == RT.IMAGE:
-                image_part = rel.target_part
-                new_slide.part.relate_to(image_part, RT.IMAGE)
-            elif rel.reltype == RT.HYPERLINK:
-                new_slide.part.relate_to(rel.target_ref, RT.HYPERLINK)
-        except Exception as e:
-            st.error(f"⚠️ No se pudo copiar relación: {e}")
-    return new_slide
-
-def reemplazar_texto_slide(slide, fila, df_filtrado, nombre_negocio=""):
-    for shape in slide.shapes:
-        if not shape.has_text_frame:
-            continue
-        
-        for para in shape.text_frame.paragraphs:
-            for run in para.runs:
-                if nombre_negocio and "{{NOMBRE_NEGOCIO}}" in run.text:
-                    run.text = run.text.replace("{{NOMBRE_NEGOCIO}}", nombre_negocio)
-                
-                for campo in df_filtrado.columns:
-                    marcador = f"{{{{{campo.strip()}}}}}"
-                    
-                    if marcador in run.text:
-                        valor = fila.get(campo, "")
-                        
-                        if campo.strip().upper() == "LATITUD":
-                            try:
-                                run.text = run.text.replace(marcador, str(valor))
-                                run.hyperlink.address = fila.get("STREET_VIEW", "#")
-                            except Exception as e:
-                                st.warning(f"⚠️ No se pudo crear el hipervínculo para {campo}: {e}")
-                        else:
-                            run.text = run.text.replace(marcador, str(valor))
-
-def procesar_busqueda_individual(df_uploaded, lat_negocio, lon_negocio, radio_km, presupuesto_min, presupuesto_max, tipos_seleccionados, nombre_lugar=""):
-    with st.spinner(f"🔄 Analizando coordenadas para {nombre_lugar if nombre_lugar else 'el lugar'}..."):
-        df_copy = df_uploaded.copy()
-        
-        if tipos_seleccionados and "TIPO" in df_copy.columns:
-            df_copy = df_copy[df_copy["TIPO"].isin(tipos_seleccionados)]
-        
-        latitudes_decimal = []
-        longitudes_decimal = []
-        
-        for _, row in df_copy.iterrows():
-            lat_original, lon_original = row["LATITUD"], row["LONGITUD"]
-            formato_lat, valor_lat, dir_lat, _ = analizar_formato_coordenada(lat_original)
-            formato_lon, valor_lon, dir_lon, _ = analizar_formato_coordenada(lon_original)
-            invertidas, f_lat_det, f_lon_det, criterios = detectar_inversion_universal(lat_original, lon_original)
-            
-            if invertidas:
-                lat_corregida = estandarizar_coordenada_universal(lon_original, f_lon_det, valor_lon, dir_lon, True)
-                lon_corregida = estandarizar_coordenada_universal(lat_original, f_lat_det, valor_lat, dir_lat, False)
-            else:
-                lat_corregida = estandarizar_coordenada_universal(lat_original, formato_lat, valor_lat, dir_lat, True)
-                lon_corregida = estandarizar_coordenada_universal(lon_original, formato_lon, valor_lon, dir_lon, False)
-            
-            latitudes_decimal.append(lat_corregida)
-            longitudes_decimal.append(lon_corregida)
-    
-    # CORRECCIÓN: Usar listas directamente en lugar de zip
-    df_copy["LATITUD_DECIMAL"] = latitudes_decimal
-    df_copy["LONGITUD_DECIMAL"] = longitudes_decimal
-    
-    resultados = []
-    for _, row in df_copy.iterrows():
-        try:
-            lat_raw, lon_raw = row["LATITUD_DECIMAL"], row["LONGITUD_DECIMAL"]
-            
-            # VERIFICACIÓN MÁS ROBUSTA
-            if (pd.isna(lat_raw) or pd.isna(lon_raw) or 
-                not isinstance(lat_raw, (int, float)) or 
-                not isinstance(lon_raw, (int, float)) or
-                not (-90 <= lat_raw <= 90) or 
-                not (-180 <= lon_raw <= 180)): 
-                continue
-                
-            distancia = geodesic((lat_negocio, lon_negocio), (lat_raw, lon_raw)).km
-            if distancia < radio_km:
-                tarifa_val = pd.to_numeric(row["TARIFA"], errors="coerce")
-                if (presupuesto_min is not None and tarifa_val < presupuesto_min) or \
-                   (presupuesto_max is not None and tarifa_val > presupuesto_max): 
-                    continue
-                
-                maps_url = f"https://www.google.com/maps/place/{lat_raw},{lon_raw}"
-                street_view_url = f"https://www.google.com/maps/@?api=1&map_action=pano&viewpoint={lat_raw},{lon_raw}"
-
-                resultados.append({
-                    "CIUDAD": row.get("CIUDAD"), "CLAVE": row.get("CLAVE"), "DIRECCION": row.get("DIRECCION"),
-                    "VISTA": row.get("VISTA"), "TIPO": row.get("TIPO"), "BASE": row.get("BASE"),
-                    "ALTURA": row.get("ALTURA"), "AREA": row.get("AREA"), "LATITUD": lat_raw,
-                    "LONGITUD": lon_raw, "DISTANCIA_KM": round(distancia, 2),
-                    "TARIFA_PUBLICO": f"${tarifa_val:,.2f}", "IMPRESION": row.get("IMPRESION"),
-                    "INSTALACION": row.get("INSTALACION"), "COSTO": row.get("IMPRESION+INSTALACION"),
-                    "MAPS_": maps_url,
-                    "STREET_VIEW": street_view_url,
-                    "PROVEEDOR": row.get("PROVEEDOR"), "TELEFONO_PROVEEDOR": row.get("TELÉFONO PROVEEDOR"),
-                    "LUGAR_BUSQUEDA": nombre_lugar if nombre_lugar else "Principal",
-                    "LAT_NEGOCIO": lat_negocio,
-                    "LON_NEGOCIO": lon_negocio
-                })
-        except Exception as e:
-            st.warning(f"Error al procesar fila: {e}")
-    
-    return pd.DataFrame(resultados)
+@st.cache_data(show_spinner=False)
+def obtener_plantilla_compilada(ruta_plantilla, modificada):
+    """Plantilla compilada compartida entre sesiones; `modificada` invalida la caché si cambia el archivo"""
+    return compilar_plantilla(ruta_plantilla)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def calidad_inventario(inventario_hash, proveedores, _df_inventario):
+    """Resumen de calidad y caras con problemas de una versión del inventario (por proveedores)"""
+    return resumen_calidad(_df_inventario, list(proveedores)), caras_con_problemas(_df_inventario, list(proveedores), maximo=500)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def indice_texto_inventario(inventario_hash, _df_inventario):
+    """Índice de texto de una versión del inventario, compartido por todas las sesiones"""
+    return construir_indice_texto(_df_inventario)
+
+@st.cache_resource(show_spinner=False)
+def registro_inventarios():
+    """Registro de inventarios normalizados compartido por todas las sesiones del proceso"""
+    def sesion_activa(sesion):
+        return not runtime.exists() or runtime.get_instance().is_active_session(sesion)
+    return crear_registro(sesion_activa=sesion_activa)
+
+def id_sesion():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+def abrir_desde_almacen(hash_archivo):
+    """(df, índice espacial) guardados en el almacén local; ValueError si ya no están"""
+    almacenado = cargar_inventario(hash_archivo)
+    if almacenado is None:
+        raise ValueError("El inventario ya no está disponible en el almacén local. Vuelve a subir el CSV.")
+    return almacenado
+
+def inventario_sesion():
+    """(df, índice espacial) del inventario de esta sesión tomado del registro compartido,
+    o (None, None) si la sesión no tiene inventario"""
+    hash_archivo = st.session_state.inventario_hash
+    if hash_archivo is None:
+        return None, None
+    return adquirir_inventario(registro_inventarios(), hash_archivo, id_sesion(),
+                               lambda: abrir_desde_almacen(hash_archivo))
 
 # ================================
 # ESTRUCTURA DE LA APP STREAMLIT
@@ -309,8 +106,6 @@ st.write("---")
 # Inicializar st.session_state
 if 'df_filtrado' not in st.session_state:
     st.session_state.df_filtrado = pd.DataFrame()
-if 'uploaded_df' not in st.session_state:
-    st.session_state.uploaded_df = None
 if 'negocio_lat' not in st.session_state:
     st.session_state.negocio_lat = 19.4326
 if 'negocio_lon' not in st.session_state:
@@ -335,8 +130,8 @@ if 'tipos_espectaculares' not in st.session_state:
     st.session_state.tipos_espectaculares = []
 if 'tipos_seleccionados' not in st.session_state:
     st.session_state.tipos_seleccionados = []
-if 'consultas_previas' not in st.session_state:
-    st.session_state.consultas_previas = []
+if 'historial_consultas' not in st.session_state:
+    st.session_state.historial_consultas = crear_historial()
 if 'lugares_multiples' not in st.session_state:
     st.session_state.lugares_multiples = [{"nombre": "Principal", "lat": 19.4326, "lon": -99.1332}]
 if 'busqueda_combinada' not in st.session_state:
@@ -349,23 +144,168 @@ if 'selecciones_por_lugar' not in st.session_state:
     st.session_state.selecciones_por_lugar = {}
 if 'multiselect_actualizado' not in st.session_state:
     st.session_state.multiselect_actualizado = False
+if 'inventario_hash' not in st.session_state:
+    st.session_state.inventario_hash = None
+if 'sigue_publicada' not in st.session_state:
+    st.session_state.sigue_publicada = False
+if 'artefactos' not in st.session_state:
+    st.session_state.artefactos = crear_cache_artefactos()
+if 'artefactos_mapa' not in st.session_state:
+    st.session_state.artefactos_mapa = crear_cache_artefactos(MAXIMO_MAPAS)
+if 'modo_busqueda' not in st.session_state:
+    st.session_state.modo_busqueda = "radio"
+if 'mejores_n' not in st.session_state:
+    st.session_state.mejores_n = 10
+if 'criterio_orden' not in st.session_state:
+    st.session_state.criterio_orden = "distancia"
+if 'peso_distancia' not in st.session_state:
+    st.session_state.peso_distancia = 0.5
+if 'mejores_radio_max_km' not in st.session_state:
+    st.session_state.mejores_radio_max_km = RADIO_MAXIMO_KM
+if 'cache_distancias' not in st.session_state:
+    st.session_state.cache_distancias = crear_cache_distancias()
+if 'parametros_ultima_busqueda' not in st.session_state:
+    st.session_state.parametros_ultima_busqueda = None
+if 'actualizar_al_cambiar' not in st.session_state:
+    st.session_state.actualizar_al_cambiar = True
+if 'filas_busqueda' not in st.session_state:
+    st.session_state.filas_busqueda = None
+if 'medidor' not in st.session_state:
+    st.session_state.medidor = crear_medidor()
+
+# Las etapas se miden solo si está prendido en el panel de Rendimiento (o con ESPECTACULARES_RENDIMIENTO=1)
+medidor = st.session_state.medidor
 
 # 1. UPLOAD CSV
+# El inventario normalizado vive en el registro compartido del proceso; la sesión solo guarda su hash
+registro = registro_inventarios()
 uploaded_file = st.file_uploader("📂 **Paso 1: Sube tu archivo CSV de inventario**", type="csv")
 if uploaded_file:
-    st.session_state.uploaded_df = pd.read_csv(uploaded_file, sep=",")
-    st.session_state.uploaded_df.columns = st.session_state.uploaded_df.columns.str.strip()
-    st.success(f"✅ CSV cargado con **{len(st.session_state.uploaded_df)}** registros.")
-    if "TARIFA PUBLICO" not in st.session_state.uploaded_df.columns:
-        st.error("❌ No se encuentra la columna **'TARIFA PUBLICO'** en el CSV.")
-        st.session_state.uploaded_df = None
-        st.stop()
+    contenido_archivo = uploaded_file.getvalue()
+    hash_archivo = hash_contenido(contenido_archivo)
+    # Solo se vuelve a leer y normalizar cuando cambia el contenido del archivo, y solo
+    # si ninguna otra sesión lo tiene ya abierto
+    if hash_archivo != st.session_state.inventario_hash:
+        def cargar_archivo():
+            # Si esta versión ya está en el almacén local se abre sin volver a leer el CSV
+            with etapa(medidor, "abrir_almacen") as medicion:
+                almacenado = cargar_inventario(hash_archivo)
+                medicion["filas_salida"] = len(almacenado[0]) if almacenado is not None else 0
+            if almacenado is not None:
+                return almacenado
+            barra_carga = st.progress(0.0, text="🔄 Leyendo y normalizando el inventario...")
+            try:
+                with etapa(medidor, "lectura_normalizacion") as medicion:
+                    df_inventario = leer_inventario(
+                        io.BytesIO(contenido_archivo),
+                        al_avanzar=lambda fraccion, filas: barra_carga.progress(fraccion, text=f"🔄 Normalizando inventario: {filas:,} registros leídos...")
+                    )
+                    medicion["filas_salida"] = len(df_inventario)
+            finally:
+                barra_carga.empty()
+            with st.spinner("🔄 Construyendo índice espacial..."), etapa(medidor, "indice_espacial", len(df_inventario)) as medicion:
+                indice = construir_indice_espacial(df_inventario["LATITUD_DECIMAL"], df_inventario["LONGITUD_DECIMAL"],
+                                                   validos=df_inventario["COORDENADA_VALIDA"])
+                medicion["filas_salida"] = int(indice["total"])
+            try:
+                with etapa(medidor, "guardar_almacen", len(df_inventario)):
+                    guardar_inventario(df_inventario, hash_archivo, indice)
+            except Exception as e:
+                st.warning(f"⚠️ No se pudo guardar el inventario en el almacén local: {e}")
+            return df_inventario, indice
+        
+        hash_anterior = st.session_state.inventario_hash
+        try:
+            adquirir_inventario(registro, hash_archivo, id_sesion(), cargar_archivo)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            hash_archivo = None
+        if hash_anterior is not None:
+            liberar_inventario(registro, hash_anterior, id_sesion())
+        st.session_state.inventario_hash = hash_archivo
+        st.session_state.sigue_publicada = False
+        if hash_archivo is None:
+            st.stop()
+elif st.session_state.inventario_hash is None or st.session_state.sigue_publicada:
+    # Sin archivo subido: se sigue la versión publicada por el proceso cargador
+    # (publicar_inventario.py) y, si no hay, se abre la última versión guardada.
+    # Cuando se publica otra versión, el siguiente rerun ya usa la nueva.
+    hash_publicado = version_publicada()
+    hash_guardado = hash_publicado or ultima_version()
+    if hash_guardado and hash_guardado != st.session_state.inventario_hash:
+        try:
+            adquirir_inventario(registro, hash_guardado, id_sesion(), lambda: abrir_desde_almacen(hash_guardado))
+            if st.session_state.inventario_hash is not None:
+                liberar_inventario(registro, st.session_state.inventario_hash, id_sesion())
+            st.session_state.inventario_hash = hash_guardado
+        except ValueError:
+            pass
+    st.session_state.sigue_publicada = hash_publicado is not None and hash_publicado == st.session_state.inventario_hash
+
+try:
+    uploaded_df, indice_espacial = inventario_sesion()
+except ValueError as e:
+    st.error(f"❌ {e}")
+    st.session_state.inventario_hash = None
+    uploaded_df, indice_espacial = None, None
+
+if uploaded_df is not None:
+    if uploaded_file:
+        st.success(f"✅ CSV cargado con **{len(uploaded_df)}** registros.")
+    elif st.session_state.sigue_publicada:
+        st.info(f"📡 Usando el inventario publicado con **{len(uploaded_df)}** registros. "
+                "Sube un CSV para trabajar con otro.")
     else:
-        st.session_state.uploaded_df["TARIFA"] = (st.session_state.uploaded_df["TARIFA PUBLICO"].astype(str).str.replace(r"[^\d.]", "", regex=True).replace("", "0").astype(float))
+        st.info(f"📦 Se abrió el último inventario guardado con **{len(uploaded_df)}** registros. "
+                "Sube un CSV para reemplazarlo.")
+    
+    perfil_formatos = uploaded_df.attrs.get("perfil_formatos")
+    if perfil_formatos:
+        with st.expander("🧭 Formatos de coordenadas detectados"):
+            for columna, resumen in perfil_formatos.items():
+                st.write(f"**{columna}:** formato dominante `{resumen['dominante']}` · "
+                         f"{resumen['ruta_rapida']} filas por la ruta rápida · "
+                         f"{resumen['respaldo']} filas por el análisis completo")
+                st.dataframe(
+                    pd.DataFrame(list(resumen["histograma"].items()), columns=["Formato", "Filas"]),
+                    hide_index=True
+                )
     
-    if "TIPO" in st.session_state.uploaded_df.columns:
-        tipos_unicos = sorted(st.session_state.uploaded_df["TIPO"].dropna().unique().tolist())
+    # El registro de calidad se calculó al normalizar; aquí solo se resume
+    if tiene_calidad(uploaded_df):
+        with st.expander("🩺 Calidad de datos del inventario"):
+            proveedores_calidad = []
+            if "PROVEEDOR" in uploaded_df.columns:
+                proveedores_calidad = st.multiselect(
+                    "Filtrar por proveedor:", options=sorted(uploaded_df["PROVEEDOR"].dropna().unique().tolist()),
+                    placeholder="Todos los proveedores", key='calidad_proveedores'
+                )
+            resumen, (problemas, total_problemas) = calidad_inventario(
+                st.session_state.inventario_hash, tuple(proveedores_calidad), uploaded_df
+            )
+            col_cal1, col_cal2, col_cal3, col_cal4 = st.columns(4)
+            col_cal1.metric("Caras", f"{resumen['caras']:,}")
+            col_cal2.metric("Con coordenada válida", f"{resumen['validas']:,}")
+            col_cal3.metric("Latitud/longitud invertidas", f"{resumen['invertidas']:,}")
+            col_cal4.metric("Reescaladas (UTM)", f"{resumen['ajuste_utm']:,}")
+            st.write("**Por motivo:**")
+            st.dataframe(resumen["por_motivo"], hide_index=True)
+            if not resumen["por_proveedor"].empty:
+                st.write("**Por proveedor:**")
+                st.dataframe(resumen["por_proveedor"], hide_index=True)
+            st.write("**Formatos de coordenadas:**")
+            st.dataframe(resumen["por_formato"], hide_index=True)
+            if total_problemas:
+                st.write(f"**Caras inválidas, invertidas o reescaladas:** {total_problemas:,}"
+                         + (f" (se muestran las primeras {len(problemas)})" if total_problemas > len(problemas) else ""))
+                st.dataframe(problemas, hide_index=True)
+    
+    if "TIPO" in uploaded_df.columns:
+        tipos_unicos = sorted(uploaded_df["TIPO"].dropna().unique().tolist())
         st.session_state.tipos_espectaculares = tipos_unicos
+        # Si cambió el inventario (otro CSV o una nueva versión publicada) solo quedan los tipos que siguen existiendo
+        disponibles = set(tipos_unicos)
+        st.session_state.tipos_seleccionados = [tipo for tipo in st.session_state.tipos_seleccionados if tipo in disponibles]
         if not st.session_state.tipos_seleccionados:
             st.session_state.tipos_seleccionados = tipos_unicos
 
@@ -439,6 +379,38 @@ with col2:
 with col3:
     st.session_state.radio_km = st.slider("📏 Radio de búsqueda (km):", min_value=0.5, max_value=50.0, value=st.session_state.radio_km, step=0.5, key='radio_km_input')
 
+# Modo "Los N mejores": las N caras mejor ordenadas por lugar, sin adivinar un radio; la
+# distancia máxima es aparte del radio y por omisión llega al máximo (RADIO_MAXIMO_KM)
+MODOS_BUSQUEDA = {"radio": "📏 Todo dentro del radio", "mejores": "🏆 Los N mejores por lugar"}
+ETIQUETAS_CRITERIO = {"distancia": "Más cercanos", "tarifa": "Tarifa más baja", "puntaje": "Puntaje (distancia + tarifa)"}
+st.session_state.modo_busqueda = st.radio(
+    "🔎 **Modo de búsqueda:**", options=list(MODOS_BUSQUEDA), format_func=MODOS_BUSQUEDA.get,
+    index=list(MODOS_BUSQUEDA).index(st.session_state.modo_busqueda), horizontal=True, key='modo_busqueda_input'
+)
+if st.session_state.modo_busqueda == "mejores":
+    col_n, col_criterio, col_peso, col_tope = st.columns(4)
+    with col_n:
+        st.session_state.mejores_n = st.number_input(
+            "🔢 ¿Cuántos por lugar?", min_value=1, max_value=500, value=st.session_state.mejores_n, step=1, key='mejores_n_input'
+        )
+    with col_criterio:
+        st.session_state.criterio_orden = st.selectbox(
+            "📊 Ordenar por:", options=list(CRITERIOS_ORDEN), format_func=ETIQUETAS_CRITERIO.get,
+            index=list(CRITERIOS_ORDEN).index(st.session_state.criterio_orden), key='criterio_orden_input'
+        )
+    with col_peso:
+        if st.session_state.criterio_orden == "puntaje":
+            st.session_state.peso_distancia = st.slider(
+                "⚖️ Peso de la distancia", min_value=0.0, max_value=1.0, value=st.session_state.peso_distancia, step=0.05,
+                help="1 = solo distancia, 0 = solo tarifa", key='peso_distancia_input'
+            )
+    with col_tope:
+        st.session_state.mejores_radio_max_km = st.number_input(
+            "📏 Distancia máxima (km)", min_value=0.5, max_value=RADIO_MAXIMO_KM,
+            value=float(st.session_state.mejores_radio_max_km), step=0.5, key='mejores_radio_max_km_input'
+        )
+    st.caption(f"Se buscan hasta {st.session_state.mejores_radio_max_km:g} km de cada lugar y dentro del presupuesto.")
+
 # Filtro por tipos de espectaculares
 st.write("---")
 st.subheader("🎪 **Selección de Tipos de Espectaculares**")
@@ -480,65 +452,185 @@ if st.session_state.tipos_espectaculares:
     else:
         st.info("ℹ️ No hay tipos seleccionados. Se mostrarán todos los espectaculares.")
 
+# Búsqueda por texto: no usa lugares ni radio, pero sí el presupuesto y los tipos
+MAXIMO_RESULTADOS_TEXTO = 500
+if uploaded_df is not None:
+    st.write("---")
+    st.subheader("🔤 **Buscar por dirección, ciudad o clave**")
+    texto_busqueda = st.text_input(
+        "Dirección, ciudad, municipio o clave:", key='texto_busqueda',
+        placeholder="Ej. Av. Lázaro Cárdenas Durango, 15507...",
+        help="Sin importar acentos ni mayúsculas; acepta palabras incompletas y una letra de diferencia"
+    )
+    if texto_busqueda.strip():
+        # El índice se arma la primera vez que alguien busca texto en esta versión del inventario
+        with st.spinner("🔄 Preparando la búsqueda por texto..."), \
+                etapa(medidor, "indice_texto", len(uploaded_df)) as medicion:
+            indice_texto = indice_texto_inventario(st.session_state.inventario_hash, uploaded_df)
+            medicion["filas_salida"] = len(indice_texto["palabras"])
+        with etapa(medidor, "busqueda_texto", len(uploaded_df)) as medicion:
+            candidatos_texto = filtrar_candidatos(
+                uploaded_df, st.session_state.presupuesto_min, st.session_state.presupuesto_max,
+                st.session_state.tipos_seleccionados, solo_validas=False
+            )
+            posiciones_texto, _ = buscar_texto(indice_texto, texto_busqueda, candidatos_texto)
+            medicion["filas_salida"] = len(posiciones_texto)
+        if len(posiciones_texto):
+            st.success(f"✅ **{len(posiciones_texto):,}** caras coinciden dentro del presupuesto y los tipos seleccionados"
+                       + (f" (se muestran las primeras {MAXIMO_RESULTADOS_TEXTO})" if len(posiciones_texto) > MAXIMO_RESULTADOS_TEXTO else ""))
+            columnas_texto = [columna for columna in ["CLAVE", "DIRECCION", "CIUDAD", "MUNICIPIO", "VISTA", "TIPO", "TARIFA PUBLICO", "PROVEEDOR"]
+                              if columna in uploaded_df.columns]
+            resultados_texto = uploaded_df.iloc[posiciones_texto[:MAXIMO_RESULTADOS_TEXTO]][columnas_texto]
+            if tiene_calidad(uploaded_df):
+                resultados_texto["EN MAPA"] = ["✅" if valida else "❌" for valida in
+                                               uploaded_df["COORDENADA_VALIDA"].to_numpy(dtype=bool)[posiciones_texto[:MAXIMO_RESULTADOS_TEXTO]]]
+            st.dataframe(resultados_texto, hide_index=True)
+        else:
+            st.info("ℹ️ Ninguna cara coincide con ese texto dentro del presupuesto y los tipos seleccionados.")
+
 # 3. FILTRADO Y GENERACIÓN DE RESULTADOS
-if st.button("🚀 **Iniciar Búsqueda Múltiple**") and st.session_state.uploaded_df is not None:
-    if len(st.session_state.lugares_multiples) == 0:
-        st.warning("⚠️ Por favor, agrega al menos un lugar para buscar.")
-    else:
-        todos_resultados = []
-        resultados_por_lugar = {}
+def parametros_busqueda():
+    """Lo que define una búsqueda; con los mismos lugares e inventario, cambiar solo los
+    filtros (radio, presupuesto, tipos) se resuelve con la caché de distancias"""
+    return {
+        "inventario_hash": st.session_state.inventario_hash,
+        "modo": st.session_state.modo_busqueda,
+        "lugares": [(lugar["nombre"], lugar["lat"], lugar["lon"]) for lugar in st.session_state.lugares_multiples],
+        "filtros": (st.session_state.radio_km, st.session_state.presupuesto_min, st.session_state.presupuesto_max,
+                    tuple(st.session_state.tipos_seleccionados or []), st.session_state.mejores_n,
+                    st.session_state.criterio_orden, st.session_state.peso_distancia,
+                    st.session_state.mejores_radio_max_km),
+    }
+
+def ejecutar_busqueda(uploaded_df, indice_espacial, conservar_seleccion=False):
+    """Busca con los criterios actuales y guarda los resultados en la sesión. Con
+    `conservar_seleccion` (filtros cambiados sobre la misma búsqueda) se conservan las
+    caras seleccionadas que siguen en los resultados"""
+    avisos_busqueda = []
+    buscar_mejores = st.session_state.modo_busqueda == "mejores"
+    modo_consulta = None
+    st.session_state.parametros_ultima_busqueda = parametros_busqueda()
+    with st.spinner(f"🔍 Buscando espectaculares cerca de {len(st.session_state.lugares_multiples)} lugares..."), \
+            etapa(medidor, "busqueda_multiple", len(uploaded_df)) as medicion:
+        if buscar_mejores:
+            modo_consulta = ("mejores", int(st.session_state.mejores_n), st.session_state.criterio_orden,
+                             float(st.session_state.peso_distancia), float(st.session_state.mejores_radio_max_km))
+            busqueda_combinada, resultados_por_lugar, referencias = procesar_busqueda_mejores_multiple(
+                uploaded_df,
+                st.session_state.lugares_multiples,
+                int(st.session_state.mejores_n),
+                st.session_state.presupuesto_min,
+                st.session_state.presupuesto_max,
+                st.session_state.tipos_seleccionados,
+                indice_espacial,
+                st.session_state.criterio_orden,
+                st.session_state.peso_distancia,
+                st.session_state.mejores_radio_max_km,
+                avisos_busqueda,
+                medidor
+            )
+        else:
+            # Las distancias de cada lugar se calculan una vez; otro radio, presupuesto o
+            # tipos solo cortan y filtran lo que ya está en la caché
+            busqueda_combinada, resultados_por_lugar, referencias = procesar_busqueda_multiple_en_cache(
+                uploaded_df,
+                st.session_state.lugares_multiples,
+                st.session_state.radio_km,
+                st.session_state.presupuesto_min,
+                st.session_state.presupuesto_max,
+                st.session_state.tipos_seleccionados,
+                st.session_state.cache_distancias,
+                st.session_state.inventario_hash,
+                indice_espacial,
+                avisos_busqueda,
+                medidor
+            )
+        medicion["filas_salida"] = len(busqueda_combinada)
+    for aviso in avisos_busqueda:
+        st.warning(aviso)
+    
+    for lugar in st.session_state.lugares_multiples:
+        if lugar["nombre"] not in resultados_por_lugar:
+            st.warning(f"⚠️ **{lugar['nombre']}**: No se encontraron espectaculares")
+    
+    if not busqueda_combinada.empty:
+        st.session_state.busqueda_combinada = busqueda_combinada
         
-        for lugar in st.session_state.lugares_multiples:
-            with st.spinner(f"🔍 Buscando espectaculares cerca de: {lugar['nombre']}..."):
-                df_resultado = procesar_busqueda_individual(
-                    st.session_state.uploaded_df,
-                    lugar["lat"],
-                    lugar["lon"],
-                    st.session_state.radio_km,
-                    st.session_state.presupuesto_min,
-                    st.session_state.presupuesto_max,
-                    st.session_state.tipos_seleccionados,
-                    lugar["nombre"]
-                )
-            
-            if not df_resultado.empty:
-                todos_resultados.append(df_resultado)
-                resultados_por_lugar[lugar["nombre"]] = df_resultado  # ← AGREGAR ESTO
-            else:
-                st.warning(f"⚠️ **{lugar['nombre']}**: No se encontraron espectaculares")
+        st.session_state.df_filtrado = st.session_state.busqueda_combinada
+        st.session_state.busqueda_realizada = True
+        st.session_state.df_por_lugar = resultados_por_lugar  # ← GUARDAR RESULTADOS POR LUGAR
+        # Posiciones de los resultados en el inventario, para leer su registro de calidad
+        st.session_state.filas_busqueda = (st.session_state.inventario_hash, referencias["filas"])
         
-        if todos_resultados:
-            st.session_state.busqueda_combinada = pd.concat(todos_resultados, ignore_index=True)
-            st.session_state.busqueda_combinada = st.session_state.busqueda_combinada.drop_duplicates(subset=['CLAVE'])
-            
-            st.session_state.df_filtrado = st.session_state.busqueda_combinada
-            st.session_state.busqueda_realizada = True
-            st.session_state.df_por_lugar = resultados_por_lugar  # ← GUARDAR RESULTADOS POR LUGAR
-            
+        # Un refiltrado es la misma búsqueda: conserva su folio
+        if not conservar_seleccion:
             st.session_state.folio_actual = generar_folio()  
 
-            # REINICIAR LAS SELECCIONES AL HACER NUEVA BÚSQUEDA
-            st.session_state.espectaculares_seleccionados = []
-            st.session_state.indices_seleccionados = []
+        # REINICIAR LAS SELECCIONES AL HACER NUEVA BÚSQUEDA (o quitar las que ya no aparecen)
+        if conservar_seleccion:
+            st.session_state.selecciones_por_lugar = {
+                lugar: seleccion & set(resultados_por_lugar[lugar]["CLAVE"].astype(str))
+                for lugar, seleccion in st.session_state.selecciones_por_lugar.items() if lugar in resultados_por_lugar
+            }
+        else:
             st.session_state.selecciones_por_lugar = {}
-            st.session_state.multiselect_actualizado = True
-            
-            consulta_actual = {
+        st.session_state.espectaculares_seleccionados = []
+        st.session_state.indices_seleccionados = []
+        st.session_state.multiselect_actualizado = True
+        for clave_widget in [k for k in st.session_state if str(k).startswith("seleccion_lugar_")]:
+            del st.session_state[clave_widget]
+        
+        # El historial guarda posiciones en el inventario, no una copia de los resultados
+        consulta_actual = crear_entrada(
+            {
                 "nombre_negocio": st.session_state.nombre_negocio,
                 "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "resultados": len(st.session_state.busqueda_combinada),
-                "df_filtrado": st.session_state.busqueda_combinada.copy(),
-                "tipo": "múltiple",
+                "tipo": f"{st.session_state.mejores_n} mejores por lugar ({ETIQUETAS_CRITERIO[st.session_state.criterio_orden].lower()})" if buscar_mejores else "múltiple",
                 "lugares": [lugar["nombre"] for lugar in st.session_state.lugares_multiples],
+                "lugares_busqueda": [dict(lugar) for lugar in st.session_state.lugares_multiples],
+                "inventario_hash": st.session_state.inventario_hash,
                 "tipos_seleccionados": st.session_state.tipos_seleccionados.copy() if st.session_state.tipos_seleccionados else []
-            }
-            st.session_state.consultas_previas.append(consulta_actual)
-            
-            st.success(f"🎉 **Búsqueda múltiple completada!** Se encontraron **{len(st.session_state.busqueda_combinada)}** espectaculares únicos cerca de {len(st.session_state.lugares_multiples)} lugares.")
+            },
+            busqueda_combinada["CLAVE"], referencias["filas"], busqueda_combinada["DISTANCIA_KM"],
+            referencias["lugar"], busqueda_combinada["LUGARES_EN_RADIO"]
+        )
+        huella_anterior = st.session_state.get("huella_consulta_actual")
+        st.session_state.huella_consulta_actual = huella_consulta(
+            st.session_state.inventario_hash, st.session_state.lugares_multiples, st.session_state.radio_km,
+            st.session_state.presupuesto_min, st.session_state.presupuesto_max, st.session_state.tipos_seleccionados,
+            modo_consulta
+        )
+        if conservar_seleccion and huella_anterior is not None:
+            # El refiltrado ocupa el lugar de la búsqueda que refina, no uno nuevo del historial
+            reemplazar_consulta(st.session_state.historial_consultas, huella_anterior,
+                                st.session_state.huella_consulta_actual, consulta_actual)
         else:
-            st.warning("⚠️ No se encontraron espectaculares en ninguno de los lugares especificados.")
-            st.session_state.df_filtrado = pd.DataFrame()
-            st.session_state.busqueda_realizada = False
+            registrar_consulta(st.session_state.historial_consultas, st.session_state.huella_consulta_actual, consulta_actual)
+        
+        st.success(f"🎉 **Búsqueda múltiple completada!** Se encontraron **{len(st.session_state.busqueda_combinada)}** espectaculares únicos cerca de {len(st.session_state.lugares_multiples)} lugares.")
+    else:
+        st.warning("⚠️ No se encontraron espectaculares en ninguno de los lugares especificados.")
+        st.session_state.df_filtrado = pd.DataFrame()
+        st.session_state.busqueda_realizada = False
+
+iniciar_busqueda = st.button("🚀 **Iniciar Búsqueda Múltiple**")
+st.session_state.actualizar_al_cambiar = st.checkbox(
+    "⚡ Actualizar los resultados al cambiar radio, presupuesto o tipos",
+    value=st.session_state.actualizar_al_cambiar, key='actualizar_al_cambiar_input',
+    help="Después de una búsqueda por radio, los cambios de filtros se aplican sin volver a calcular distancias"
+)
+ultima_busqueda = st.session_state.parametros_ultima_busqueda
+actual = parametros_busqueda()
+if iniciar_busqueda and uploaded_df is not None:
+    if len(st.session_state.lugares_multiples) == 0:
+        st.warning("⚠️ Por favor, agrega al menos un lugar para buscar.")
+    else:
+        ejecutar_busqueda(uploaded_df, indice_espacial)
+elif (st.session_state.actualizar_al_cambiar and uploaded_df is not None and ultima_busqueda is not None
+      and actual["modo"] == "radio" and ultima_busqueda["modo"] == "radio" and actual["lugares"]
+      and actual["inventario_hash"] == ultima_busqueda["inventario_hash"]
+      and actual["lugares"] == ultima_busqueda["lugares"] and actual["filtros"] != ultima_busqueda["filtros"]):
+    ejecutar_busqueda(uploaded_df, indice_espacial, conservar_seleccion=True)
 
 # 4. VISUALIZACIÓN Y DESCARGAS
 if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizada:
@@ -553,22 +645,20 @@ if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizad
     st.write("---")
     st.subheader("🔍 Diagnóstico de Datos para el Mapa")
     
-    # Contar coordenadas válidas
-    coordenadas_validas = 0
-    coordenadas_invalidas = []
-    
-    for i, r in df_filtrado.iterrows():
-        lat = r["LATITUD"]
-        lon = r["LONGITUD"]
-        
-        if (pd.isna(lat) or pd.isna(lon) or 
-            not isinstance(lat, (int, float)) or 
-            not isinstance(lon, (int, float)) or
-            not (-90 <= lat <= 90) or 
-            not (-180 <= lon <= 180)):
-            coordenadas_invalidas.append((i, r['CLAVE'], lat, lon))
+    # La validez de cada resultado se lee del registro de calidad del inventario; si los
+    # resultados son de otro inventario (se publicó una versión nueva) se revisan las columnas
+    with etapa(medidor, "diagnostico", len(df_filtrado)) as medicion:
+        hash_busqueda, filas_busqueda = st.session_state.filas_busqueda or (None, None)
+        registro_resultados = None
+        if (uploaded_df is not None and hash_busqueda == st.session_state.inventario_hash
+                and filas_busqueda is not None and len(filas_busqueda) == len(df_filtrado) and tiene_calidad(uploaded_df)):
+            registro_resultados = uploaded_df.iloc[filas_busqueda]
+            validas_mapa = registro_resultados["COORDENADA_VALIDA"].to_numpy(dtype=bool)
         else:
-            coordenadas_validas += 1
+            validas_mapa = mascara_marcadores_validos(df_filtrado)
+        coordenadas_validas = int(validas_mapa.sum())
+        medicion["filas_salida"] = coordenadas_validas
+    coordenadas_invalidas = len(df_filtrado) - coordenadas_validas
     
     col_diag1, col_diag2 = st.columns(2)
     
@@ -577,141 +667,78 @@ if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizad
     
     with col_diag2:
         if coordenadas_invalidas:
-            st.error(f"❌ **Coordenadas inválidas:** {len(coordenadas_invalidas)}")
+            st.error(f"❌ **Coordenadas inválidas:** {coordenadas_invalidas}")
+    
+    if registro_resultados is not None:
+        invertidas = int(registro_resultados["INVERTIDA"].sum())
+        reescaladas = int(registro_resultados["AJUSTE_UTM"].sum())
+        if invertidas or reescaladas:
+            st.info(f"ℹ️ En el inventario, {invertidas} de estos resultados traían latitud y longitud invertidas "
+                    f"y {reescaladas} se reescalaron desde un formato tipo UTM; conviene revisar su ubicación.")
     
     if coordenadas_invalidas:
         with st.expander("📋 Ver coordenadas problemáticas"):
-            for idx, clave, lat, lon in coordenadas_invalidas[:10]:  # Mostrar solo las primeras 10
-                st.write(f"**Fila {idx}:** {clave} - Lat: `{lat}`, Lon: `{lon}`")
-            if len(coordenadas_invalidas) > 10:
-                st.info(f"... y {len(coordenadas_invalidas) - 10} más")
+            problematicas = df_filtrado[~validas_mapa][["CLAVE", "LATITUD", "LONGITUD"]].head(10)
+            if registro_resultados is not None:
+                problematicas["MOTIVO"] = [MOTIVOS.get(motivo, motivo) for motivo in registro_resultados["MOTIVO_COORDENADA"][~validas_mapa].head(10)]
+            st.dataframe(problematicas, hide_index=True)
+            if coordenadas_invalidas > 10:
+                st.info(f"... y {coordenadas_invalidas - 10} más")
     
     st.subheader("🗺️ Mapa de Espectaculares (Todos los Lugares)")
     
-    # Calcular centro del mapa de manera más robusta
-    latitudes_validas = df_filtrado["LATITUD"].dropna()
-    longitudes_validas = df_filtrado["LONGITUD"].dropna()
-    
-    if len(latitudes_validas) > 0 and len(longitudes_validas) > 0:
-        centro_lat = latitudes_validas.mean()
-        centro_lon = longitudes_validas.mean()
-    else:
-        centro_lat = 19.4326
-        centro_lon = -99.1332
-    
-    mapa = folium.Map(location=[centro_lat, centro_lon], zoom_start=12)
-    
-    colores_lugares = ["red", "blue", "green", "purple", "orange", "darkred", "lightred", "beige", "darkblue", "darkgreen"]
-    
-    # Contadores para debugging
-    marcadores_agregados = 0
-    marcadores_fallados = 0
-    
-    # Primero agregar los lugares de búsqueda
-    for i, lugar in enumerate(st.session_state.lugares_multiples):
-        color = colores_lugares[i % len(colores_lugares)]
-        folium.Marker(
-            location=[lugar["lat"], lugar["lon"]], 
-            popup=folium.Popup(f"<b>📍 {lugar['nombre']}</b>", max_width=300), 
-            icon=folium.Icon(color=color, icon="star")
-        ).add_to(mapa)
-        folium.Circle(
-            location=[lugar["lat"], lugar["lon"]], 
-            radius=st.session_state.radio_km * 1000, 
-            color=color, 
-            fill=True, 
-            fill_opacity=0.1,
-            popup=f"Radio de búsqueda: {st.session_state.radio_km} km"
-        ).add_to(mapa)
-    
-    # Configurar MarkerCluster con parámetros optimizados
-    cluster = MarkerCluster(
-        name="Espectaculares",
-        options={
-            'maxClusterRadius': 50,  # Radio máximo para clustering
-            'disableClusteringAtZoom': 18,  # Desactivar clustering en zoom alto
-            'showCoverageOnHover': True,
-            'zoomToBoundsOnClick': True
-        }
-    ).add_to(mapa)
-    
-    # Agregar marcadores individualmente con mejor manejo de errores
-    for i, r in df_filtrado.iterrows():
-        try:
-            # Validación exhaustiva de coordenadas
-            lat = r["LATITUD"]
-            lon = r["LONGITUD"]
-            
-            if (pd.isna(lat) or pd.isna(lon) or 
-                not isinstance(lat, (int, float)) or 
-                not isinstance(lon, (int, float)) or
-                not (-90 <= lat <= 90) or 
-                not (-180 <= lon <= 180)):
-                marcadores_fallados += 1
-                continue
-            
-            lugar_busqueda = r.get("LUGAR_BUSQUEDA", "Principal")
-            color_index = next((idx for idx, lugar in enumerate(st.session_state.lugares_multiples) 
-                              if lugar["nombre"] == lugar_busqueda), 0)
-            color_marker = colores_lugares[color_index % len(colores_lugares)]
-            
-            # Crear contenido del popup más informativo
-            popup_html = f"""
-            <div style="min-width: 250px;">
-                <h4 style="margin: 0; color: #333;">{r['CLAVE']}</h4>
-                <hr style="margin: 5px 0;">
-                <p style="margin: 2px 0;"><b>Distancia:</b> {r['DISTANCIA_KM']:.2f} km</p>
-                <p style="margin: 2px 0;"><b>Tarifa:</b> {r['TARIFA_PUBLICO']}</p>
-                <p style="margin: 2px 0;"><b>Lugar:</b> {lugar_busqueda}</p>
-                <p style="margin: 2px 0;"><b>Tipo:</b> {r.get('TIPO', 'N/A')}</p>
-                <p style="margin: 2px 0;"><b>Dirección:</b> {r.get('DIRECCION', 'N/A')}</p>
-                <div style="margin-top: 8px;">
-                    <a href='{r['MAPS_']}' target='_blank' style='color: blue; text-decoration: none;'>📍 Google Maps</a><br>
-                    <a href='{r['STREET_VIEW']}' target='_blank' style='color: green; text-decoration: none;'>🌐 Street View</a>
-                </div>
-            </div>
-            """
-            
-            folium.Marker(
-                location=[lat, lon],
-                popup=folium.Popup(popup_html, max_width=300),
-                icon=folium.Icon(color=color_marker, icon="info-sign"),
-                tooltip=f"{r['CLAVE']} - {r['TARIFA_PUBLICO']}"
-            ).add_to(cluster)
-            
-            marcadores_agregados += 1
-            
-        except Exception as e:
-            marcadores_fallados += 1
-            # Mostrar errores específicos en modo debug
-            # st.warning(f"Error en marcador {i}: {e}")
-    
-    # Agregar control de capas
-    folium.LayerControl().add_to(mapa)
+    # Con muchos resultados los puntos viajan como un solo arreglo y los popups se arman en el navegador.
+    # El HTML se guarda en la caché de mapas de la sesión (aparte de las descargas) y solo se vuelve
+    # a generar si cambian resultados o lugares.
+    modo_mapa = "compacto" if len(df_filtrado) >= UMBRAL_MAPA_COMPACTO else "detallado"
+    clave_mapa = clave_artefacto("mapa", df_filtrado, st.session_state.lugares_multiples, st.session_state.radio_km, modo_mapa)
+    def construir_mapa_medido():
+        with etapa(medidor, "mapa", len(df_filtrado)) as medicion:
+            mapa_construido = construir_mapa(df_filtrado, st.session_state.lugares_multiples, st.session_state.radio_km, modo_mapa,
+                                             validas_mapa)
+            medicion["filas_salida"] = mapa_construido[1]
+        return mapa_construido
+    
+    html_mapa, marcadores_agregados, marcadores_fallados = obtener_artefacto(
+        st.session_state.artefactos_mapa, clave_mapa, construir_mapa_medido
+    )
     
     # Mostrar estadísticas de marcadores
     st.info(f"**Estadísticas del mapa:** {marcadores_agregados} marcadores mostrados de {len(df_filtrado)} resultados totales")
     if marcadores_fallados > 0:
         st.warning(f"⚠️ {marcadores_fallados} marcadores no se pudieron mostrar debido a coordenadas inválidas o errores.")
     
-    st.components.v1.html(folium.Figure().add_child(mapa).render(), height=500)
+    st.components.v1.html(html_mapa, height=500)
 
-    # 5. SELECCIÓN DE ESPECTACULARES - SOLUCIÓN DEFINITIVA
+    # 5. SELECCIÓN DE ESPECTACULARES
     st.write("---")
     st.subheader("🎯 Selección de Espectaculares por Lugar")
     st.write("Selecciona los espectaculares que deseas incluir en las descargas.")
     
-    # Función para manejar cambios en multiselect
-    def actualizar_seleccion(lugar_nombre, nueva_seleccion):
-        st.session_state.selecciones_por_lugar[lugar_nombre] = nueva_seleccion
-        st.session_state.multiselect_actualizado = True
-    
-    # VERIFICACIÓN CORREGIDA: Usar st.session_state.df_por_lugar
-    if st.session_state.df_por_lugar and len(st.session_state.df_por_lugar) > 0:
-        tabs = st.tabs([f"📍 {lugar}" for lugar in st.session_state.df_por_lugar.keys()])
+    # La selección vive en selecciones_por_lugar como {lugar: set(CLAVE)}; el multiselect de cada
+    # pestaña solo la refleja. Los callbacks corren antes del rerun, así que no hace falta st.rerun().
+    def sincronizar_seleccion(lugar_nombre, clave_widget):
+        st.session_state.selecciones_por_lugar[lugar_nombre] = set(st.session_state[clave_widget])
+    
+    def seleccionar_en_bloque(lugar_nombre, clave_widget, opciones, calcular_claves, df_lugar, limite):
+        agregar_claves(st.session_state.selecciones_por_lugar, lugar_nombre, calcular_claves(df_lugar, limite))
+        seleccion = st.session_state.selecciones_por_lugar[lugar_nombre]
+        st.session_state[clave_widget] = [clave for clave in opciones if clave in seleccion]
+    
+    def limpiar_seleccion(lugar_nombre, clave_widget):
+        st.session_state.selecciones_por_lugar[lugar_nombre] = set()
+        st.session_state[clave_widget] = []
+    
+    # Fragmento: al cambiar la selección solo se vuelve a ejecutar esta parte
+    # (no el diagnóstico ni el mapa); los archivos se siguen generando hasta que se descargan
+    @st.fragment
+    def seccion_seleccion_y_descargas():
+        if not st.session_state.df_por_lugar:
+            st.info("ℹ️ No hay resultados separados por lugar para mostrar.")
+            return
         
-        todas_selecciones = []
-        df_seleccionados_combinado = pd.DataFrame()
+        selecciones = st.session_state.selecciones_por_lugar
+        tabs = st.tabs([f"📍 {lugar}" for lugar in st.session_state.df_por_lugar.keys()])
         
         for i, (lugar_nombre, df_lugar) in enumerate(st.session_state.df_por_lugar.items()):
             with tabs[i]:
@@ -721,52 +748,61 @@ if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizad
                     st.info(f"ℹ️ No se encontraron espectaculares cerca de {lugar_nombre}")
                     continue
                 
-                # Inicializar selección para este lugar si no existe
-                if lugar_nombre not in st.session_state.selecciones_por_lugar:
-                    st.session_state.selecciones_por_lugar[lugar_nombre] = []
+                opciones, etiquetas = opciones_lugar(df_lugar)
+                seleccion = seleccion_de(selecciones, lugar_nombre)
+                clave_widget = f"seleccion_lugar_{lugar_nombre}_{i}"
+                if clave_widget not in st.session_state:
+                    st.session_state[clave_widget] = [clave for clave in opciones if clave in seleccion]
                 
-                # Crear opciones con índices únicos
-                opciones_lugar = [
-                    f"{idx}. {row['CLAVE']} - {row['TARIFA_PUBLICO']} - {row['DISTANCIA_KM']} km - {row['TIPO']}" 
-                    for idx, (_, row) in enumerate(df_lugar.iterrows())
-                ]
+                # Acciones en bloque: se suman a lo que ya está seleccionado
+                col_km, col_tarifa, col_limpiar = st.columns(3)
+                with col_km:
+                    distancia_maxima = st.number_input(
+                        "📏 Distancia máxima (km)", min_value=0.0, value=float(st.session_state.radio_km),
+                        step=0.5, key=f"bloque_km_{lugar_nombre}_{i}"
+                    )
+                    st.button(
+                        f"Seleccionar todos a ≤ {distancia_maxima:g} km", key=f"bloque_km_boton_{lugar_nombre}_{i}",
+                        on_click=seleccionar_en_bloque,
+                        args=(lugar_nombre, clave_widget, opciones, claves_dentro_de, df_lugar, distancia_maxima)
+                    )
+                with col_tarifa:
+                    tarifa_maxima = st.number_input(
+                        "💰 Tarifa máxima", min_value=0.0, value=float(st.session_state.presupuesto_max),
+                        step=1000.0, key=f"bloque_tarifa_{lugar_nombre}_{i}"
+                    )
+                    st.button(
+                        f"Seleccionar todos con tarifa ≤ ${tarifa_maxima:,.0f}", key=f"bloque_tarifa_boton_{lugar_nombre}_{i}",
+                        on_click=seleccionar_en_bloque,
+                        args=(lugar_nombre, clave_widget, opciones, claves_bajo_presupuesto, df_lugar, tarifa_maxima)
+                    )
+                with col_limpiar:
+                    st.button(
+                        "🧹 Limpiar selección", key=f"limpiar_{lugar_nombre}_{i}",
+                        on_click=limpiar_seleccion, args=(lugar_nombre, clave_widget)
+                    )
                 
-                # Obtener selección actual
-                seleccion_actual = st.session_state.selecciones_por_lugar.get(lugar_nombre, [])
-                
-                # Multiselect con callback
-                seleccion_lugar = st.multiselect(
+                st.multiselect(
                     f"Selecciona espectaculares para {lugar_nombre}:",
-                    options=opciones_lugar,
-                    default=seleccion_actual,
-                    key=f"multiselect_{lugar_nombre}_{i}"  # Clave única por lugar y pestaña
+                    options=opciones,
+                    format_func=etiquetas.get,
+                    key=clave_widget,
+                    on_change=sincronizar_seleccion,
+                    args=(lugar_nombre, clave_widget)
                 )
                 
-                # ACTUALIZACIÓN INMEDIATA - SIN ESPERAR AL RERUN
-                if seleccion_lugar != seleccion_actual:
-                    actualizar_seleccion(lugar_nombre, seleccion_lugar)
-                    st.rerun()
-                
                 # Mostrar resumen de selección
-                if seleccion_lugar:
-                    st.success(f"✅ **{len(seleccion_lugar)}** espectaculares seleccionados en {lugar_nombre}")
-                    
-                    # Procesar selección actual
-                    indices_seleccionados_lugar = [int(op.split(".")[0]) for op in seleccion_lugar]
-                    df_seleccionados_lugar = df_lugar.iloc[indices_seleccionados_lugar]
-                    
-                    # Mostrar tabla
+                if seleccion:
+                    st.success(f"✅ **{len(seleccion)}** espectaculares seleccionados en {lugar_nombre}")
                     columnas_mostrar = ['CLAVE', 'DIRECCION', 'TARIFA_PUBLICO', 'DISTANCIA_KM', 'TIPO']
-                    st.dataframe(df_seleccionados_lugar[columnas_mostrar])
-                    
-                    # Agregar a combinación
-                    todas_selecciones.extend(seleccion_lugar)
-                    df_seleccionados_combinado = pd.concat([df_seleccionados_combinado, df_seleccionados_lugar])
+                    st.dataframe(filas_seleccionadas(df_lugar, seleccion)[columnas_mostrar])
                 else:
                     st.info(f"ℹ️ No hay espectaculares seleccionados para {lugar_nombre}")
         
         # ACTUALIZAR SELECCIÓN GLOBAL
+        todas_selecciones = [clave for lugar in st.session_state.df_por_lugar for clave in selecciones.get(lugar, ())]
         st.session_state.espectaculares_seleccionados = todas_selecciones
+        df_seleccionados_combinado = combinar_selecciones(selecciones, st.session_state.df_por_lugar)
         
         # 6. OPCIONES DE DESCARGA
         if todas_selecciones:
@@ -778,11 +814,33 @@ if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizad
             
             col_dl1, col_dl2 = st.columns(2)
             
+            # Los archivos se generan hasta que se pide la descarga (en otro hilo) y se
+            # guardan en la caché de la sesión según la huella de la selección
+            cache_artefactos = st.session_state.artefactos
+            
+            # En el hilo de la descarga no hay session_state: el medidor va en la clausura
+            # y sus mediciones aparecen en el panel en el siguiente rerun
+            def construir_csv(df_descarga=df_seleccionados_combinado):
+                def escribir():
+                    with etapa(medidor, "exportar_csv", len(df_descarga)) as medicion:
+                        datos = df_descarga.to_csv(index=False).encode('utf-8')
+                        medicion["filas_salida"] = len(df_descarga)
+                    return datos
+                return obtener_artefacto(cache_artefactos, clave_artefacto("csv", df_descarga), escribir)
+            
+            def construir_excel(df_descarga=df_seleccionados_combinado):
+                def escribir():
+                    with etapa(medidor, "exportar_excel", len(df_descarga)) as medicion:
+                        output = io.BytesIO()
+                        escribir_excel(df_descarga, output, hoja="Lugares cercanos")
+                        medicion["filas_salida"] = len(df_descarga)
+                    return output.getvalue()
+                return obtener_artefacto(cache_artefactos, clave_artefacto("xlsx", df_descarga), escribir)
+            
             with col_dl1:
-                csv_file = df_seleccionados_combinado.to_csv(index=False).encode('utf-8')
                 if st.download_button(
                     label="⬇️ Descargar Resultados (CSV)", 
-                    data=csv_file, 
+                    data=construir_csv, 
                     file_name=f"{st.session_state.folio_actual}_resultados.csv", 
                     mime="text/csv",
                     key='download_csv'
@@ -791,28 +849,9 @@ if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizad
                     st.success(f"✅ Descarga completada.")
             
             with col_dl2:
-                output = io.BytesIO()
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Lugares cercanos"
-                ws.append(list(df_seleccionados_combinado.columns))
-                for r in df_seleccionados_combinado.to_dict('records'):
-                    ws.append(list(r.values()))
-                for row in range(2, ws.max_row + 1):
-                    for col in range(1, ws.max_column + 1):
-                        if ws.cell(row=1, column=col).value == "TARIFA_PUBLICO":
-                            ws.cell(row=row, column=col).number_format = '"$"#,##0.00'
-                            break
-                tabla = Table(displayName="TablaEspectaculares", ref=f"A1:{get_column_letter(ws.max_column)}{ws.max_row}")
-                tabla.tableStyleInfo = TableStyleInfo(name="TableStyleMedium9", showRowStripes=True)
-                ws.add_table(tabla)
-                for cell in ws[1]:
-                    cell.fill = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
-                    cell.font = Font(bold=True)
-                wb.save(output)
                 if st.download_button(
                     label="⬇️ Descargar Resultados (Excel)", 
-                    data=output.getvalue(), 
+                    data=construir_excel, 
                     file_name=f"{st.session_state.folio_actual}_resultados.xlsx", 
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     key='download_excel'
@@ -824,7 +863,7 @@ if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizad
             st.write("---")
             st.subheader("🎓 Generar Presentación")
             
-            if len(st.session_state.consultas_previas) > 1:
+            if len(st.session_state.historial_consultas["consultas"]) > 1:
                 combinar_consultas = st.checkbox(
                     "🔄 **Combinar con resultados de consultas anteriores**",
                     help="Incluir espectaculares de búsquedas previas en la misma presentación"
@@ -835,41 +874,58 @@ if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizad
             if st.button("Crear Presentación", key='crear_presentacion'):
                 try:
                     plantilla_pptx = "plantilla2.pptx"
-                    prs = Presentation(plantilla_pptx)
-                    if len(prs.slides) < 2:
+                    plantilla = obtener_plantilla_compilada(plantilla_pptx, os.path.getmtime(plantilla_pptx))
+                    if len(plantilla["diapositivas"]) < 2:
                         st.error("❌ La plantilla debe tener al menos 2 diapositivas: la de título (0) y la de contenido (1).")
                     else:
                         slide_base_index = 1
-                        slide_base = prs.slides[slide_base_index]
                         
                         if combinar_consultas:
-                            todos_espectaculares = df_seleccionados_combinado.copy()
-                            for consulta in st.session_state.consultas_previas[:-1]:
-                                if not consulta["df_filtrado"].empty:
-                                    todos_espectaculares = pd.concat([todos_espectaculares, consulta["df_filtrado"]], ignore_index=True)
-                            
-                            todos_espectaculares = todos_espectaculares.drop_duplicates(subset=['CLAVE'])
-                            st.info(f"📊 Presentación combinada con {len(todos_espectaculares)} espectaculares de {len(st.session_state.consultas_previas)} consultas")
+                            # El índice de unión ya dice qué filas aporta cada consulta anterior;
+                            # solo esas se vuelven a armar desde el inventario
+                            historial = st.session_state.historial_consultas
+                            partes = [df_seleccionados_combinado]
+                            with etapa(medidor, "union_historial", len(df_seleccionados_combinado)) as medicion:
+                                for entrada, filas in aportes_union(historial, st.session_state.get("huella_consulta_actual"),
+                                                                    df_seleccionados_combinado["CLAVE"]):
+                                    if entrada["inventario_hash"] == st.session_state.inventario_hash:
+                                        inventario_consulta = inventario_sesion()[0]
+                                    else:
+                                        almacenado = cargar_inventario(entrada["inventario_hash"])
+                                        inventario_consulta = almacenado[0] if almacenado is not None else None
+                                    if inventario_consulta is None:
+                                        st.warning(f"⚠️ La consulta del {entrada['fecha']} usaba un inventario que ya no está en el almacén; se omite.")
+                                        continue
+                                    avisos_consulta = []
+                                    partes.append(filas_de_consulta(entrada, filas, inventario_consulta, avisos_consulta))
+                                    for aviso in avisos_consulta:
+                                        st.warning(aviso)
+                                
+                                todos_espectaculares = pd.concat(partes, ignore_index=True).drop_duplicates(subset=['CLAVE'])
+                                medicion["filas_salida"] = len(todos_espectaculares)
+                            st.info(f"📊 Presentación combinada con {len(todos_espectaculares)} espectaculares de {len(historial['consultas'])} consultas")
                         else:
                             todos_espectaculares = df_seleccionados_combinado
                         
-                        for _, fila in todos_espectaculares.iterrows():
-                            nueva_slide = duplicar_slide(prs, slide_base)
-                            reemplazar_texto_slide(nueva_slide, fila.to_dict(), todos_espectaculares, st.session_state.nombre_negocio)
-                        
-                        # CORRECCIÓN: empty es un atributo, no un método
-                        if not todos_espectaculares.empty:
-                            primera_fila = todos_espectaculares.iloc[0]
-                            reemplazar_texto_slide(prs.slides[0], primera_fila.to_dict(), todos_espectaculares, st.session_state.nombre_negocio)
+                        clave_pptx = clave_artefacto("pptx", todos_espectaculares, plantilla_pptx, plantilla["modificada"],
+                                                     st.session_state.nombre_negocio)
+                        def construir_presentacion():
+                            with etapa(medidor, "presentacion", len(todos_espectaculares)) as medicion:
+                                presentacion = generar_presentacion(plantilla_pptx, plantilla, todos_espectaculares,
+                                                                    st.session_state.nombre_negocio, slide_base_index)
+                                medicion["filas_salida"] = len(todos_espectaculares)
+                            return presentacion
                         
-                        pptx_output = io.BytesIO()
-                        prs.save(pptx_output)
+                        with st.spinner(f"🔄 Generando {len(todos_espectaculares)} diapositivas..."):
+                            contenido_pptx, avisos = obtener_artefacto(st.session_state.artefactos, clave_pptx, construir_presentacion)
+                        for aviso in avisos:
+                            st.warning(f"⚠️ {aviso}")
                         
                         st.success(f"✅ ¡Presentación creada con éxito! - Folio: `{st.session_state.folio_actual}`")
                         
                         if st.download_button(
                             label="⬇️ Descargar Presentación (PPTX)", 
-                            data=pptx_output.getvalue(), 
+                            data=contenido_pptx, 
                             file_name=f"{st.session_state.folio_actual}.pptx", 
                             mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
                             key='download_pptx'
@@ -882,15 +938,15 @@ if not st.session_state.df_filtrado.empty and st.session_state.busqueda_realizad
                     st.error(f"❌ **Error al crear la presentación:** {e}")
         else:
             st.warning("⚠️ Por favor, selecciona al menos un espectacular de alguno de los lugares para habilitar las opciones de descarga.")
-    else:
-        st.info("ℹ️ No hay resultados separados por lugar para mostrar.")
+    
+    seccion_seleccion_y_descargas()
 
 # 8. HISTORIAL DE CONSULTAS
-if len(st.session_state.consultas_previas) > 0:
+if len(st.session_state.historial_consultas["consultas"]) > 0:
     st.write("---")
     st.subheader("📊 Historial de Consultas")
     
-    for i, consulta in enumerate(st.session_state.consultas_previas):
+    for i, consulta in enumerate(consultas_en_orden(st.session_state.historial_consultas)):
         with st.expander(f"🔍 Consulta {i+1}: {consulta['nombre_negocio']} - {consulta['fecha']} - {consulta['resultados']} resultados"):
             st.write(f"**Negocio:** {consulta['nombre_negocio']}")
             st.write(f"**Fecha:** {consulta['fecha']}")
@@ -905,7 +961,29 @@ if len(st.session_state.consultas_previas) > 0:
                 else:
                     st.write(f"**Tipos seleccionados:** {len(consulta['tipos_seleccionados'])} tipos")
 
+# 9. RENDIMIENTO
+# Tiempos, filas y memoria pico de las últimas etapas medidas en esta sesión; las mismas
+# mediciones salen como líneas JSON en el log "espectaculares.rendimiento"
+def cambiar_medicion():
+    medidor["activo"] = st.session_state.rendimiento_activo
+    # tracemalloc lo comparten todas las sesiones: solo se detiene cuando ninguna mide memoria
+    cambiar_memoria(medidor, medidor["activo"] and st.session_state.rendimiento_memoria)
 
-
-
-
+st.write("---")
+with st.expander("⏱️ Rendimiento"):
+    col_rend1, col_rend2, col_rend3 = st.columns(3)
+    with col_rend1:
+        st.checkbox("Medir etapas", value=medidor["activo"], key="rendimiento_activo", on_change=cambiar_medicion)
+    with col_rend2:
+        st.checkbox("Incluir memoria pico (más lento)", value=medidor["memoria"], key="rendimiento_memoria",
+                    on_change=cambiar_medicion, disabled=not medidor["activo"])
+    with col_rend3:
+        if st.button("🧹 Limpiar mediciones", key="rendimiento_limpiar"):
+            medidor["registros"].clear()
+    
+    if medidor["registros"]:
+        st.dataframe(pd.DataFrame(list(reversed(medidor["registros"]))), hide_index=True)
+    elif medidor["activo"]:
+        st.info("ℹ️ Aún no hay etapas medidas: sube un inventario o haz una búsqueda.")
+    else:
+        st.info("ℹ️ La medición está apagada; al prenderla cada etapa registra tiempo, filas y memoria.")
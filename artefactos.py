@@ -0,0 +1,60 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# ================================
+# Caché de archivos de descarga
+# ================================
+
+# Pocas entradas: cada una es un archivo completo (CSV, Excel o presentación)
+MAXIMO_ARTEFACTOS = 8
+# El HTML del mapa va en su propia caché para que un mapa grande no saque las descargas
+MAXIMO_MAPAS = 2
+
+def crear_cache_artefactos(maximo=MAXIMO_ARTEFACTOS):
+    """Caché LRU de archivos ya generados; el candado la protege porque las descargas
+    diferidas de Streamlit corren en otro hilo. `construyendo` tiene un candado por clave
+    que se está generando"""
+    return {"entradas": OrderedDict(), "maximo": maximo, "candado": threading.Lock(), "construyendo": {}}
+
+def clave_artefacto(tipo, df, *extras):
+    """Huella de un archivo: tipo, filas seleccionadas (CLAVE y demás columnas) y extras
+    como la plantilla o el nombre del negocio"""
+    huella = hashlib.sha256(tipo.encode("utf-8"))
+    huella.update(repr(list(df.columns)).encode("utf-8"))
+    huella.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    for extra in extras:
+        huella.update(repr(extra).encode("utf-8"))
+    return huella.hexdigest()
+
+def obtener_artefacto(cache, clave, construir):
+    """Devuelve el archivo de la caché o lo genera con `construir()` y lo guarda,
+    sacando el usado hace más tiempo si se pasa del máximo.
+
+    `construir()` corre fuera del candado de la caché: mientras se genera un archivo
+    grande las demás descargas (y los aciertos) siguen. Quien pide la misma clave a la
+    vez espera en el candado de esa clave y se lleva el archivo ya generado.
+    """
+    entradas = cache["entradas"]
+    with cache["candado"]:
+        if clave in entradas:
+            entradas.move_to_end(clave)
+            return entradas[clave]
+        candado_clave = cache["construyendo"].setdefault(clave, threading.Lock())
+    with candado_clave:
+        with cache["candado"]:
+            if clave in entradas:
+                entradas.move_to_end(clave)
+                return entradas[clave]
+        try:
+            valor = construir()
+            with cache["candado"]:
+                entradas[clave] = valor
+                while len(entradas) > cache["maximo"]:
+                    entradas.popitem(last=False)
+        finally:
+            with cache["candado"]:
+                cache["construyendo"].pop(clave, None)
+        return valor
@@ -0,0 +1,74 @@
+"""Tiempo de consulta por radio contra tamaño de inventario: barrido completo vs índice.
+
+Uso: python benchmarks/indice_espacial.py [--tamanos 4000 100000 1000000] [--radio 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from distancias import filtrar_por_radio
+from indice_espacial import construir_indice_espacial, consultar_indice
+from inventario import normalizar_inventario
+
+RUTA_INVENTARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "inventario.csv")
+
+def puntos_sinteticos(n, semilla=0):
+    """Coordenadas alrededor de las caras reales de inventario.csv (±3 km)"""
+    df = pd.read_csv(RUTA_INVENTARIO)
+    df.columns = df.columns.str.strip()
+    df = normalizar_inventario(df)
+    df = df[df["COORDENADA_VALIDA"]]
+    rng = np.random.default_rng(semilla)
+    base = rng.integers(len(df), size=n)
+    lat = df["LATITUD_DECIMAL"].to_numpy()[base] + rng.normal(0, 0.03, n)
+    lon = df["LONGITUD_DECIMAL"].to_numpy()[base] + rng.normal(0, 0.03, n)
+    return lat, lon
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[4000, 10000, 100000, 1000000])
+    parser.add_argument("--radio", type=float, default=5.0)
+    parser.add_argument("--consultas", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'caras':>10} {'construir ms':>13} {'barrido ms':>11} {'índice ms':>10} {'candidatos':>11} {'resultados':>11}")
+    for n in args.tamanos:
+        lat, lon = puntos_sinteticos(n)
+        rng = np.random.default_rng(1)
+        centros = [(lat[i], lon[i]) for i in rng.integers(n, size=args.consultas)]
+
+        inicio = time.perf_counter()
+        indice = construir_indice_espacial(lat, lon)
+        construir = (time.perf_counter() - inicio) * 1000
+
+        def barrido():
+            for la, lo in centros:
+                filtrar_por_radio(la, lo, lat, lon, args.radio, exacto=False)
+
+        candidatos = []
+        def con_indice():
+            candidatos.clear()
+            for la, lo in centros:
+                posiciones = consultar_indice(indice, la, lo, args.radio)
+                candidatos.append(len(posiciones))
+                filtrar_por_radio(la, lo, lat[posiciones], lon[posiciones], args.radio, exacto=False)
+
+        t_barrido = medir(barrido, 1) / len(centros)
+        t_indice = medir(con_indice, 1) / len(centros)
+        resultados = np.mean([len(filtrar_por_radio(la, lo, lat, lon, args.radio, exacto=False)[0]) for la, lo in centros])
+        print(f"{n:>10} {construir:>13.1f} {t_barrido:>11.2f} {t_indice:>10.2f} {np.mean(candidatos):>11.0f} {resultados:>11.0f}")
+
+if __name__ == "__main__":
+    main()
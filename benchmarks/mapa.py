@@ -0,0 +1,63 @@
+"""Tamaño del HTML y tiempo de generación del mapa: un marcador por fila vs modo compacto.
+
+El tiempo es el de armar y renderizar el HTML en el servidor (lo que se repetía en
+cada rerun); el tamaño es lo que viaja al navegador por st.components.v1.html.
+
+Uso: python benchmarks/mapa.py [--puntos 1000 10000 50000] [--modos detallado compacto]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mapa import construir_mapa
+
+LUGARES = [
+    {"nombre": "Principal", "lat": 19.4326, "lon": -99.1332},
+    {"nombre": "Norte", "lat": 19.5400, "lon": -99.1900},
+    {"nombre": "Sur", "lat": 19.3000, "lon": -99.1500},
+]
+
+def resultados_sinteticos(n, semilla=0):
+    """Filas con las columnas que arma construir_resultados"""
+    rng = np.random.default_rng(semilla)
+    lugar = rng.integers(len(LUGARES), size=n)
+    lat = np.array([LUGARES[i]["lat"] for i in lugar]) + rng.normal(0, 0.05, n)
+    lon = np.array([LUGARES[i]["lon"] for i in lugar]) + rng.normal(0, 0.05, n)
+    tarifa = rng.uniform(5000, 90000, n)
+    return pd.DataFrame({
+        "CLAVE": [f"SYN-{i:06d}" for i in range(n)],
+        "DIRECCION": [f"Av. Sintética {i}, Col. Centro" for i in range(n)],
+        "TIPO": rng.choice(["UNIPOLAR", "MURO", "PANTALLA DIGITAL", "AZOTEA"], n),
+        "LATITUD": lat,
+        "LONGITUD": lon,
+        "DISTANCIA_KM": rng.uniform(0, 10, n).round(2),
+        "TARIFA_PUBLICO": [f"${t:,.2f}" for t in tarifa],
+        "MAPS_": [f"https://www.google.com/maps/place/{a},{b}" for a, b in zip(lat, lon)],
+        "STREET_VIEW": [f"https://www.google.com/maps/@?api=1&map_action=pano&viewpoint={a},{b}" for a, b in zip(lat, lon)],
+        "LUGAR_BUSQUEDA": [LUGARES[i]["nombre"] for i in lugar],
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--puntos", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--modos", nargs="+", default=["detallado", "compacto"], choices=["detallado", "compacto"])
+    args = parser.parse_args()
+
+    print(f"{'puntos':>8} {'modo':>10} {'segundos':>9} {'HTML MB':>8} {'bytes/punto':>12}")
+    for n in args.puntos:
+        df = resultados_sinteticos(n)
+        for modo in args.modos:
+            inicio = time.perf_counter()
+            html, agregados, _ = construir_mapa(df, LUGARES, 5.0, modo)
+            segundos = time.perf_counter() - inicio
+            tamano = len(html.encode("utf-8"))
+            print(f"{n:>8} {modo:>10} {segundos:>9.2f} {tamano / 1024 / 1024:>8.2f} {tamano / agregados:>12.0f}")
+
+if __name__ == "__main__":
+    main()
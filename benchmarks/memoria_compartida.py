@@ -0,0 +1,116 @@
+"""Memoria del host con varios procesos de la app abriendo el mismo inventario publicado.
+
+Cada trabajador abre la versión publicada, hace unas búsquedas y reporta su PSS (la
+memoria compartida se reparte entre los procesos que la usan, así que la suma de PSS es
+la memoria real del host). "copia" lee el Feather a memoria propia de cada proceso;
+"compartido" usa cargar_inventario (mmap sin copiar).
+
+Uso: python benchmarks/memoria_compartida.py [--filas 1000000] [--trabajadores 1 2 4 8]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+import pyarrow.feather as feather
+
+from almacen_inventario import guardar_inventario, cargar_inventario, version_publicada, _ruta_version
+from distancias import filtrar_por_radio
+from indice_espacial import construir_indice_espacial
+from inventario import normalizar_inventario, filtrar_candidatos
+
+def inventario_sintetico(n, semilla=0):
+    """Filas de inventario.csv repetidas hasta n, con las coordenadas movidas ±3 km"""
+    df = pd.read_csv(os.path.join(RAIZ, "inventario.csv"))
+    df.columns = df.columns.str.strip()
+    df = normalizar_inventario(df)
+    df = df[df["COORDENADA_VALIDA"]].reset_index(drop=True)
+    rng = np.random.default_rng(semilla)
+    df = df.iloc[rng.integers(len(df), size=n)].reset_index(drop=True)
+    df["CLAVE"] = [f"SYN-{i:07d}" for i in range(n)]
+    df["LATITUD_DECIMAL"] = df["LATITUD_DECIMAL"].to_numpy() + rng.normal(0, 0.03, n)
+    df["LONGITUD_DECIMAL"] = df["LONGITUD_DECIMAL"].to_numpy() + rng.normal(0, 0.03, n)
+    df.attrs = {}
+    return df
+
+def memoria_propia_mb():
+    """(PSS, privada) en MB según /proc/self/smaps_rollup"""
+    valores = {}
+    with open("/proc/self/smaps_rollup") as archivo:
+        for linea in archivo:
+            partes = linea.split()
+            if len(partes) == 3 and partes[2] == "kB":
+                valores[partes[0].rstrip(":")] = int(partes[1]) / 1024
+    return valores["Pss"], valores["Private_Clean"] + valores["Private_Dirty"]
+
+def trabajador(modo, directorio):
+    """Abre el inventario, busca, reporta la memoria y espera a que el padre cierre stdin"""
+    hash_archivo = version_publicada(directorio)
+    if modo == "copia":
+        df = feather.read_table(os.path.join(_ruta_version(hash_archivo, directorio), "inventario.feather")).to_pandas()
+    else:
+        df, _ = cargar_inventario(hash_archivo, directorio)
+    rng = np.random.default_rng(1)
+    lat = df["LATITUD_DECIMAL"].to_numpy()
+    lon = df["LONGITUD_DECIMAL"].to_numpy()
+    for i in rng.integers(len(df), size=5):
+        candidatos = np.flatnonzero(filtrar_candidatos(df, 0.0, 100000.0))
+        filtrar_por_radio(lat[i], lon[i], lat[candidatos], lon[candidatos], 5.0)
+    # Recorrer las columnas de texto para que sus páginas también queden residentes
+    sum(df[columna].astype(str).str.len().sum() for columna in ["CLAVE", "DIRECCION", "TIPO"])
+    # Se mide cuando todos los trabajadores ya abrieron el inventario
+    print("listo", flush=True)
+    sys.stdin.readline()
+    pss, privada = memoria_propia_mb()
+    print(f"{pss} {privada}", flush=True)
+    sys.stdin.read()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=1000000)
+    parser.add_argument("--trabajadores", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modos", nargs="+", default=["copia", "compartido"], choices=["copia", "compartido"])
+    parser.add_argument("--trabajador", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.trabajador:
+        trabajador(*args.trabajador)
+        return
+
+    with tempfile.TemporaryDirectory() as directorio:
+        df = inventario_sintetico(args.filas)
+        indice = construir_indice_espacial(df["LATITUD_DECIMAL"], df["LONGITUD_DECIMAL"])
+        guardar_inventario(df, "sintetico", indice, directorio, publicar=True)
+        tamano = os.path.getsize(os.path.join(directorio, "sintetico", "inventario.feather")) / 1024 / 1024
+        del df, indice
+        print(f"inventario: {args.filas:,} filas, {tamano:.0f} MB en disco")
+
+        print(f"{'modo':>11} {'procesos':>9} {'PSS total MB':>13} {'privada/proceso MB':>19}")
+        for modo in args.modos:
+            for total in args.trabajadores:
+                procesos = [
+                    subprocess.Popen([sys.executable, os.path.abspath(__file__), "--trabajador", modo, directorio],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                    for _ in range(total)
+                ]
+                for proceso in procesos:
+                    proceso.stdout.readline()
+                for proceso in procesos:
+                    proceso.stdin.write("\n")
+                    proceso.stdin.flush()
+                lecturas = [[float(valor) for valor in proceso.stdout.readline().split()] for proceso in procesos]
+                for proceso in procesos:
+                    proceso.stdin.close()
+                    proceso.wait()
+                pss = sum(lectura[0] for lectura in lecturas)
+                privada = sum(lectura[1] for lectura in lecturas) / total
+                print(f"{modo:>11} {total:>9} {pss:>13.0f} {privada:>19.0f}")
+
+if __name__ == "__main__":
+    main()
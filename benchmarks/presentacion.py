@@ -0,0 +1,95 @@
+"""Tiempo y memoria pico al generar la presentación: python-pptx en memoria vs por flujo.
+
+Cada caso corre en un proceso aparte para que la memoria pico (RSS) de uno no
+contamine al siguiente.
+
+Uso: python benchmarks/presentacion.py [--diapositivas 100 1000 5000] [--modos clasico flujo]
+"""
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from plantilla_pptx import compilar_plantilla, resolver_campos, aplicar_plantilla, duplicar_slide, escribir_presentacion
+from pptx import Presentation
+
+RUTA_PLANTILLA = os.path.join(RAIZ, "plantilla2.pptx")
+
+def filas_sinteticas(n, semilla=0):
+    """Filas con las columnas que usa la plantilla"""
+    rng = np.random.default_rng(semilla)
+    lat = rng.uniform(19.2, 19.6, n)
+    lon = rng.uniform(-99.3, -98.9, n)
+    return pd.DataFrame({
+        "CLAVE": [f"SYN-{i:06d}" for i in range(n)],
+        "CIUDAD": "CDMX",
+        "VISTA": rng.choice(["NATURAL", "CRUZADA"], n),
+        "TIPO": rng.choice(["ESPECTACULAR", "MURO", "PANTALLA DIGITAL"], n),
+        "BASE": "12.90",
+        "ALTURA": "7.20",
+        "DIRECCION": [f"Av. Sintética {i}, Col. Centro" for i in range(n)],
+        "LATITUD": lat.round(6),
+        "LONGITUD": lon.round(6),
+        "TARIFA PUBLICO": rng.uniform(5000, 60000, n).round(2),
+        "STREET_VIEW": [f"https://www.google.com/maps?q=&layer=c&cbll={a:.6f},{b:.6f}" for a, b in zip(lat, lon)],
+    })
+
+def rss_pico_mb():
+    # En Linux ru_maxrss viene en KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def generar_clasico(plantilla, df, destino):
+    prs = Presentation(RUTA_PLANTILLA)
+    slide_base = prs.slides[1]
+    diapositivas = resolver_campos(plantilla, df.columns)
+    for fila in df.to_dict("records"):
+        aplicar_plantilla(duplicar_slide(prs, slide_base), diapositivas[1], fila, "Negocio")
+    aplicar_plantilla(prs.slides[0], diapositivas[0], df.iloc[0].to_dict(), "Negocio")
+    prs.save(destino)
+
+def generar_flujo(plantilla, df, destino):
+    escribir_presentacion(RUTA_PLANTILLA, plantilla, df, destino, "Negocio")
+
+def correr_caso(modo, n):
+    """Corre un caso en este proceso e imprime: segundos, MB pico, MB extra, MB del archivo"""
+    plantilla = compilar_plantilla(RUTA_PLANTILLA)
+    df = filas_sinteticas(n)
+    antes = rss_pico_mb()
+    destino = io.BytesIO()
+    inicio = time.perf_counter()
+    {"clasico": generar_clasico, "flujo": generar_flujo}[modo](plantilla, df, destino)
+    segundos = time.perf_counter() - inicio
+    pico = rss_pico_mb()
+    print(f"{segundos} {pico} {pico - antes} {len(destino.getvalue()) / 1024 / 1024}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--diapositivas", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--modos", nargs="+", default=["clasico", "flujo"], choices=["clasico", "flujo"])
+    parser.add_argument("--caso", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.caso:
+        correr_caso(args.caso[0], int(args.caso[1]))
+        return
+
+    print(f"{'diapositivas':>12} {'modo':>8} {'segundos':>9} {'RSS pico MB':>12} {'MB extra':>9} {'archivo MB':>11}")
+    for n in args.diapositivas:
+        for modo in args.modos:
+            salida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--caso", modo, str(n)],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            segundos, pico, extra, tamano = (float(valor) for valor in salida[-4:])
+            print(f"{n:>12} {modo:>8} {segundos:>9.2f} {pico:>12.0f} {extra:>9.0f} {tamano:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Propuestas por minuto del motor por lote según el número de procesos.
+
+Uso: python benchmarks/propuestas_lote.py [--clientes 40] [--procesos 1 2 4] [--formatos csv xlsx pptx]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from inventario import normalizar_inventario
+from motor import FORMATOS, preparar_inventario, generar_lote
+
+RUTA_INVENTARIO = os.path.join(RAIZ, "inventario.csv")
+
+def clientes_sinteticos(n, semilla=0):
+    """Clientes con 1 a 3 lugares cerca de caras reales de inventario.csv"""
+    df = pd.read_csv(RUTA_INVENTARIO)
+    df.columns = df.columns.str.strip()
+    df = normalizar_inventario(df)
+    df = df[df["COORDENADA_VALIDA"]]
+    rng = np.random.default_rng(semilla)
+    clientes = []
+    for i in range(n):
+        bases = rng.integers(len(df), size=rng.integers(1, 4))
+        clientes.append({
+            "nombre": f"Cliente {i}",
+            "lugares": [
+                {"nombre": f"Lugar {j}", "lat": float(df["LATITUD_DECIMAL"].iloc[b] + rng.normal(0, 0.01)),
+                 "lon": float(df["LONGITUD_DECIMAL"].iloc[b] + rng.normal(0, 0.01))}
+                for j, b in enumerate(bases)
+            ],
+            "radio_km": float(rng.choice([1.0, 3.0, 5.0])),
+            "presupuesto_min": 0.0,
+            "presupuesto_max": 100000.0,
+            "tipos": [],
+        })
+    return clientes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clientes", type=int, default=40)
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--formatos", nargs="+", default=list(FORMATOS), choices=FORMATOS)
+    args = parser.parse_args()
+
+    clientes = clientes_sinteticos(args.clientes)
+    print(f"núcleos: {os.cpu_count()}, clientes: {len(clientes)}, formatos: {' '.join(args.formatos)}")
+    print(f"{'procesos':>9} {'segundos':>9} {'propuestas/min':>15}")
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = os.path.join(directorio, "almacen")
+        hash_archivo = preparar_inventario(RUTA_INVENTARIO, almacen)
+        for procesos in args.procesos:
+            salida = os.path.join(directorio, f"salida-{procesos}")
+            inicio = time.perf_counter()
+            for _ in generar_lote(clientes, hash_archivo, salida, args.formatos, procesos, almacen):
+                pass
+            segundos = time.perf_counter() - inicio
+            print(f"{procesos:>9} {segundos:>9.2f} {len(clientes) / segundos * 60:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Suite de rendimiento por etapa con inventarios sintéticos de 10k, 100k y 1M filas.
+
+Los inventarios se arman remuestreando las filas de inventario.csv, así que conservan
+su mezcla de formatos de coordenadas, tipos, tarifas y ciudades. Las coordenadas
+decimales se mueven unos cientos de metros para repartir las caras; las que vienen en
+otros formatos (GMS, UTM, etc.) se dejan tal cual. Cada etapa se mide por separado y
+el resultado se guarda en JSON para comparar corridas.
+
+Uso: python benchmarks/suite.py [--filas 10000 100000 1000000] [--salida resultados.json]
+     [--etapas lectura_csv normalizacion ...] [--max-diapositivas 300]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from busqueda import procesar_busqueda_individual, procesar_busqueda_multiple, procesar_busqueda_multiple_en_cache
+from cache_distancias import crear_cache_distancias
+from exportacion import escribir_excel
+from indice_espacial import construir_indice_espacial
+from indice_texto import construir_indice_texto, buscar_texto
+from inventario import ESQUEMA_INVENTARIO, leer_inventario, normalizar_inventario
+from mapa import construir_mapa, UMBRAL_MAPA_COMPACTO
+from plantilla_pptx import compilar_plantilla, generar_presentacion
+
+RUTA_INVENTARIO = os.path.join(RAIZ, "inventario.csv")
+RUTA_PLANTILLA = os.path.join(RAIZ, "plantilla2.pptx")
+ETAPAS = [
+    "lectura_csv", "normalizacion", "ingesta_completa", "indice_espacial", "indice_texto", "busqueda_texto",
+    "busqueda_individual", "busqueda_multiple", "busqueda_cache", "mapa", "exportar_csv", "exportar_excel", "presentacion",
+]
+
+def csv_sintetico(n, semilla=0):
+    """Bytes de un CSV con n filas remuestreadas de inventario.csv (mismos encabezados)"""
+    base = pd.read_csv(RUTA_INVENTARIO, dtype=str, keep_default_na=False)
+    rng = np.random.default_rng(semilla)
+    df = base.iloc[rng.integers(len(base), size=n)].reset_index(drop=True)
+    columnas = {columna.strip(): columna for columna in df.columns}
+    df[columnas["CLAVE"]] = df[columnas["CLAVE"]] + "-" + pd.Series(np.arange(n)).astype(str)
+    # Solo las coordenadas decimales se mueven (±0.02° ≈ 2 km); los demás formatos se copian
+    for nombre in ["LATITUD", "LONGITUD"]:
+        valores = pd.to_numeric(df[columnas[nombre]], errors="coerce")
+        decimales = valores.notna().to_numpy()
+        movidos = valores[decimales].to_numpy() + rng.normal(0, 0.02, decimales.sum())
+        df.loc[decimales, columnas[nombre]] = [f"{valor:.6f}" for valor in movidos]
+    df.columns = ["" if columna.startswith("Unnamed:") else columna for columna in df.columns]
+    return df.to_csv(index=False).encode("utf-8")
+
+def lugares_de_prueba(df, cuantos, rng):
+    """Lugares sobre caras válidas del inventario, para que las búsquedas encuentren algo"""
+    validas = np.flatnonzero(df["COORDENADA_VALIDA"].to_numpy())
+    elegidas = rng.choice(validas, size=cuantos, replace=False)
+    return [
+        {"nombre": f"Lugar {i}", "lat": float(df["LATITUD_DECIMAL"].iloc[fila]), "lon": float(df["LONGITUD_DECIMAL"].iloc[fila])}
+        for i, fila in enumerate(elegidas)
+    ]
+
+def medir(funcion, repeticiones=1):
+    """(segundos promedio, resultado de la última llamada)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones, resultado
+
+def correr_tamano(n, args, etapas):
+    """Mide las etapas pedidas para un inventario de n filas; devuelve {etapa: medición}"""
+    rng = np.random.default_rng(1)
+    contenido = csv_sintetico(n)
+    mediciones = {}
+
+    def anotar(etapa, segundos, filas_entrada, filas_salida):
+        mediciones[etapa] = {"segundos": round(segundos, 6), "filas_entrada": int(filas_entrada), "filas_salida": int(filas_salida)}
+        print(f"{n:>9} {etapa:>20} {segundos:>10.3f} {filas_entrada:>10} {filas_salida:>10}", flush=True)
+
+    encabezado = pd.read_csv(io.BytesIO(contenido), nrows=0).columns
+    tipos = {columna: ESQUEMA_INVENTARIO[columna.strip()] for columna in encabezado if columna.strip() in ESQUEMA_INVENTARIO}
+    segundos, crudo = medir(lambda: pd.read_csv(io.BytesIO(contenido), dtype=tipos))
+    if "lectura_csv" in etapas:
+        anotar("lectura_csv", segundos, n, len(crudo))
+    crudo.columns = crudo.columns.str.strip()
+    if "normalizacion" in etapas:
+        segundos, _ = medir(lambda: normalizar_inventario(crudo))
+        anotar("normalizacion", segundos, len(crudo), len(crudo))
+    del crudo
+
+    segundos, df = medir(lambda: leer_inventario(io.BytesIO(contenido)))
+    if "ingesta_completa" in etapas:
+        anotar("ingesta_completa", segundos, n, len(df))
+    segundos, indice = medir(lambda: construir_indice_espacial(df["LATITUD_DECIMAL"], df["LONGITUD_DECIMAL"]))
+    if "indice_espacial" in etapas:
+        anotar("indice_espacial", segundos, len(df), int(indice["total"]))
+
+    if "indice_texto" in etapas or "busqueda_texto" in etapas:
+        segundos, indice_texto = medir(lambda: construir_indice_texto(df))
+        if "indice_texto" in etapas:
+            anotar("indice_texto", segundos, len(df), len(indice_texto["palabras"]))
+        if "busqueda_texto" in etapas:
+            # Una palabra completa, un prefijo con ciudad y una con una letra de diferencia
+            consultas = ["Av. Lázaro Cárdenas", "juar guadalajara", "cardenaz"]
+            segundos, encontradas = medir(lambda: sum(len(buscar_texto(indice_texto, consulta)[0]) for consulta in consultas),
+                                          args.repeticiones)
+            anotar("busqueda_texto", segundos / len(consultas), len(df), encontradas)
+
+    lugares = lugares_de_prueba(df, 3, rng)
+    if "busqueda_individual" in etapas:
+        lugar = lugares[0]
+        segundos, resultado = medir(lambda: procesar_busqueda_individual(
+            df, lugar["lat"], lugar["lon"], args.radio, 0.0, 1e12, [], lugar["nombre"], indice
+        ), args.repeticiones)
+        anotar("busqueda_individual", segundos, len(df), len(resultado))
+    segundos, (combinada, _, _) = medir(lambda: procesar_busqueda_multiple(
+        df, lugares, args.radio, 0.0, 1e12, [], indice
+    ), args.repeticiones)
+    if "busqueda_multiple" in etapas:
+        anotar("busqueda_multiple", segundos, len(df), len(combinada))
+    if "busqueda_cache" in etapas:
+        # Cambio de radio sobre los mismos lugares: las distancias ya están en la caché
+        cache = crear_cache_distancias()
+        procesar_busqueda_multiple_en_cache(df, lugares, args.radio, 0.0, 1e12, [], cache, "suite", indice)
+        segundos, (refiltrada, _, _) = medir(lambda: procesar_busqueda_multiple_en_cache(
+            df, lugares, args.radio / 2, 0.0, 1e12, [], cache, "suite", indice
+        ), args.repeticiones)
+        anotar("busqueda_cache", segundos, len(df), len(refiltrada))
+
+    if combinada.empty:
+        return mediciones
+    if "mapa" in etapas:
+        modo = "compacto" if len(combinada) >= UMBRAL_MAPA_COMPACTO else "detallado"
+        segundos, (html, _, _) = medir(lambda: construir_mapa(combinada, lugares, args.radio, modo))
+        anotar("mapa", segundos, len(combinada), len(html))
+    if "exportar_csv" in etapas:
+        segundos, datos = medir(lambda: combinada.to_csv(index=False).encode("utf-8"))
+        anotar("exportar_csv", segundos, len(combinada), len(datos))
+    if "exportar_excel" in etapas:
+        def excel():
+            salida = io.BytesIO()
+            escribir_excel(combinada, salida)
+            return salida.getvalue()
+        segundos, datos = medir(excel)
+        anotar("exportar_excel", segundos, len(combinada), len(datos))
+    if "presentacion" in etapas:
+        plantilla = compilar_plantilla(RUTA_PLANTILLA)
+        filas = combinada.head(args.max_diapositivas)
+        segundos, (datos, _) = medir(lambda: generar_presentacion(RUTA_PLANTILLA, plantilla, filas, "Negocio", 1))
+        anotar("presentacion", segundos, len(filas), len(datos))
+    return mediciones
+
+def version_git():
+    try:
+        return subprocess.run(["git", "-C", RAIZ, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--etapas", nargs="+", default=ETAPAS, choices=ETAPAS)
+    parser.add_argument("--radio", type=float, default=5.0)
+    parser.add_argument("--repeticiones", type=int, default=3, help="repeticiones de las búsquedas")
+    parser.add_argument("--max-diapositivas", type=int, default=300)
+    parser.add_argument("--salida", help="archivo JSON (por omisión benchmarks/resultados/suite-<fecha>.json)")
+    args = parser.parse_args()
+
+    ahora = datetime.now()
+    salida = args.salida or os.path.join(RAIZ, "benchmarks", "resultados", f"suite-{ahora:%Y%m%d-%H%M%S}.json")
+    reporte = {
+        "fecha": ahora.isoformat(timespec="seconds"),
+        "git": version_git(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "nucleos": os.cpu_count(),
+        "parametros": {"radio_km": args.radio, "repeticiones": args.repeticiones, "max_diapositivas": args.max_diapositivas},
+        "resultados": [],
+    }
+    print(f"{'filas':>9} {'etapa':>20} {'segundos':>10} {'entrada':>10} {'salida':>10}")
+    for n in args.filas:
+        reporte["resultados"].append({"filas": n, "etapas": correr_tamano(n, args, set(args.etapas))})
+
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados en {salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+from distancias import filtrar_por_radio, filtrar_por_radio_multiple
+from cache_distancias import RADIO_CACHE_KM, distancias_lugar, posiciones_cerca, cortar_radio
+from indice_espacial import consultar_indice
+from inventario import normalizar_inventario, filtrar_candidatos
+from rendimiento import etapa
+
+# ================================
+# Búsqueda de espectaculares
+# ================================
+
+# Sin Streamlit: la usan la app (app2.py) y el motor de propuestas por lote (motor.py).
+# Los problemas con filas sueltas se devuelven en la lista `avisos` en lugar de mostrarse.
+
+def construir_resultados(df_filas, distancias, nombre_lugar, lat_negocio, lon_negocio, avisos=None):
+    """Arma las filas de resultado (con el índice del inventario) para un lugar de búsqueda.
+    Las filas que no se pueden armar se omiten y se anotan en `avisos`"""
+    resultados = []
+    etiquetas = []
+    for (etiqueta, row), distancia in zip(df_filas.iterrows(), distancias):
+        try:
+            lat_raw, lon_raw = row["LATITUD_DECIMAL"], row["LONGITUD_DECIMAL"]
+            tarifa_val = row["TARIFA"]
+            
+            maps_url = f"https://www.google.com/maps/place/{lat_raw},{lon_raw}"
+            street_view_url = f"https://www.google.com/maps/@?api=1&map_action=pano&viewpoint={lat_raw},{lon_raw}"
+
+            resultados.append({
+                "CIUDAD": row.get("CIUDAD"), "CLAVE": row.get("CLAVE"), "DIRECCION": row.get("DIRECCION"),
+                "VISTA": row.get("VISTA"), "TIPO": row.get("TIPO"), "BASE": row.get("BASE"),
+                "ALTURA": row.get("ALTURA"), "AREA": row.get("AREA"), "LATITUD": lat_raw,
+                "LONGITUD": lon_raw, "DISTANCIA_KM": round(float(distancia), 2),
+                "TARIFA_PUBLICO": f"${tarifa_val:,.2f}", "IMPRESION": row.get("IMPRESION"),
+                "INSTALACION": row.get("INSTALACION"), "COSTO": row.get("IMPRESION+INSTALACION"),
+                "MAPS_": maps_url,
+                "STREET_VIEW": street_view_url,
+                "PROVEEDOR": row.get("PROVEEDOR"), "TELEFONO_PROVEEDOR": row.get("TELÉFONO PROVEEDOR"),
+                "LUGAR_BUSQUEDA": nombre_lugar if nombre_lugar else "Principal",
+                "LAT_NEGOCIO": lat_negocio,
+                "LON_NEGOCIO": lon_negocio
+            })
+            etiquetas.append(etiqueta)
+        except Exception as e:
+            if avisos is not None:
+                avisos.append(f"Error al procesar fila: {e}")
+    
+    return pd.DataFrame(resultados, index=etiquetas)
+
+def preparar_candidatos(df_uploaded, lugares, radio_km, presupuesto_min, presupuesto_max, tipos_seleccionados, indice_espacial=None):
+    """Filas del inventario normalizado que pueden caer en el radio de algún lugar"""
+    # El inventario normalizado se calcula una vez por archivo; aquí solo se filtra
+    if "COORDENADA_VALIDA" not in df_uploaded.columns:
+        df_uploaded = normalizar_inventario(df_uploaded)
+    
+    # Con índice espacial solo se revisan las celdas que tocan algún radio
+    if indice_espacial is not None:
+        posiciones = [consultar_indice(indice_espacial, lugar["lat"], lugar["lon"], radio_km) for lugar in lugares]
+        df_uploaded = df_uploaded.iloc[np.unique(np.concatenate(posiciones))]
+    
+    candidatos = filtrar_candidatos(df_uploaded, presupuesto_min, presupuesto_max, tipos_seleccionados)
+    return df_uploaded[candidatos]
+
+def procesar_busqueda_individual(df_uploaded, lat_negocio, lon_negocio, radio_km, presupuesto_min, presupuesto_max, tipos_seleccionados, nombre_lugar="", indice_espacial=None, avisos=None):
+    lugar = {"nombre": nombre_lugar, "lat": lat_negocio, "lon": lon_negocio}
+    df_copy = preparar_candidatos(df_uploaded, [lugar], radio_km, presupuesto_min, presupuesto_max, tipos_seleccionados, indice_espacial)
+    
+    # Distancias de todo el inventario en una sola llamada; el borde se verifica con geodesic
+    posiciones, distancias = filtrar_por_radio(
+        lat_negocio, lon_negocio,
+        df_copy["LATITUD_DECIMAL"].to_numpy(dtype=float),
+        df_copy["LONGITUD_DECIMAL"].to_numpy(dtype=float),
+        radio_km
+    )
+    
+    return construir_resultados(df_copy.iloc[posiciones], distancias, nombre_lugar, lat_negocio, lon_negocio, avisos).reset_index(drop=True)
+
+def procesar_busqueda_multiple(df_uploaded, lugares, radio_km, presupuesto_min, presupuesto_max, tipos_seleccionados, indice_espacial=None, avisos=None, medidor=None):
+    """Busca alrededor de todos los lugares en una sola pasada (matriz lugares x inventario).
+
+    Devuelve (busqueda_combinada, resultados_por_lugar, referencias). En la combinada cada
+    cara aparece una vez, atribuida a su lugar más cercano, y LUGARES_EN_RADIO lista todos
+    los lugares en cuyo radio cae. resultados_por_lugar guarda, por nombre, las caras de cada
+    lugar. referencias tiene, por fila de la combinada, su posición en `df_uploaded` ("filas")
+    y el índice de su lugar ("lugar"), para guardarla en el historial sin copiarla.
+    Con `medidor` (rendimiento.py) se mide cada etapa por separado.
+    """
+    with etapa(medidor, "candidatos", len(df_uploaded)) as medicion:
+        df_copy = preparar_candidatos(df_uploaded, lugares, radio_km, presupuesto_min, presupuesto_max, tipos_seleccionados, indice_espacial)
+        medicion["filas_salida"] = len(df_copy)
+    
+    with etapa(medidor, "distancias", len(df_copy)) as medicion:
+        dentro, distancias = filtrar_por_radio_multiple(
+            [lugar["lat"] for lugar in lugares],
+            [lugar["lon"] for lugar in lugares],
+            df_copy["LATITUD_DECIMAL"].to_numpy(dtype=float),
+            df_copy["LONGITUD_DECIMAL"].to_numpy(dtype=float),
+            radio_km
+        )
+        medicion["filas_salida"] = int(dentro.any(axis=0).sum())
+    return _armar_busqueda_multiple(df_uploaded, df_copy, dentro, distancias, lugares, avisos, medidor)
+
+def procesar_busqueda_multiple_en_cache(df_uploaded, lugares, radio_km, presupuesto_min, presupuesto_max, tipos_seleccionados,
+                                        cache, inventario_hash, indice_espacial=None, avisos=None, medidor=None):
+    """Lo mismo que procesar_busqueda_multiple, pero con las distancias de cada lugar
+    tomadas de `cache` (cache_distancias.py): cambiar radio, presupuesto o tipos ya no
+    vuelve a calcular distancias. Con radios mayores a RADIO_CACHE_KM (o un inventario sin
+    normalizar) se hace la búsqueda completa.
+    """
+    if radio_km > RADIO_CACHE_KM or "COORDENADA_VALIDA" not in df_uploaded.columns:
+        return procesar_busqueda_multiple(df_uploaded, lugares, radio_km, presupuesto_min, presupuesto_max,
+                                          tipos_seleccionados, indice_espacial, avisos, medidor)
+    with etapa(medidor, "distancias_cache", len(df_uploaded)) as medicion:
+        entradas = [distancias_lugar(cache, inventario_hash, df_uploaded, indice_espacial, lugar["lat"], lugar["lon"])
+                    for lugar in lugares]
+        cerca = np.unique(np.concatenate([posiciones_cerca(entrada, radio_km) for entrada in entradas]))
+        medicion["filas_salida"] = len(cerca)
+    
+    # Presupuesto y tipos se revisan solo en las caras que pueden caer en algún radio
+    with etapa(medidor, "candidatos", len(cerca)) as medicion:
+        permitidas = cerca[filtrar_candidatos(df_uploaded.iloc[cerca], presupuesto_min, presupuesto_max, tipos_seleccionados)]
+        medicion["filas_salida"] = len(permitidas)
+    
+    with etapa(medidor, "distancias", len(permitidas)) as medicion:
+        cortes = [cortar_radio(entrada, radio_km, permitidas) for entrada in entradas]
+        posiciones = np.unique(np.concatenate([filas for filas, _ in cortes]))
+        df_copy = df_uploaded.iloc[posiciones]
+        dentro = np.zeros((len(lugares), len(posiciones)), dtype=bool)
+        distancias = np.full((len(lugares), len(posiciones)), np.inf)
+        for i, (filas, distancias_corte) in enumerate(cortes):
+            columnas = np.searchsorted(posiciones, filas)
+            dentro[i, columnas] = True
+            distancias[i, columnas] = distancias_corte
+        medicion["filas_salida"] = len(posiciones)
+    return _armar_busqueda_multiple(df_uploaded, df_copy, dentro, distancias, lugares, avisos, medidor)
+
+def _armar_busqueda_multiple(df_uploaded, df_copy, dentro, distancias, lugares, avisos=None, medidor=None):
+    """Resultados de la búsqueda múltiple a partir de la matriz lugares x candidatos"""
+    # En empate gana el primer lugar, como en la búsqueda anterior
+    lugar_cercano = pd.Series(np.argmin(np.where(dentro, distancias, np.inf), axis=0), index=df_copy.index)
+    nombres = [lugar["nombre"] if lugar["nombre"] else "Principal" for lugar in lugares]
+    lugares_en_radio = pd.Series(
+        [", ".join(nombres[i] for i in np.flatnonzero(columna)) for columna in dentro.T],
+        index=df_copy.index, dtype=object
+    )
+    
+    resultados_por_lugar = {}
+    partes_combinada = []
+    with etapa(medidor, "armar_resultados", int(dentro.sum())) as medicion:
+        for i, lugar in enumerate(lugares):
+            filas = np.flatnonzero(dentro[i])
+            df_lugar = construir_resultados(df_copy.iloc[filas], distancias[i, filas], lugar["nombre"], lugar["lat"], lugar["lon"], avisos)
+            if df_lugar.empty:
+                continue
+            partes_combinada.append(df_lugar[lugar_cercano.loc[df_lugar.index].to_numpy() == i])
+            resultados_por_lugar[lugar["nombre"]] = df_lugar.reset_index(drop=True)
+        medicion["filas_salida"] = sum(len(parte) for parte in partes_combinada)
+    
+    if not partes_combinada:
+        return pd.DataFrame(), resultados_por_lugar, {"filas": np.array([], dtype=int), "lugar": np.array([], dtype=int)}
+    busqueda_combinada = pd.concat(partes_combinada)
+    busqueda_combinada["LUGARES_EN_RADIO"] = lugares_en_radio.loc[busqueda_combinada.index]
+    
+    # Claves repetidas en el inventario: se conserva la más cercana
+    orden = np.argsort(busqueda_combinada["DISTANCIA_KM"].to_numpy(), kind="stable")
+    repetidas = busqueda_combinada["CLAVE"].iloc[orden].duplicated().to_numpy()
+    busqueda_combinada = busqueda_combinada.iloc[np.sort(orden[~repetidas])]
+    referencias = {
+        "filas": df_uploaded.index.get_indexer(busqueda_combinada.index),
+        "lugar": lugar_cercano.loc[busqueda_combinada.index].to_numpy(),
+    }
+    return busqueda_combinada.reset_index(drop=True), resultados_por_lugar, referencias
+
+def filas_de_consulta(entrada, filas, df_uploaded, avisos=None):
+    """Vuelve a armar desde el inventario las filas `filas` de una consulta del historial,
+    con las mismas columnas y en el mismo orden que la búsqueda combinada"""
+    partes = []
+    for i, lugar in enumerate(entrada["lugares_busqueda"]):
+        del_lugar = filas[entrada["lugar_fila"][filas] == i]
+        if len(del_lugar) == 0:
+            continue
+        parte = construir_resultados(
+            df_uploaded.iloc[entrada["filas"][del_lugar]], entrada["distancias"][del_lugar],
+            lugar["nombre"], lugar["lat"], lugar["lon"], avisos
+        ).reset_index(drop=True)
+        parte["LUGARES_EN_RADIO"] = pd.Series(
+            [entrada["textos_en_radio"][codigo] for codigo in entrada["codigos_en_radio"][del_lugar]],
+            index=parte.index, dtype=object
+        )
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+# ================================
+# Los N mejores (k más cercanos / mejor puntaje)
+# ================================
+
+# En lugar de "todo dentro del radio" se piden las N caras mejor ordenadas alrededor de
+# cada lugar, sin adivinar un radio. El radio se va duplicando sobre el índice espacial
+# y se deja de buscar en cuanto ninguna cara más lejana puede entrar a las N mejores.
+CRITERIOS_ORDEN = ("distancia", "tarifa", "puntaje")
+RADIO_MAXIMO_KM = 50.0
+RADIO_INICIAL_KM = 2.0
+
+def _pesos_criterio(criterio, peso_distancia):
+    """(peso de la distancia, peso de la tarifa) del puntaje a minimizar"""
+    if criterio == "distancia":
+        return 1.0, 0.0
+    if criterio == "tarifa":
+        return 0.0, 1.0
+    if criterio == "puntaje":
+        peso = min(max(float(peso_distancia), 0.0), 1.0)
+        return peso, 1.0 - peso
+    raise ValueError(f"Criterio de orden no soportado: {criterio}")
+
+def mejores_posiciones(df_normalizado, lat, lon, cuantos, candidatos, tarifas, indice_espacial=None,
+                       criterio="distancia", peso_distancia=0.5, radio_max_km=RADIO_MAXIMO_KM, escala_tarifa=None):
+    """Posiciones (en `df_normalizado`) y distancias de las `cuantos` mejores caras alrededor
+    de (lat, lon), de la mejor a la peor.
+
+    `candidatos` es la máscara de filas que pasan los filtros y `tarifas` la tarifa de cada
+    fila. El puntaje es peso_d * distancia / radio_max_km + peso_t * tarifa / escala_tarifa
+    (solo distancia o solo tarifa según `criterio`; sin escala se usa la tarifa más alta de
+    los candidatos); en empate gana la más cercana. Las
+    caras más lejanas que el radio revisado tienen puntaje de al menos
+    peso_d * radio / radio_max_km, así que al llenar las N con puntajes por debajo de esa
+    cota se termina sin revisar más celdas. Ordenar solo por tarifa revisa todo radio_max_km.
+    """
+    peso_d, peso_t = _pesos_criterio(criterio, peso_distancia)
+    if cuantos <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    if escala_tarifa is None or not np.isfinite(escala_tarifa) or escala_tarifa <= 0:
+        escala_tarifa = np.nanmax(tarifas[candidatos], initial=0.0) or 1.0
+    latitudes = df_normalizado["LATITUD_DECIMAL"].to_numpy(dtype=float)
+    longitudes = df_normalizado["LONGITUD_DECIMAL"].to_numpy(dtype=float)
+
+    # Montículo de máximos (puntajes negados) con las mejores N vistas hasta ahora
+    monticulo = []
+    vistas = np.zeros(len(df_normalizado), dtype=bool)
+    radio = min(RADIO_INICIAL_KM, radio_max_km) if indice_espacial is not None else radio_max_km
+    while True:
+        if indice_espacial is not None:
+            posiciones = consultar_indice(indice_espacial, lat, lon, radio)
+        else:
+            posiciones = np.arange(len(df_normalizado))
+        posiciones = posiciones[candidatos[posiciones] & ~vistas[posiciones]]
+        vistas[posiciones] = True
+
+        # Mismo corte que la búsqueda por radio: a menos de radio_max_km según geodesic
+        dentro, distancias = filtrar_por_radio(lat, lon, latitudes[posiciones], longitudes[posiciones],
+                                               radio_max_km, exacto=False)
+        posiciones = posiciones[dentro]
+        puntajes = peso_d * distancias / radio_max_km
+        if peso_t > 0:
+            # Sin tarifa la cara queda al final
+            tarifa = tarifas[posiciones]
+            puntajes = puntajes + peso_t * np.where(np.isnan(tarifa), np.inf, tarifa) / escala_tarifa
+        utiles = np.ones(len(posiciones), dtype=bool)
+        if len(monticulo) == cuantos:
+            utiles &= puntajes <= -monticulo[0][0]
+        for i in np.flatnonzero(utiles):
+            elemento = (-puntajes[i], -distancias[i], -int(posiciones[i]))
+            if len(monticulo) < cuantos:
+                heapq.heappush(monticulo, elemento)
+            elif elemento > monticulo[0]:
+                heapq.heapreplace(monticulo, elemento)
+
+        if radio >= radio_max_km:
+            break
+        if len(monticulo) == cuantos and -monticulo[0][0] <= peso_d * radio / radio_max_km:
+            break
+        radio = min(radio * 2, radio_max_km)
+
+    mejores = sorted(monticulo, reverse=True)
+    posiciones = np.array([-posicion for _, _, posicion in mejores], dtype=np.int64)
+    # Misma DISTANCIA_KM que la búsqueda por radio
+    distancias = np.array([geodesic((lat, lon), (latitudes[j], longitudes[j])).km for j in posiciones])
+    return posiciones, distancias
+
+def _filtros_mejores(df_uploaded, presupuesto_min, presupuesto_max, tipos_seleccionados):
+    """(inventario normalizado, máscara de candidatos, tarifas, escala de tarifa)"""
+    if "COORDENADA_VALIDA" not in df_uploaded.columns:
+        df_uploaded = normalizar_inventario(df_uploaded)
+    candidatos = filtrar_candidatos(df_uploaded, presupuesto_min, presupuesto_max, tipos_seleccionados)
+    if "TARIFA" in df_uploaded.columns:
+        tarifas = pd.to_numeric(df_uploaded["TARIFA"], errors="coerce").to_numpy(dtype=float)
+    else:
+        tarifas = np.zeros(len(df_uploaded))
+    # La tarifa se escala con la más cara que pasa los filtros (no con el presupuesto, que puede ser enorme)
+    escala_tarifa = float(np.nanmax(tarifas[candidatos], initial=0.0)) or 1.0
+    return df_uploaded, candidatos, tarifas, escala_tarifa
+
+def procesar_busqueda_mejores(df_uploaded, lat_negocio, lon_negocio, cuantos, presupuesto_min, presupuesto_max, tipos_seleccionados,
+                              nombre_lugar="", indice_espacial=None, criterio="distancia", peso_distancia=0.5,
+                              radio_max_km=RADIO_MAXIMO_KM, avisos=None):
+    """Las `cuantos` mejores caras de un lugar, con las mismas columnas que procesar_busqueda_individual"""
+    df_uploaded, candidatos, tarifas, escala = _filtros_mejores(df_uploaded, presupuesto_min, presupuesto_max, tipos_seleccionados)
+    posiciones, distancias = mejores_posiciones(
+        df_uploaded, lat_negocio, lon_negocio, cuantos, candidatos, tarifas, indice_espacial,
+        criterio, peso_distancia, radio_max_km, escala
+    )
+    return construir_resultados(df_uploaded.iloc[posiciones], distancias, nombre_lugar, lat_negocio, lon_negocio, avisos).reset_index(drop=True)
+
+def procesar_busqueda_mejores_multiple(df_uploaded, lugares, cuantos, presupuesto_min, presupuesto_max, tipos_seleccionados,
+                                       indice_espacial=None, criterio="distancia", peso_distancia=0.5,
+                                       radio_max_km=RADIO_MAXIMO_KM, avisos=None, medidor=None):
+    """Las `cuantos` mejores caras de cada lugar; devuelve lo mismo que procesar_busqueda_multiple.
+
+    resultados_por_lugar conserva el orden del criterio. En la combinada cada cara aparece
+    una vez, atribuida al lugar más cercano de entre los que la eligieron, y
+    LUGARES_EN_RADIO lista esos lugares.
+    """
+    with etapa(medidor, "candidatos", len(df_uploaded)) as medicion:
+        df_normalizado, candidatos, tarifas, escala = _filtros_mejores(df_uploaded, presupuesto_min, presupuesto_max, tipos_seleccionados)
+        medicion["filas_salida"] = int(candidatos.sum())
+
+    with etapa(medidor, "mejores_por_lugar", int(candidatos.sum())) as medicion:
+        elegidas = [
+            mejores_posiciones(df_normalizado, lugar["lat"], lugar["lon"], cuantos, candidatos, tarifas, indice_espacial,
+                               criterio, peso_distancia, radio_max_km, escala)
+            for lugar in lugares
+        ]
+        medicion["filas_salida"] = sum(len(posiciones) for posiciones, _ in elegidas)
+
+    # Por fila elegida: lugar más cercano (en empate el primero) y todos los que la eligieron
+    lugar_cercano = {}
+    en_lugares = {}
+    for i, (posiciones, distancias) in enumerate(elegidas):
+        for posicion, distancia in zip(posiciones, distancias):
+            if posicion not in lugar_cercano or distancia < lugar_cercano[posicion][1]:
+                lugar_cercano[posicion] = (i, distancia)
+            en_lugares.setdefault(posicion, []).append(i)
+    nombres = [lugar["nombre"] if lugar["nombre"] else "Principal" for lugar in lugares]
+
+    resultados_por_lugar = {}
+    partes_combinada = []
+    filas_combinada = []
+    with etapa(medidor, "armar_resultados", len(lugar_cercano)) as medicion:
+        for i, (lugar, (posiciones, distancias)) in enumerate(zip(lugares, elegidas)):
+            df_lugar = construir_resultados(df_normalizado.iloc[posiciones], distancias, lugar["nombre"], lugar["lat"], lugar["lon"], avisos)
+            if df_lugar.empty:
+                continue
+            armadas = df_normalizado.index.get_indexer(df_lugar.index)
+            propias = np.array([lugar_cercano[posicion][0] == i for posicion in armadas], dtype=bool)
+            parte = df_lugar[propias].copy()
+            parte["LUGARES_EN_RADIO"] = pd.Series(
+                [", ".join(nombres[j] for j in en_lugares[posicion]) for posicion in armadas[propias]],
+                index=parte.index, dtype=object
+            )
+            partes_combinada.append(parte)
+            filas_combinada.append(armadas[propias])
+            resultados_por_lugar[lugar["nombre"]] = df_lugar.reset_index(drop=True)
+        medicion["filas_salida"] = sum(len(parte) for parte in partes_combinada)
+
+    if not partes_combinada:
+        return pd.DataFrame(), resultados_por_lugar, {"filas": np.array([], dtype=int), "lugar": np.array([], dtype=int)}
+    busqueda_combinada = pd.concat(partes_combinada)
+    filas = np.concatenate(filas_combinada)
+
+    # Claves repetidas en el inventario: se conserva la más cercana
+    orden = np.argsort(busqueda_combinada["DISTANCIA_KM"].to_numpy(), kind="stable")
+    repetidas = busqueda_combinada["CLAVE"].iloc[orden].duplicated().to_numpy()
+    conservar = np.sort(orden[~repetidas])
+    busqueda_combinada = busqueda_combinada.iloc[conservar]
+    filas = filas[conservar]
+    referencias = {
+        "filas": filas,
+        "lugar": np.array([lugar_cercano[posicion][0] for posicion in filas], dtype=int),
+    }
+    return busqueda_combinada.reset_index(drop=True), resultados_por_lugar, referencias
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+import numpy as np
+from geopy.distance import geodesic
+
+from distancias import calcular_distancias, TOLERANCIA_RELATIVA, TOLERANCIA_ABSOLUTA_KM, _cerca_de_redondeo
+from indice_espacial import consultar_indice
+
+# ================================
+# Caché de distancias por lugar
+# ================================
+
+# Por cada lugar se guardan, ordenadas de la más cercana a la más lejana, las caras
+# válidas hasta RADIO_CACHE_KM (el máximo del slider) con su distancia elipsoidal. Un
+# cambio de radio es un corte con búsqueda binaria y presupuesto/tipos son máscaras, así
+# que solo se vuelve a calcular cuando cambian las coordenadas del lugar o el inventario.
+# Como en filtrar_por_radio, la distancia geodesic se calcula solo para las caras cerca
+# del corte o de un cambio de redondeo a 2 decimales (la primera vez que hace falta, y se
+# guarda para los siguientes); las demás se quedan con la elipsoidal.
+RADIO_CACHE_KM = 50.0
+MAXIMO_LUGARES = 16
+
+def crear_cache_distancias(maximo=MAXIMO_LUGARES):
+    """Caché LRU {(lat, lon): distancias ordenadas} de un solo inventario"""
+    return {"inventario": None, "lugares": OrderedDict(), "maximo": maximo}
+
+def _margen(radio_km):
+    # El mismo margen que filtrar_por_radio_multiple con el modo elipsoidal
+    return radio_km * TOLERANCIA_RELATIVA["elipsoidal"] + TOLERANCIA_ABSOLUTA_KM
+
+def _ordenar_lugar(df_normalizado, indice_espacial, lat, lon):
+    """Caras válidas hasta RADIO_CACHE_KM de (lat, lon), ordenadas por distancia"""
+    if indice_espacial is not None:
+        posiciones = consultar_indice(indice_espacial, lat, lon, RADIO_CACHE_KM)
+    else:
+        posiciones = np.arange(len(df_normalizado))
+    validas = df_normalizado["COORDENADA_VALIDA"].to_numpy(dtype=bool)
+    posiciones = posiciones[validas[posiciones]]
+    latitudes = df_normalizado["LATITUD_DECIMAL"].to_numpy(dtype=float)[posiciones]
+    longitudes = df_normalizado["LONGITUD_DECIMAL"].to_numpy(dtype=float)[posiciones]
+    aproximadas = calcular_distancias(lat, lon, latitudes, longitudes)
+    cerca = aproximadas < RADIO_CACHE_KM + _margen(RADIO_CACHE_KM)
+    orden = np.argsort(aproximadas[cerca], kind="stable")
+    return {
+        "lat": lat,
+        "lon": lon,
+        "posiciones": posiciones[cerca][orden],
+        "latitudes": latitudes[cerca][orden],
+        "longitudes": longitudes[cerca][orden],
+        "aproximadas": aproximadas[cerca][orden],
+        "exactas": np.full(int(cerca.sum()), np.nan),
+    }
+
+def distancias_lugar(cache, inventario_hash, df_normalizado, indice_espacial, lat, lon):
+    """Entrada de la caché para (lat, lon); si cambió el inventario se vacía la caché"""
+    if cache["inventario"] != inventario_hash:
+        cache["lugares"].clear()
+        cache["inventario"] = inventario_hash
+    clave = (float(lat), float(lon))
+    lugares = cache["lugares"]
+    if clave in lugares:
+        lugares.move_to_end(clave)
+        return lugares[clave]
+    entrada = _ordenar_lugar(df_normalizado, indice_espacial, clave[0], clave[1])
+    lugares[clave] = entrada
+    while len(lugares) > cache["maximo"]:
+        lugares.popitem(last=False)
+    return entrada
+
+def _corte(entrada, radio_km):
+    if radio_km > RADIO_CACHE_KM:
+        raise ValueError(f"La caché de distancias llega a {RADIO_CACHE_KM:g} km; se pidieron {radio_km:g} km")
+    return np.searchsorted(entrada["aproximadas"], radio_km + _margen(radio_km), side="left")
+
+def posiciones_cerca(entrada, radio_km):
+    """Posiciones que pueden caer dentro de `radio_km` (búsqueda binaria sobre las aproximadas)"""
+    return entrada["posiciones"][:_corte(entrada, radio_km)]
+
+def cortar_radio(entrada, radio_km, permitidas=None):
+    """(posiciones, distancias) de las caras a menos de `radio_km`, ordenadas por la
+    distancia aproximada. Da las mismas caras y DISTANCIA_KM que filtrar_por_radio con
+    exacto=True.
+
+    `permitidas` (posiciones ordenadas, por ejemplo las que pasan presupuesto y tipos)
+    limita el resultado; geodesic solo se calcula para esas.
+    """
+    corte = _corte(entrada, radio_km)
+    revisar = np.arange(corte)
+    if permitidas is not None:
+        revisar = revisar[np.isin(entrada["posiciones"][:corte], permitidas, assume_unique=True)]
+    aproximadas = entrada["aproximadas"][revisar]
+    # Las mismas filas que filtrar_por_radio_multiple manda a geodesic
+    exacta = (aproximadas >= radio_km - _margen(radio_km)) | _cerca_de_redondeo(aproximadas, "elipsoidal")
+    exactas = entrada["exactas"]
+    for j in revisar[exacta & np.isnan(exactas[revisar])]:
+        exactas[j] = geodesic((entrada["lat"], entrada["lon"]), (entrada["latitudes"][j], entrada["longitudes"][j])).km
+    distancias = np.where(exacta, exactas[revisar], aproximadas)
+    dentro = distancias < radio_km
+    return entrada["posiciones"][revisar[dentro]], distancias[dentro]
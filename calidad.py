@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# ================================
+# Calidad de coordenadas por cara
+# ================================
+
+# Se calcula una vez al normalizar el inventario (inventario.normalizar_inventario) y
+# queda como columnas del DataFrame: búsqueda, índice espacial, mapa y diagnóstico leen
+# estas columnas en lugar de volver a revisar cada fila.
+#   FORMATO_LAT / FORMATO_LON  formato detectado en el texto original
+#   INVERTIDA                  latitud y longitud venían intercambiadas
+#   AJUSTE_UTM                 algún valor se reescaló (venía como entero tipo UTM)
+#   COORDENADA_VALIDA          se puede ubicar en el mapa
+#   MOTIVO_COORDENADA          código del motivo (MOTIVOS)
+MOTIVOS = {
+    "ok": "Coordenada válida",
+    "sin_coordenada": "Latitud o longitud vacía",
+    "no_interpretable": "No se pudo interpretar el formato",
+    "latitud_fuera_de_rango": "Latitud fuera de -90 a 90",
+    "longitud_fuera_de_rango": "Longitud fuera de -180 a 180",
+}
+COLUMNAS_CALIDAD = ["FORMATO_LAT", "FORMATO_LON", "INVERTIDA", "AJUSTE_UTM", "COORDENADA_VALIDA", "MOTIVO_COORDENADA"]
+
+def motivos_coordenada(formato_lat, formato_lon, latitudes, longitudes):
+    """Código de MOTIVOS por fila; el primero que aplica en el orden del diccionario"""
+    formato_lat = np.asarray(formato_lat, dtype=object)
+    formato_lon = np.asarray(formato_lon, dtype=object)
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    with np.errstate(invalid="ignore"):
+        condiciones = [
+            (formato_lat == "vacía") | (formato_lon == "vacía"),
+            np.isnan(latitudes) | np.isnan(longitudes),
+            ~((latitudes >= -90) & (latitudes <= 90)),
+            ~((longitudes >= -180) & (longitudes <= 180)),
+        ]
+    return np.select(condiciones, list(MOTIVOS)[1:], default="ok").astype(object)
+
+def columnas_calidad(formato_lat, formato_lon, invertidas, ajuste_utm, latitudes, longitudes):
+    """Las columnas de COLUMNAS_CALIDAD como {nombre: arreglo o Categorical}"""
+    motivos = motivos_coordenada(formato_lat, formato_lon, latitudes, longitudes)
+    return {
+        "FORMATO_LAT": pd.Categorical(formato_lat),
+        "FORMATO_LON": pd.Categorical(formato_lon),
+        "INVERTIDA": np.asarray(invertidas, dtype=bool),
+        "AJUSTE_UTM": np.asarray(ajuste_utm, dtype=bool),
+        "COORDENADA_VALIDA": motivos == "ok",
+        # Todas las categorías siempre, para que los bloques se unan sin convertir
+        "MOTIVO_COORDENADA": pd.Categorical(motivos, categories=list(MOTIVOS)),
+    }
+
+def tiene_calidad(df):
+    return all(columna in df.columns for columna in COLUMNAS_CALIDAD)
+
+def resumen_calidad(df, proveedores=None):
+    """Resumen de calidad del inventario (o de los proveedores indicados).
+
+    Devuelve {"caras", "validas", "invertidas", "ajuste_utm", "por_motivo", "por_proveedor",
+    "por_formato"}; los tres últimos son DataFrames listos para mostrar.
+    """
+    if proveedores and "PROVEEDOR" in df.columns:
+        df = df[df["PROVEEDOR"].isin(proveedores).to_numpy()]
+    motivo = df["MOTIVO_COORDENADA"]
+    por_motivo = motivo.value_counts(sort=False).reindex(list(MOTIVOS), fill_value=0)
+    por_motivo = pd.DataFrame({
+        "Motivo": list(MOTIVOS), "Descripción": list(MOTIVOS.values()), "Caras": por_motivo.to_numpy()
+    })
+    por_motivo = por_motivo[por_motivo["Caras"] > 0]
+
+    if "PROVEEDOR" in df.columns:
+        proveedor = df["PROVEEDOR"].astype(object).fillna("(sin proveedor)").to_numpy()
+        tabla = pd.DataFrame({
+            "Proveedor": proveedor,
+            "Caras": 1,
+            "Válidas": df["COORDENADA_VALIDA"].to_numpy(dtype=int),
+            "Invertidas": df["INVERTIDA"].to_numpy(dtype=int),
+            "Ajuste UTM": df["AJUSTE_UTM"].to_numpy(dtype=int),
+        })
+        por_proveedor = tabla.groupby("Proveedor", sort=True).sum().reset_index()
+        por_proveedor["% válidas"] = (100 * por_proveedor["Válidas"] / por_proveedor["Caras"]).round(1)
+    else:
+        por_proveedor = pd.DataFrame()
+
+    por_formato = pd.DataFrame({
+        "Formato latitud": df["FORMATO_LAT"].astype(object).to_numpy(),
+        "Formato longitud": df["FORMATO_LON"].astype(object).to_numpy(),
+        "Caras": 1,
+    }).groupby(["Formato latitud", "Formato longitud"]).sum().reset_index().sort_values("Caras", ascending=False)
+
+    return {
+        "caras": len(df),
+        "validas": int(df["COORDENADA_VALIDA"].sum()),
+        "invertidas": int(df["INVERTIDA"].sum()),
+        "ajuste_utm": int(df["AJUSTE_UTM"].sum()),
+        "por_motivo": por_motivo,
+        "por_proveedor": por_proveedor,
+        "por_formato": por_formato,
+    }
+
+def caras_con_problemas(df, proveedores=None, maximo=None):
+    """Caras inválidas, invertidas o reescaladas con sus coordenadas originales y su registro de calidad"""
+    mascara = ~df["COORDENADA_VALIDA"].to_numpy(dtype=bool) | df["INVERTIDA"].to_numpy(dtype=bool) | df["AJUSTE_UTM"].to_numpy(dtype=bool)
+    if proveedores and "PROVEEDOR" in df.columns:
+        mascara &= df["PROVEEDOR"].isin(proveedores).to_numpy()
+    columnas = [columna for columna in ["CLAVE", "PROVEEDOR", "LATITUD", "LONGITUD", "LATITUD_DECIMAL", "LONGITUD_DECIMAL"]
+                if columna in df.columns] + COLUMNAS_CALIDAD
+    filas = np.flatnonzero(mascara)
+    if maximo is not None:
+        filas = filas[:maximo]
+    return df.iloc[filas][columnas], int(mascara.sum())
@@ -0,0 +1,205 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from calidad import COLUMNAS_CALIDAD
+from distancias import distancia_haversine, RADIO_MEDIO_KM
+from inventario import leer_inventario
+from texto import normalizar_texto, tokens, similitud_tokens
+
+# ================================
+# Consolidación de inventarios de varios proveedores
+# ================================
+
+# La misma cara física aparece con otra CLAVE y coordenadas un poco distintas en el
+# archivo de cada proveedor. Las caras se reparten en una rejilla métrica (hash espacial)
+# de celdas de DISTANCIA_DUPLICADO_M; solo se comparan caras de la misma celda o de una
+# vecina, así que el costo crece con el número de caras y no con su cuadrado. Un par es
+# duplicado si está a menos de DISTANCIA_DUPLICADO_M, sus direcciones se parecen
+# (SIMILITUD_DIRECCION_MINIMA) y su VISTA no se contradice. Por omisión no se comparan
+# caras del mismo proveedor: en su archivo, dos filas en el mismo punto son dos caras
+# del mismo espectacular.
+DISTANCIA_DUPLICADO_M = 30.0
+SIMILITUD_DIRECCION_MINIMA = 0.5
+# Columnas que agrega la normalización; no van en el CSV consolidado
+COLUMNAS_NORMALIZADAS = ["TARIFA", "LATITUD_DECIMAL", "LONGITUD_DECIMAL"] + COLUMNAS_CALIDAD
+# Metros por grado sobre la misma esfera que distancia_haversine
+METROS_POR_GRADO = RADIO_MEDIO_KM * 1000 * np.pi / 180
+# Celdas vecinas "hacia adelante": cada par de celdas se revisa una sola vez
+VECINAS = [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+DESPLAZAMIENTO_CELDA = 1 << 21
+
+def leer_inventarios(rutas, al_avanzar=None):
+    """Normaliza los CSV uno por uno (cada uno por bloques) y los une.
+
+    Agrega ARCHIVO_ORIGEN y ORDEN_ARCHIVO (posición del archivo en `rutas`, la prioridad
+    al elegir qué fila representa a un grupo de duplicados).
+    """
+    partes = []
+    for orden, ruta in enumerate(rutas):
+        with open(ruta, "rb") as archivo:
+            df = leer_inventario(archivo)
+        df["ARCHIVO_ORIGEN"] = os.path.basename(ruta)
+        df["ORDEN_ARCHIVO"] = orden
+        partes.append(df)
+        if al_avanzar is not None:
+            al_avanzar(ruta, len(df))
+    return pd.concat(partes, ignore_index=True)
+
+def _celdas(latitudes, longitudes, tamano_m):
+    """Clave entera de la celda de cada punto.
+
+    El ancho en longitud usa el coseno de la latitud más alejada del ecuador: así ninguna
+    celda mide menos de `tamano_m` y dos puntos a menos de esa distancia siempre quedan en
+    la misma celda o en una vecina.
+    """
+    coseno = max(np.cos(np.radians(np.abs(latitudes).max())), 1e-6) if len(latitudes) else 1.0
+    y = np.floor(latitudes * METROS_POR_GRADO / tamano_m).astype(np.int64)
+    x = np.floor(longitudes * METROS_POR_GRADO * coseno / tamano_m).astype(np.int64)
+    return x * DESPLAZAMIENTO_CELDA + y
+
+def pares_cercanos(latitudes, longitudes, distancia_m=DISTANCIA_DUPLICADO_M):
+    """(i, j, metros) de los pares de puntos a menos de `distancia_m`, con i < j.
+
+    Solo se comparan puntos de la misma celda o de celdas vecinas de la rejilla.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    celdas = _celdas(latitudes, longitudes, distancia_m)
+    orden = np.argsort(celdas, kind="stable")
+    celdas_ordenadas = celdas[orden]
+
+    todos_i, todos_j = [], []
+    for dx, dy in VECINAS:
+        vecina = celdas + dx * DESPLAZAMIENTO_CELDA + dy
+        desde = np.searchsorted(celdas_ordenadas, vecina, side="left")
+        cuantos = np.searchsorted(celdas_ordenadas, vecina, side="right") - desde
+        total = int(cuantos.sum())
+        if total == 0:
+            continue
+        i = np.repeat(np.arange(len(celdas)), cuantos)
+        dentro_del_tramo = np.arange(total) - np.repeat(np.cumsum(cuantos) - cuantos, cuantos)
+        j = orden[np.repeat(desde, cuantos) + dentro_del_tramo]
+        if (dx, dy) == (0, 0):
+            conservar = i < j
+            i, j = i[conservar], j[conservar]
+        todos_i.append(np.minimum(i, j))
+        todos_j.append(np.maximum(i, j))
+    if not todos_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    i, j = np.concatenate(todos_i), np.concatenate(todos_j)
+    metros = distancia_haversine(latitudes[i], longitudes[i], latitudes[j], longitudes[j]) * 1000
+    cerca = metros <= distancia_m
+    return i[cerca], j[cerca], metros[cerca]
+
+def _agrupar(n, pares_i, pares_j):
+    """Componente conexa de cada elemento (unión-búsqueda); devuelve la raíz de cada uno"""
+    padre = np.arange(n)
+
+    def raiz(a):
+        while padre[a] != a:
+            padre[a] = padre[padre[a]]
+            a = padre[a]
+        return a
+
+    for a, b in zip(pares_i.tolist(), pares_j.tolist()):
+        raiz_a, raiz_b = raiz(a), raiz(b)
+        if raiz_a != raiz_b:
+            # La raíz es el menor: el representante sale del archivo con más prioridad
+            padre[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+    raices = np.arange(n)
+    for a in np.unique(np.concatenate([pares_i, pares_j])).tolist():
+        raices[a] = raiz(a)
+    return raices
+
+def _normalizar_columna(serie):
+    """normalizar_texto sobre los valores distintos de la columna (proveedores y vistas se repiten mucho)"""
+    codigos, valores = pd.factorize(serie)
+    normalizados = np.append(normalizar_texto(pd.Series(valores, dtype=object)).to_numpy(dtype=object), "")
+    return normalizados[codigos]
+
+def detectar_duplicados(df, distancia_m=DISTANCIA_DUPLICADO_M, similitud_minima=SIMILITUD_DIRECCION_MINIMA,
+                        mismo_proveedor=False):
+    """Pares de filas de `df` (inventario normalizado) que son la misma cara.
+
+    Devuelve un DataFrame con FILA_A, FILA_B (posiciones), METROS y SIMILITUD_DIRECCION.
+    """
+    validas = np.flatnonzero(df["COORDENADA_VALIDA"].to_numpy(dtype=bool))
+    i, j, metros = pares_cercanos(
+        df["LATITUD_DECIMAL"].to_numpy(dtype=float)[validas], df["LONGITUD_DECIMAL"].to_numpy(dtype=float)[validas], distancia_m
+    )
+    i, j = validas[i], validas[j]
+
+    if not mismo_proveedor and "PROVEEDOR" in df.columns:
+        proveedor = _normalizar_columna(df["PROVEEDOR"])
+        distinto = proveedor[i] != proveedor[j]
+        i, j, metros = i[distinto], j[distinto], metros[distinto]
+    if "VISTA" in df.columns:
+        vista = _normalizar_columna(df["VISTA"])
+        compatible = (vista[i] == vista[j]) | (vista[i] == "") | (vista[j] == "")
+        i, j, metros = i[compatible], j[compatible], metros[compatible]
+
+    # Las direcciones se comparan solo para las filas que quedaron en algún par, y cada
+    # combinación de dos direcciones distintas una sola vez
+    filas = np.unique(np.concatenate([i, j]))
+    if "DIRECCION" in df.columns and len(filas):
+        codigos, direcciones = pd.factorize(df["DIRECCION"].iloc[filas].fillna(""))
+        palabras = [frozenset(tokens(direccion)) for direccion in normalizar_texto(pd.Series(direcciones, dtype=object))]
+        codigo_fila = np.empty(len(df), dtype=np.int64)
+        codigo_fila[filas] = codigos
+        combinaciones, inversa = np.unique(np.stack([codigo_fila[i], codigo_fila[j]], axis=1), axis=0, return_inverse=True)
+        similitud = np.array([similitud_tokens(palabras[a], palabras[b]) for a, b in combinaciones.tolist()])
+        similitud = similitud[inversa.ravel()] if len(similitud) else np.zeros(0)
+    else:
+        similitud = np.zeros(len(i))
+    duplicado = similitud >= similitud_minima
+    return pd.DataFrame({
+        "FILA_A": i[duplicado], "FILA_B": j[duplicado],
+        "METROS": metros[duplicado].round(1), "SIMILITUD_DIRECCION": similitud[duplicado].round(2),
+    })
+
+def consolidar(df, distancia_m=DISTANCIA_DUPLICADO_M, similitud_minima=SIMILITUD_DIRECCION_MINIMA, mismo_proveedor=False):
+    """Deja una fila por cara física.
+
+    `df` es la unión normalizada de leer_inventarios. De cada grupo de duplicados se
+    conserva la fila del primer archivo (y la primera dentro de él) junto con las demás de
+    su mismo proveedor, que son otras caras aunque el grupo las haya juntado. Devuelve
+    (consolidado, reporte): el consolidado tiene las columnas originales más
+    ARCHIVO_ORIGEN y GRUPO_DUPLICADOS; el reporte, una fila por cara de cada grupo.
+    """
+    pares = detectar_duplicados(df, distancia_m, similitud_minima, mismo_proveedor)
+    # Las filas vienen ordenadas por archivo, así que la raíz (la menor) es la de mayor prioridad
+    raices = _agrupar(len(df), pares["FILA_A"].to_numpy(), pares["FILA_B"].to_numpy())
+    tamano_grupo = np.bincount(raices, minlength=len(df))
+    en_grupo = tamano_grupo[raices] > 1
+    representantes = np.unique(raices[en_grupo])
+    numero_grupo = np.full(len(df), -1)
+    numero_grupo[representantes] = np.arange(1, len(representantes) + 1)
+    grupo = np.where(en_grupo, numero_grupo[raices], -1)
+
+    conservar = raices == np.arange(len(df))
+    if not mismo_proveedor and "PROVEEDOR" in df.columns:
+        proveedor = _normalizar_columna(df["PROVEEDOR"])
+        conservar |= en_grupo & (proveedor == proveedor[raices])
+    # Fuera las columnas agregadas y las que pandas nombra por una coma de más al final del encabezado
+    columnas = [columna for columna in df.columns
+                if columna not in COLUMNAS_NORMALIZADAS and columna != "ORDEN_ARCHIVO" and not str(columna).startswith("Unnamed:")]
+    consolidado = df.loc[conservar, columnas].reset_index(drop=True)
+    consolidado["GRUPO_DUPLICADOS"] = pd.array(np.where(grupo[conservar] > 0, grupo[conservar], pd.NA), dtype="Int64")
+
+    filas = np.flatnonzero(en_grupo)
+    filas = filas[np.lexsort((filas, grupo[filas]))]
+    representante = raices[filas]
+    metros = distancia_haversine(
+        df["LATITUD_DECIMAL"].to_numpy(dtype=float)[representante], df["LONGITUD_DECIMAL"].to_numpy(dtype=float)[representante],
+        df["LATITUD_DECIMAL"].to_numpy(dtype=float)[filas], df["LONGITUD_DECIMAL"].to_numpy(dtype=float)[filas]
+    ) * 1000
+    reporte = pd.DataFrame({"GRUPO_DUPLICADOS": grupo[filas], "CONSERVADA": conservar[filas]})
+    for columna in ["CLAVE", "PROVEEDOR", "ARCHIVO_ORIGEN", "DIRECCION", "VISTA", "TIPO", "TARIFA", "LATITUD_DECIMAL", "LONGITUD_DECIMAL"]:
+        if columna in df.columns:
+            reporte[columna] = df[columna].iloc[filas].to_numpy()
+    reporte["METROS_AL_REPRESENTANTE"] = metros.round(1)
+    if "CLAVE" in df.columns:
+        reporte["CLAVE_REPRESENTANTE"] = df["CLAVE"].iloc[representante].to_numpy()
+    return consolidado, reporte
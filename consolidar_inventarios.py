@@ -0,0 +1,52 @@
+"""Une los CSV de inventario de varios proveedores en uno solo sin caras duplicadas.
+
+Cada archivo se normaliza por bloques; las caras casi duplicadas (a menos de --metros,
+con direcciones parecidas y la misma vista) se buscan con una rejilla espacial, así que
+no se compara cada cara contra todas. El orden de los archivos es la prioridad: de cada
+grupo de duplicados se conserva la cara del primero. El reporte trae una fila por cara de
+cada grupo, con la clave que la representa en el consolidado.
+
+Uso: python consolidar_inventarios.py a.csv b.csv ... [--salida consolidado.csv]
+     [--reporte duplicados.csv] [--metros 30] [--similitud 0.5] [--mismo-proveedor]
+     [--publicar] [--almacen DIRECTORIO]
+"""
+import argparse
+import sys
+
+from almacen_inventario import DIRECTORIO_ALMACEN
+from consolidacion import DISTANCIA_DUPLICADO_M, SIMILITUD_DIRECCION_MINIMA, leer_inventarios, consolidar
+from publicar_inventario import publicar
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv", nargs="+")
+    parser.add_argument("--salida", default="consolidado.csv")
+    parser.add_argument("--reporte", default="duplicados.csv")
+    parser.add_argument("--metros", type=float, default=DISTANCIA_DUPLICADO_M)
+    parser.add_argument("--similitud", type=float, default=SIMILITUD_DIRECCION_MINIMA,
+                        help="Parecido mínimo de las direcciones (0 a 1)")
+    parser.add_argument("--mismo-proveedor", action="store_true",
+                        help="También busca duplicados dentro de un mismo proveedor")
+    parser.add_argument("--publicar", action="store_true", help="Publica el consolidado en el almacén")
+    parser.add_argument("--almacen", default=DIRECTORIO_ALMACEN)
+    args = parser.parse_args()
+
+    try:
+        df = leer_inventarios(args.csv, lambda ruta, filas: print(f"📄 {ruta}: {filas:,} caras"))
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    consolidado, reporte = consolidar(df, args.metros, args.similitud, args.mismo_proveedor)
+    consolidado.to_csv(args.salida, index=False, encoding="utf-8")
+    reporte.to_csv(args.reporte, index=False, encoding="utf-8")
+    grupos = reporte["GRUPO_DUPLICADOS"].nunique()
+    print(f"✅ {len(consolidado):,} caras en {args.salida} ({len(df) - len(consolidado):,} duplicadas quitadas, {grupos:,} grupos en {args.reporte})")
+
+    if args.publicar:
+        try:
+            hash_archivo = publicar(args.salida, args.almacen)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        print(f"✅ Inventario publicado: {hash_archivo}")
+
+if __name__ == "__main__":
+    main()
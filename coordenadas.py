@@ -0,0 +1,442 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# ================================
+# Interpretación de coordenadas (escalar)
+# ================================
+
+def analizar_formato_coordenada(coord_str):
+    if pd.isna(coord_str) or coord_str == "" or str(coord_str).strip() == "":
+        return "vacía", None, None, None
+    coord_str = str(coord_str).strip()
+    patron_grados_dir = r'(\d+)°\s*(\d+)\'\s*(\d+\.?\d*)\"\s*([NSWE])'
+    coincidencia = re.search(patron_grados_dir, coord_str, re.IGNORECASE)
+    if coincidencia:
+        grados = float(coincidencia.group(1))
+        minutos = float(coincidencia.group(2))
+        segundos = float(coincidencia.group(3))
+        direccion = coincidencia.group(4).upper()
+        decimal = grados + minutos/60 + segundos/3600
+        if direccion in ['S', 'W']: decimal = -decimal
+        return "grados_dir", decimal, direccion, None
+    patron_grados_sig = r'([+-]?\d+\.\d+)'
+    coincidencia = re.search(patron_grados_sig, coord_str)
+    if coincidencia:
+        decimal = float(coincidencia.group(1))
+        return "grados_sig", decimal, None, None
+    patron_dms = r'([+-]?\d+)\s+(\d+)\s+(\d+\.?\d*)'
+    coincidencia = re.search(patron_dms, coord_str)
+    if coincidencia:
+        grados = float(coincidencia.group(1))
+        minutos = float(coincidencia.group(2))
+        segundos = float(coincidencia.group(3))
+        decimal = abs(grados) + minutos/60 + segundos/3600
+        if grados < 0: decimal = -decimal
+        return "dms", decimal, None, None
+    patron_dm = r'([+-]?\d+)°\s*(\d+\.\d+)'
+    coincidencia = re.search(patron_dm, coord_str)
+    if coincidencia:
+        grados = float(coincidencia.group(1))
+        minutos = float(coincidencia.group(2))
+        decimal = abs(grados) + minutos/60
+        if grados < 0: decimal = -decimal
+        return "dm", decimal, None, None
+    if "," in coord_str and "." not in coord_str:
+        try:
+            coord_europeo = coord_str.replace(",", ".")
+            decimal = float(coord_europeo)
+            return "decimal_eu", decimal, None, None
+        except ValueError:
+            pass
+    if coord_str.count(",") >= 2:
+        try:
+            coord_sin_comas = coord_str.replace(",", "")
+            decimal = float(coord_sin_comas)
+            return "decimal_miles", decimal, None, None
+        except ValueError:
+            pass
+    try:
+        decimal = float(coord_str)
+        return "decimal", decimal, None, None
+    except ValueError:
+        pass
+    return "desconocido", None, None, None
+
+def ajustar_valor_utm(valor, es_latitud=True):
+    if valor is None: return None
+    valor_abs = abs(valor)
+    if es_latitud and (-90 <= valor <= 90): return valor
+    elif not es_latitud and (-180 <= valor <= 180): return valor
+    if valor_abs > 180:
+        if valor_abs >= 1000000000: divisor = 10000000
+        elif valor_abs >= 100000000: divisor = 1000000
+        elif valor_abs >= 10000000: divisor = 100000
+        elif valor_abs >= 1000000: divisor = 10000
+        elif valor_abs >= 100000: divisor = 1000
+        else: divisor = 1000
+        valor_ajustado = valor / divisor
+        if es_latitud and (-90 <= valor_ajustado <= 90): return valor_ajustado
+        elif not es_latitud and (-180 <= valor_ajustado <= 180): return valor_ajustado
+        else: return valor / (divisor * 10)
+    return valor
+
+def estandarizar_coordenada_universal(coord_str, formato, valor_raw=None, direccion=None, es_latitud=True):
+    if pd.isna(coord_str) or coord_str == "": return None
+    coord_str = str(coord_str).strip()
+    try:
+        if formato in ["grados_dir", "grados_sig", "dms", "dm"] and valor_raw is not None:
+            valor = valor_raw
+        elif formato == "decimal_eu":
+            valor = float(coord_str.replace(",", "."))
+        elif formato == "decimal_miles":
+            valor = float(coord_str.replace(",", ""))
+        elif formato == "decimal":
+            valor = float(coord_str)
+        elif formato == "desconocido":
+            numeros = re.findall(r'[+-]?\d+\.?\d*', coord_str)
+            valor = float(numeros[0]) if numeros else None
+        else:
+            valor = None
+        if valor is None: return None
+        return ajustar_valor_utm(valor, es_latitud)
+    except (ValueError, TypeError):
+        return None
+
+def detectar_inversion_universal(lat_str, lon_str):
+    formato_lat, valor_lat, dir_lat, _ = analizar_formato_coordenada(lat_str)
+    formato_lon, valor_lon, dir_lon, _ = analizar_formato_coordenada(lon_str)
+    if valor_lat is None or valor_lon is None: return False, formato_lat, formato_lon, ["no_analizable"]
+    valor_abs_lat, valor_abs_lon = abs(valor_lat), abs(valor_lon)
+    es_patron_utm_invertido = ((valor_abs_lat > 1000000 or valor_abs_lon > 1000000) and
+                              (valor_abs_lat < 1000000000 and valor_abs_lon < 1000000000) and
+                              (valor_lat < 0 and valor_lon > 0))
+    if es_patron_utm_invertido: return True, formato_lat, formato_lon, ["patron_utm_invertido"]
+    rango_lat_absoluto, rango_lon_absoluto = (-90, 90), (-180, 180)
+    lat_en_rango_valido = rango_lat_absoluto[0] <= valor_lat <= rango_lat_absoluto[1]
+    lon_en_rango_valido = rango_lon_absoluto[0] <= valor_lon <= rango_lon_absoluto[1]
+    direcciones_invertidas = (dir_lat in ['E', 'W'] and dir_lon in ['N', 'S']) if dir_lat and dir_lon else False
+    lat_podria_ser_lon = (rango_lon_absoluto[0] <= valor_lat <= rango_lon_absoluto[1] and not lat_en_rango_valido)
+    lon_podria_ser_lat = (rango_lat_absoluto[0] <= valor_lon <= rango_lat_absoluto[1] and not lon_en_rango_valido)
+    diferencia_magnitud = abs(abs(valor_lat) - abs(valor_lon))
+    lat_mayor_que_lon = abs(valor_lat) > abs(valor_lon) + 10
+    signos_atipicos = (valor_lat < 0 and valor_lon > 0)
+    criterios = []
+    if direcciones_invertidas: criterios.append("direcciones_cardinales")
+    if not lat_en_rango_valido and not lon_en_rango_valido and lat_podria_ser_lon and lon_podria_ser_lat: criterios.append("valores_fuera_de_rango")
+    if lat_mayor_que_lon and diferencia_magnitud > 20: criterios.append("diferencia_magnitud")
+    if signos_atipicos: criterios.append("signos_atipicos")
+    probable_inversion = len(criterios) >= 2
+    return probable_inversion, formato_lat, formato_lon, criterios
+
+def normalizar_fila_coordenadas(lat_original, lon_original):
+    """Normaliza un par latitud/longitud con las funciones escalares (referencia)"""
+    formato_lat, valor_lat, dir_lat, _ = analizar_formato_coordenada(lat_original)
+    formato_lon, valor_lon, dir_lon, _ = analizar_formato_coordenada(lon_original)
+    invertidas, f_lat_det, f_lon_det, criterios = detectar_inversion_universal(lat_original, lon_original)
+
+    if invertidas:
+        lat_corregida = estandarizar_coordenada_universal(lon_original, f_lon_det, valor_lon, dir_lon, True)
+        lon_corregida = estandarizar_coordenada_universal(lat_original, f_lat_det, valor_lat, dir_lat, False)
+    else:
+        lat_corregida = estandarizar_coordenada_universal(lat_original, formato_lat, valor_lat, dir_lat, True)
+        lon_corregida = estandarizar_coordenada_universal(lon_original, formato_lon, valor_lon, dir_lon, False)
+    return lat_corregida, lon_corregida
+
+# ================================
+# Motor de normalización por columnas
+# ================================
+
+# Mismos patrones que analizar_formato_coordenada, compilados una sola vez
+PATRON_GRADOS_DIR = re.compile(r'(\d+)°\s*(\d+)\'\s*(\d+\.?\d*)\"\s*([NSWE])', re.IGNORECASE)
+PATRON_GRADOS_SIG = re.compile(r'([+-]?\d+\.\d+)')
+PATRON_DMS = re.compile(r'([+-]?\d+)\s+(\d+)\s+(\d+\.?\d*)')
+PATRON_DM = re.compile(r'([+-]?\d+)°\s*(\d+\.\d+)')
+# Números que float() acepta sin ambigüedad; lo demás se resuelve con la ruta escalar
+PATRON_NUMERO_SIMPLE = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)')
+
+FORMATOS_COORDENADA = ["vacía", "grados_dir", "grados_sig", "dms", "dm", "decimal_eu", "decimal_miles", "decimal", "desconocido"]
+
+def _a_float(serie):
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float)
+
+# ================================
+# Perfil de formato por columna
+# ================================
+
+TAMANO_MUESTRA_PERFIL = 200
+
+def perfilar_columna(texto, tamano_muestra=TAMANO_MUESTRA_PERFIL):
+    """Clasifica una muestra repartida a lo largo de la columna y elige el formato dominante"""
+    if texto.empty:
+        return {"dominante": None, "muestra": {}}
+    posiciones = np.unique(np.linspace(0, len(texto) - 1, min(tamano_muestra, len(texto))).astype(int))
+    muestra = pd.Series([analizar_formato_coordenada(valor)[0] for valor in texto.iloc[posiciones]])
+    conteo = muestra.value_counts()
+    return {"dominante": conteo.index[0], "muestra": conteo.to_dict()}
+
+# Rutas rápidas: solo aceptan textos completos de un formato que ningún patrón anterior
+# de analizar_formato_coordenada puede capturar, así que el resultado es el mismo.
+def _ruta_grados_dir(texto):
+    partes = texto.str.extract(r'^' + PATRON_GRADOS_DIR.pattern + r'$', flags=re.IGNORECASE)
+    acierto = partes[0].notna()
+    partes = partes[acierto]
+    decimal = _a_float(partes[0]) + _a_float(partes[1]) / 60 + _a_float(partes[2]) / 3600
+    direccion = partes[3].str.upper().to_numpy(dtype=object)
+    return acierto.to_numpy(), np.where(np.isin(direccion, ["S", "W"]), -decimal, decimal), direccion
+
+def _ruta_grados_sig(texto):
+    acierto = texto.str.fullmatch(r'[+-]?\d+\.\d+').to_numpy(dtype=bool)
+    return acierto, _a_float(texto[acierto]), None
+
+def _ruta_dms(texto):
+    partes = texto.str.extract(r'^([+-]?\d+)\s+(\d+)\s+(\d+)$')
+    acierto = partes[0].notna()
+    partes = partes[acierto]
+    grados = _a_float(partes[0])
+    decimal = np.abs(grados) + _a_float(partes[1]) / 60 + _a_float(partes[2]) / 3600
+    return acierto.to_numpy(), np.where(grados < 0, -decimal, decimal), None
+
+def _ruta_decimal_eu(texto):
+    acierto = texto.str.fullmatch(r'[+-]?\d+,\d+').to_numpy(dtype=bool)
+    return acierto, _a_float(texto[acierto].str.replace(",", ".", regex=False)), None
+
+def _ruta_decimal_miles(texto):
+    acierto = texto.str.fullmatch(r'[+-]?\d+(?:,\d+){2,}').to_numpy(dtype=bool)
+    return acierto, _a_float(texto[acierto].str.replace(",", "", regex=False)), None
+
+def _ruta_decimal(texto):
+    acierto = texto.str.fullmatch(r'[+-]?\d+').to_numpy(dtype=bool)
+    return acierto, _a_float(texto[acierto]), None
+
+RUTAS_RAPIDAS = {
+    "grados_dir": _ruta_grados_dir,
+    "grados_sig": _ruta_grados_sig,
+    "dms": _ruta_dms,
+    "decimal_eu": _ruta_decimal_eu,
+    "decimal_miles": _ruta_decimal_miles,
+    "decimal": _ruta_decimal,
+}
+
+def analizar_columna_coordenadas(serie):
+    """Versión por columnas de analizar_formato_coordenada.
+
+    Devuelve (formatos, valores, bases, direcciones, resumen); los cuatro primeros son
+    arreglos NumPy alineados con la serie. `valores` es el valor que reporta el análisis
+    (NaN cuando es None) y `bases` el valor que usa estandarizar_coordenada_universal
+    antes del ajuste UTM. Primero se perfila la columna y el formato dominante se
+    convierte por su ruta rápida; solo las filas que no coinciden pasan por la cascada
+    completa de patrones. `resumen` trae el perfil, el histograma de formatos y cuántas
+    filas tomaron cada camino.
+    """
+    n = len(serie)
+    formatos = np.full(n, "vacía", dtype=object)
+    valores = np.full(n, np.nan)
+    bases = np.full(n, np.nan)
+    direcciones = np.full(n, None, dtype=object)
+
+    serie = pd.Series(serie).reset_index(drop=True)
+    no_nulos = ~serie.isna().to_numpy()
+    texto = serie[no_nulos].astype(str).str.strip()
+    texto = texto[texto != ""]
+    perfil = perfilar_columna(texto)
+    resumen = {"dominante": perfil["dominante"], "muestra": perfil["muestra"], "ruta_rapida": 0, "respaldo": 0}
+    if texto.empty:
+        resumen["histograma"] = {"vacía": n} if n else {}
+        return formatos, valores, bases, direcciones, resumen
+
+    ruta = RUTAS_RAPIDAS.get(perfil["dominante"])
+    if ruta is not None:
+        acierto, valores_rapidos, direcciones_rapidas = ruta(texto)
+        idx = texto.index[acierto].to_numpy()
+        formatos[idx] = perfil["dominante"]
+        valores[idx] = valores_rapidos
+        if direcciones_rapidas is not None:
+            direcciones[idx] = direcciones_rapidas
+        texto = texto[~acierto]
+        resumen["ruta_rapida"] = len(idx)
+    resumen["respaldo"] = len(texto)
+
+    # grados_dir: 19°25'57.4"N (solo se buscan en textos con símbolo de grados)
+    partes = texto[texto.str.contains("°", regex=False)].str.extract(PATRON_GRADOS_DIR)
+    partes = partes[partes[0].notna()]
+    if not partes.empty:
+        decimal = _a_float(partes[0]) + _a_float(partes[1]) / 60 + _a_float(partes[2]) / 3600
+        direccion = partes[3].str.upper().to_numpy(dtype=object)
+        decimal = np.where(np.isin(direccion, ["S", "W"]), -decimal, decimal)
+        idx = partes.index.to_numpy()
+        formatos[idx] = "grados_dir"
+        valores[idx] = decimal
+        direcciones[idx] = direccion
+    texto = texto[~texto.index.isin(partes.index)]
+
+    # grados_sig: primer número con punto decimal dentro del texto
+    if not texto.empty:
+        partes = texto.str.extract(PATRON_GRADOS_SIG)
+        acierto = partes[0].notna()
+        idx = partes.index[acierto].to_numpy()
+        formatos[idx] = "grados_sig"
+        valores[idx] = _a_float(partes.loc[acierto, 0])
+        texto = texto[~acierto]
+
+    # dms: 19 25 57.4
+    if not texto.empty:
+        partes = texto.str.extract(PATRON_DMS)
+        acierto = partes[0].notna()
+        if acierto.any():
+            p = partes[acierto]
+            grados = _a_float(p[0])
+            decimal = np.abs(grados) + _a_float(p[1]) / 60 + _a_float(p[2]) / 3600
+            idx = p.index.to_numpy()
+            formatos[idx] = "dms"
+            valores[idx] = np.where(grados < 0, -decimal, decimal)
+        texto = texto[~acierto]
+
+    # dm: 19°25.95 (se conserva el orden del análisis escalar)
+    if not texto.empty:
+        partes = texto[texto.str.contains("°", regex=False)].str.extract(PATRON_DM)
+        partes = partes[partes[0].notna()]
+        if not partes.empty:
+            grados = _a_float(partes[0])
+            decimal = np.abs(grados) + _a_float(partes[1]) / 60
+            idx = partes.index.to_numpy()
+            formatos[idx] = "dm"
+            valores[idx] = np.where(grados < 0, -decimal, decimal)
+        texto = texto[~texto.index.isin(partes.index)]
+
+    if not texto.empty:
+        tiene_coma = texto.str.contains(",", regex=False)
+        tiene_punto = texto.str.contains(".", regex=False)
+
+        # decimal_eu: 19,4326
+        candidato = texto[tiene_coma & ~tiene_punto].str.replace(",", ".", regex=False)
+        acierto = candidato.str.fullmatch(PATRON_NUMERO_SIMPLE)
+        idx = candidato.index[acierto].to_numpy()
+        formatos[idx] = "decimal_eu"
+        valores[idx] = _a_float(candidato[acierto])
+        resueltos = set(idx)
+
+        # decimal_miles: 190,085,184
+        restantes = texto[~texto.index.isin(resueltos)]
+        candidato = restantes[restantes.str.count(",") >= 2].str.replace(",", "", regex=False)
+        acierto = candidato.str.fullmatch(PATRON_NUMERO_SIMPLE)
+        idx = candidato.index[acierto].to_numpy()
+        formatos[idx] = "decimal_miles"
+        valores[idx] = _a_float(candidato[acierto])
+        resueltos.update(idx)
+
+        # decimal: -99.1332 sin otros caracteres
+        restantes = texto[~texto.index.isin(resueltos)]
+        acierto = restantes.str.fullmatch(PATRON_NUMERO_SIMPLE)
+        idx = restantes.index[acierto].to_numpy()
+        formatos[idx] = "decimal"
+        valores[idx] = _a_float(restantes[acierto])
+        texto = restantes[~acierto]
+
+    bases[:] = valores
+
+    # Casos raros (notación científica, texto libre, separadores mezclados): ruta escalar
+    for idx, original in zip(texto.index, serie[texto.index]):
+        formato, valor, direccion, _ = analizar_formato_coordenada(original)
+        formatos[idx] = formato
+        direcciones[idx] = direccion
+        if valor is not None:
+            valores[idx] = bases[idx] = valor
+        elif formato == "desconocido":
+            numeros = re.findall(r'[+-]?\d+\.?\d*', str(original).strip())
+            if numeros:
+                bases[idx] = float(numeros[0])
+
+    resumen["histograma"] = pd.Series(formatos).value_counts().to_dict()
+    return formatos, valores, bases, direcciones, resumen
+
+def ajustar_columna_utm(valores, es_latitud=True):
+    """Versión por columnas de ajustar_valor_utm"""
+    valores = np.asarray(valores, dtype=float)
+    limite = 90 if es_latitud else 180
+    valor_abs = np.abs(valores)
+    divisor = np.select(
+        [valor_abs >= 1000000000, valor_abs >= 100000000, valor_abs >= 10000000, valor_abs >= 1000000],
+        [10000000, 1000000, 100000, 10000],
+        default=1000
+    ).astype(float)
+    with np.errstate(invalid="ignore"):
+        ajustado = valores / divisor
+        ajustado = np.where(np.abs(ajustado) <= limite, ajustado, valores / (divisor * 10))
+        # Entre el límite y 180 el valor se conserva, igual que en la versión escalar
+        return np.where(valor_abs > 180, ajustado, valores)
+
+def detectar_inversion_columnas(valor_lat, valor_lon, dir_lat, dir_lon):
+    """Versión por columnas de detectar_inversion_universal; devuelve una máscara booleana"""
+    with np.errstate(invalid="ignore"):
+        analizable = ~np.isnan(valor_lat) & ~np.isnan(valor_lon)
+        abs_lat, abs_lon = np.abs(valor_lat), np.abs(valor_lon)
+        signos_atipicos = (valor_lat < 0) & (valor_lon > 0)
+        patron_utm_invertido = (((abs_lat > 1000000) | (abs_lon > 1000000)) &
+                                (abs_lat < 1000000000) & (abs_lon < 1000000000) &
+                                signos_atipicos)
+        lat_en_rango = (valor_lat >= -90) & (valor_lat <= 90)
+        lon_en_rango = (valor_lon >= -180) & (valor_lon <= 180)
+        lat_podria_ser_lon = (valor_lat >= -180) & (valor_lat <= 180) & ~lat_en_rango
+        lon_podria_ser_lat = (valor_lon >= -90) & (valor_lon <= 90) & ~lon_en_rango
+        direcciones_invertidas = np.isin(dir_lat, ["E", "W"]) & np.isin(dir_lon, ["N", "S"])
+        fuera_de_rango = ~lat_en_rango & ~lon_en_rango & lat_podria_ser_lon & lon_podria_ser_lat
+        diferencia_magnitud = (abs_lat > abs_lon + 10) & (np.abs(abs_lat - abs_lon) > 20)
+    criterios = (direcciones_invertidas.astype(int) + fuera_de_rango.astype(int) +
+                 diferencia_magnitud.astype(int) + signos_atipicos.astype(int))
+    return analizable & (patron_utm_invertido | (criterios >= 2))
+
+def normalizar_coordenadas(latitudes, longitudes):
+    """Normaliza columnas completas de LATITUD/LONGITUD.
+
+    Equivale a aplicar normalizar_fila_coordenadas fila por fila. Devuelve un
+    DataFrame con LATITUD_DECIMAL, LONGITUD_DECIMAL, FORMATO_LAT, FORMATO_LON,
+    INVERTIDA y AJUSTE_UTM (algún valor se reescaló), con el mismo índice que
+    `latitudes`; el resumen de formatos de cada columna queda en `attrs["perfil_formatos"]`.
+    """
+    indice = latitudes.index if isinstance(latitudes, pd.Series) else None
+    formato_lat, valor_lat, base_lat, dir_lat, resumen_lat = analizar_columna_coordenadas(latitudes)
+    formato_lon, valor_lon, base_lon, dir_lon, resumen_lon = analizar_columna_coordenadas(longitudes)
+
+    invertidas = detectar_inversion_columnas(valor_lat, valor_lon, dir_lat, dir_lon)
+    lat_base = np.where(invertidas, base_lon, base_lat)
+    lon_base = np.where(invertidas, base_lat, base_lon)
+
+    resultado = pd.DataFrame({
+        "LATITUD_DECIMAL": ajustar_columna_utm(lat_base, es_latitud=True),
+        "LONGITUD_DECIMAL": ajustar_columna_utm(lon_base, es_latitud=False),
+        "FORMATO_LAT": formato_lat,
+        "FORMATO_LON": formato_lon,
+        "INVERTIDA": invertidas,
+        "AJUSTE_UTM": (np.abs(np.nan_to_num(lat_base)) > 180) | (np.abs(np.nan_to_num(lon_base)) > 180),
+    }, index=indice)
+    resultado.attrs["perfil_formatos"] = {"LATITUD": resumen_lat, "LONGITUD": resumen_lon}
+    return resultado
+
+def combinar_perfiles(resumenes):
+    """Suma los resúmenes de formato de varios bloques de la misma columna"""
+    combinado = {"dominante": None, "muestra": {}, "ruta_rapida": 0, "respaldo": 0, "histograma": {}}
+    for resumen in resumenes:
+        combinado["ruta_rapida"] += resumen["ruta_rapida"]
+        combinado["respaldo"] += resumen["respaldo"]
+        for campo in ["muestra", "histograma"]:
+            for formato, filas in resumen[campo].items():
+                combinado[campo][formato] = combinado[campo].get(formato, 0) + filas
+    if combinado["muestra"]:
+        combinado["dominante"] = max(combinado["muestra"], key=combinado["muestra"].get)
+    return combinado
+
+def comparar_con_escalar(latitudes, longitudes):
+    """Compara el motor por columnas contra la ruta escalar; devuelve las filas que difieren"""
+    vectorizado = normalizar_coordenadas(latitudes, longitudes)
+    diferencias = []
+    for i, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+        esperado = normalizar_fila_coordenadas(lat, lon)
+        obtenido = (vectorizado["LATITUD_DECIMAL"].iat[i], vectorizado["LONGITUD_DECIMAL"].iat[i])
+        for a, b in zip(esperado, obtenido):
+            a = np.nan if a is None else a
+            if not (np.isnan(a) and np.isnan(b)) and a != b:
+                diferencias.append((i, lat, lon, esperado, obtenido))
+                break
+    return diferencias
@@ -0,0 +1,115 @@
+import numpy as np
+from geopy.distance import geodesic
+
+# ================================
+# Distancias vectorizadas
+# ================================
+
+# Elipsoide WGS-84 (el mismo que usa geopy.distance.geodesic)
+RADIO_ECUATORIAL_KM = 6378.137
+APLANAMIENTO = 1 / 298.257223563
+RADIO_MEDIO_KM = 6371.0088
+
+# Error relativo máximo frente a geodesic, medido con 20,000 pares aleatorios
+# entre 0.0001 y 60 km en latitudes de -85 a 85 grados:
+#   haversine  -> 0.57 % (esfera de radio medio; el error depende del rumbo)
+#   elipsoidal -> 1.5e-6 (fórmula de Lambert sobre latitudes reducidas)
+# Las tolerancias dejan margen sobre esos valores para decidir qué filas se
+# vuelven a calcular con geodesic cerca del borde del radio.
+TOLERANCIA_RELATIVA = {"haversine": 0.007, "elipsoidal": 0.00001}
+TOLERANCIA_ABSOLUTA_KM = 0.000001
+
+def distancia_haversine(lat, lon, latitudes, longitudes):
+    """Distancia en km sobre una esfera de radio medio, desde un punto a un arreglo de puntos"""
+    fi0, fi = np.radians(lat), np.radians(latitudes)
+    delta_lambda = np.radians(np.asarray(longitudes, dtype=float) - lon)
+    h = np.sin((fi - fi0) / 2) ** 2 + np.cos(fi0) * np.cos(fi) * np.sin(delta_lambda / 2) ** 2
+    return 2 * RADIO_MEDIO_KM * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+def distancia_elipsoidal(lat, lon, latitudes, longitudes):
+    """Distancia en km sobre WGS-84 con la fórmula de Lambert (válida lejos de antípodas)"""
+    beta0 = np.arctan((1 - APLANAMIENTO) * np.tan(np.radians(lat)))
+    beta = np.arctan((1 - APLANAMIENTO) * np.tan(np.radians(latitudes)))
+    delta_lambda = np.radians(np.asarray(longitudes, dtype=float) - lon)
+    h = np.sin((beta - beta0) / 2) ** 2 + np.cos(beta0) * np.cos(beta) * np.sin(delta_lambda / 2) ** 2
+    sigma = 2 * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+    p = (beta0 + beta) / 2
+    q = (beta - beta0) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (sigma - np.sin(sigma)) * np.sin(p) ** 2 * np.cos(q) ** 2 / np.cos(sigma / 2) ** 2
+        y = (sigma + np.sin(sigma)) * np.cos(p) ** 2 * np.sin(q) ** 2 / np.sin(sigma / 2) ** 2
+        distancia = RADIO_ECUATORIAL_KM * (sigma - APLANAMIENTO / 2 * (x + y))
+    # Mismo punto: 0 km (la fórmula da 0/0); una coordenada NaN sigue en NaN
+    return np.where(sigma == 0, 0.0, distancia)
+
+def calcular_distancias(lat, lon, latitudes, longitudes, modo="elipsoidal"):
+    """Distancias en km desde (lat, lon) a todo el arreglo en una sola llamada"""
+    if modo == "haversine":
+        return distancia_haversine(lat, lon, latitudes, longitudes)
+    if modo == "elipsoidal":
+        return distancia_elipsoidal(lat, lon, latitudes, longitudes)
+    raise ValueError(f"Modo de distancia no soportado: {modo}")
+
+def filtrar_por_radio(lat, lon, latitudes, longitudes, radio_km, modo="elipsoidal", exacto=True):
+    """Posiciones de los puntos a menos de `radio_km` y su distancia.
+
+    La aproximación descarta todo lo que está claramente fuera; las filas dentro de la
+    banda de tolerancia del borde se deciden con geodesic, así que la pertenencia es la
+    misma que con geodesic. Con exacto=True también se recalculan con geodesic las filas
+    de adentro cuya distancia a 2 decimales podría cambiar (DISTANCIA_KM idéntica a la
+    versión por fila); las demás se quedan con la aproximada.
+    """
+    dentro, distancias = filtrar_por_radio_multiple([lat], [lon], latitudes, longitudes, radio_km, modo, exacto)
+    posiciones = np.flatnonzero(dentro[0])
+    return posiciones, distancias[0, posiciones]
+
+def _cerca_de_redondeo(distancias, modo):
+    """Distancias que, con el error de `modo`, podrían redondear a otro valor con 2 decimales"""
+    centesimas = distancias * 100
+    al_medio = np.abs(centesimas - np.floor(centesimas) - 0.5) / 100
+    return al_medio <= distancias * TOLERANCIA_RELATIVA[modo] + TOLERANCIA_ABSOLUTA_KM
+
+def filtrar_por_radio_multiple(lats_origen, lons_origen, latitudes, longitudes, radio_km, modo="elipsoidal", exacto=True):
+    """Versión por lotes de filtrar_por_radio: una matriz lugares x inventario en una pasada.
+
+    Devuelve (dentro, distancias), ambas de forma (lugares, puntos). Solo las filas cerca
+    del borde (y, con exacto=True, cerca de un cambio de redondeo) pasan por geodesic; las
+    distancias de los pares fuera del radio son aproximadas y no deben usarse.
+    """
+    lats_origen = np.asarray(lats_origen, dtype=float)[:, None]
+    lons_origen = np.asarray(lons_origen, dtype=float)[:, None]
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    distancias = calcular_distancias(lats_origen, lons_origen, latitudes, longitudes, modo)
+    distancias = np.broadcast_to(distancias, (len(lats_origen), len(latitudes))).copy()
+    margen = radio_km * TOLERANCIA_RELATIVA[modo] + TOLERANCIA_ABSOLUTA_KM
+
+    cerca = distancias < radio_km + margen
+    revisar = cerca & (distancias >= radio_km - margen)
+    if exacto:
+        revisar |= cerca & _cerca_de_redondeo(distancias, modo)
+    lugares, puntos = np.nonzero(revisar)
+    distancias[lugares, puntos] = [
+        geodesic((lats_origen[i, 0], lons_origen[i, 0]), (latitudes[j], longitudes[j])).km
+        for i, j in zip(lugares, puntos)
+    ]
+    return cerca & (distancias < radio_km), distancias
+
+def medir_error_relativo(muestras=2000, radio_max_km=50.0, semilla=0):
+    """Error relativo máximo de cada modo frente a geodesic en pares aleatorios de México.
+
+    Sirve para comprobar que TOLERANCIA_RELATIVA sigue cubriendo el error real.
+    """
+    rng = np.random.default_rng(semilla)
+    lat0 = rng.uniform(14, 33, muestras)
+    lon0 = rng.uniform(-118, -86, muestras)
+    rumbo = rng.uniform(0, 2 * np.pi, muestras)
+    distancia = rng.uniform(0.5, radio_max_km, muestras)
+    lat = lat0 + distancia / 111 * np.cos(rumbo)
+    lon = lon0 + distancia / (111 * np.cos(np.radians(lat0))) * np.sin(rumbo)
+    exactas = np.array([geodesic((a, b), (c, d)).km for a, b, c, d in zip(lat0, lon0, lat, lon)])
+    errores = {}
+    for modo in TOLERANCIA_RELATIVA:
+        aproximadas = calcular_distancias(lat0, lon0, lat, lon, modo)
+        errores[modo] = float(np.max(np.abs(aproximadas - exactas) / exactas))
+    return errores
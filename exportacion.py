@@ -0,0 +1,197 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+# ================================
+# Exportación a Excel por flujo
+# ================================
+
+# El .xlsx se escribe directo como XML: las hojas van por bloques de filas al ZIP y
+# cada columna decide su tipo y estilo una sola vez (no celda por celda).
+FORMATO_MONEDA = '"$"#,##0.00'
+COLUMNAS_MONEDA = ["TARIFA_PUBLICO"]
+TAMANO_BLOQUE_EXCEL = 5000
+# Índices de estilo en styles.xml: 0 normal, 1 encabezado (negritas, relleno amarillo), 2 moneda
+ESTILO_NORMAL, ESTILO_ENCABEZADO, ESTILO_MONEDA = 0, 1, 2
+# Caracteres de control que Excel no acepta dentro de una celda
+PATRON_CONTROL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+NS_HOJA = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PAQUETE = "http://schemas.openxmlformats.org/package/2006/relationships"
+ENCABEZADO_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+OVERRIDE_TABLA = (
+    '<Override PartName="/xl/tables/table1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.table+xml"/>'
+)
+TIPOS_CONTENIDO = ENCABEZADO_XML + (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    + OVERRIDE_TABLA +
+    '</Types>'
+)
+RELACIONES_PAQUETE = ENCABEZADO_XML + (
+    f'<Relationships xmlns="{NS_PAQUETE}">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+RELACIONES_LIBRO = ENCABEZADO_XML + (
+    f'<Relationships xmlns="{NS_PAQUETE}">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+RELACIONES_HOJA = ENCABEZADO_XML + (
+    f'<Relationships xmlns="{NS_PAQUETE}">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/table" Target="../tables/table1.xml"/>'
+    '</Relationships>'
+)
+ESTILOS = ENCABEZADO_XML + (
+    f'<styleSheet xmlns="{NS_HOJA}">'
+    f'<numFmts count="1"><numFmt numFmtId="164" formatCode={quoteattr(FORMATO_MONEDA)}/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+    '<fills count="3"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="00FFFF99"/><bgColor rgb="00FFFF99"/></patternFill></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+def tarifa_a_numero(serie):
+    """Convierte textos como "$16,537.50" a float; lo que no es número queda NaN"""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype(float)
+    return pd.to_numeric(serie.astype(str).str.replace(r"[$,\s]", "", regex=True), errors="coerce")
+
+def _texto_celda(texto):
+    return escape(PATRON_CONTROL.sub("", texto))
+
+def _celda_suelta(referencia, valor, estilo):
+    """Una celda de una columna con tipos mezclados (ruta lenta, solo para esas columnas)"""
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if valor is None or valor is pd.NA or valor is pd.NaT or (isinstance(valor, float) and not np.isfinite(valor)):
+        return ""
+    if isinstance(valor, bool):
+        return f'<c r="{referencia}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        atributo = f' s="{estilo}"' if estilo else ""
+        return f'<c r="{referencia}"{atributo}><v>{valor!r}</v></c>'
+    return f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{_texto_celda(str(valor))}</t></is></c>'
+
+def resolver_columnas(df):
+    """Tipo y estilo de cada columna, decididos una vez para toda la exportación.
+
+    Las columnas de COLUMNAS_MONEDA se escriben como número con formato de moneda.
+    """
+    columnas = []
+    for posicion, nombre in enumerate(df.columns):
+        serie = df[nombre]
+        estilo = ESTILO_MONEDA if nombre in COLUMNAS_MONEDA else ESTILO_NORMAL
+        if estilo == ESTILO_MONEDA:
+            tipo = "numero"
+        elif pd.api.types.is_bool_dtype(serie):
+            tipo = "booleano"
+        elif pd.api.types.is_numeric_dtype(serie):
+            tipo = "numero"
+        else:
+            inferido = pd.api.types.infer_dtype(serie, skipna=True)
+            tipo = {"string": "texto", "empty": "texto", "categorical": "texto",
+                    "floating": "numero", "integer": "numero", "mixed-integer-float": "numero"}.get(inferido, "mixto")
+        columnas.append({"nombre": nombre, "letra": get_column_letter(posicion + 1), "tipo": tipo, "estilo": estilo})
+    return columnas
+
+def _celdas_columna(serie, columna, filas):
+    """Fragmentos XML de una columna para un bloque de filas (arreglo de objetos)"""
+    referencias = columna["letra"] + filas
+    if columna["tipo"] == "numero":
+        valores = (tarifa_a_numero(serie) if columna["estilo"] == ESTILO_MONEDA else pd.to_numeric(serie, errors="coerce")).to_numpy(dtype=float)
+        atributo = f' s="{columna["estilo"]}"' if columna["estilo"] else ""
+        celdas = '<c r="' + referencias + f'"{atributo}><v>' + np.array([repr(v) for v in valores.tolist()], dtype=object) + "</v></c>"
+        return np.where(np.isfinite(valores), celdas, "")
+    if columna["tipo"] == "booleano":
+        valores = serie.to_numpy()
+        celdas = '<c r="' + referencias + '" t="b"><v>' + np.where(valores == True, "1", "0").astype(object) + "</v></c>"
+        return np.where(pd.notna(valores), celdas, "")
+    if columna["tipo"] == "texto":
+        nulos = serie.isna().to_numpy()
+        texto = serie.astype(object).where(~nulos, "").astype(str)
+        texto = (texto.str.replace(PATRON_CONTROL.pattern, "", regex=True).str.replace("&", "&amp;", regex=False)
+                 .str.replace("<", "&lt;", regex=False).str.replace(">", "&gt;", regex=False))
+        celdas = '<c r="' + referencias + '" t="inlineStr"><is><t xml:space="preserve">' + texto.to_numpy(dtype=object) + "</t></is></c>"
+        return np.where(nulos, "", celdas)
+    return np.array([_celda_suelta(r, v, columna["estilo"]) for r, v in zip(referencias, serie.tolist())], dtype=object)
+
+def _libro(salida, hoja, tipos_contenido=TIPOS_CONTENIDO):
+    """Partes del paquete que no dependen de los datos"""
+    salida.writestr("[Content_Types].xml", tipos_contenido)
+    salida.writestr("_rels/.rels", RELACIONES_PAQUETE)
+    salida.writestr("xl/workbook.xml", ENCABEZADO_XML + (
+        f'<workbook xmlns="{NS_HOJA}" xmlns:r="{NS_R}"><sheets>'
+        f'<sheet name={quoteattr(hoja)} sheetId="1" r:id="rId1"/></sheets></workbook>'))
+    salida.writestr("xl/_rels/workbook.xml.rels", RELACIONES_LIBRO)
+    salida.writestr("xl/styles.xml", ESTILOS)
+
+def _escribir_excel_vacio(destino, hoja):
+    """Libro con una hoja sin celdas: una tabla de Excel necesita al menos una columna"""
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as salida:
+        _libro(salida, hoja, TIPOS_CONTENIDO.replace(OVERRIDE_TABLA, ""))
+        salida.writestr("xl/worksheets/sheet1.xml", ENCABEZADO_XML + (
+            f'<worksheet xmlns="{NS_HOJA}" xmlns:r="{NS_R}"><dimension ref="A1"/><sheetData/></worksheet>'))
+
+def escribir_excel(df, destino, hoja="Lugares cercanos", nombre_tabla="TablaEspectaculares",
+                   estilo_tabla="TableStyleMedium9", tamano_bloque=TAMANO_BLOQUE_EXCEL):
+    """Escribe `df` como .xlsx con encabezado resaltado y tabla con estilo.
+
+    La hoja se genera por bloques de `tamano_bloque` filas y se comprime al vuelo, así que
+    el tiempo y la memoria crecen de forma lineal con las filas. `destino` es una ruta o
+    un archivo binario. Sin columnas se escribe una hoja vacía, sin tabla.
+    """
+    columnas = resolver_columnas(df)
+    if not columnas:
+        _escribir_excel_vacio(destino, hoja)
+        return
+    nombres = [str(columna["nombre"]) for columna in columnas]
+    # Una tabla de Excel necesita al menos una fila de datos, aunque esté vacía
+    ultima = f"{columnas[-1]['letra']}{max(len(df), 1) + 1}"
+
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as salida:
+        _libro(salida, hoja)
+
+        with salida.open("xl/worksheets/sheet1.xml", "w") as archivo:
+            archivo.write((ENCABEZADO_XML + f'<worksheet xmlns="{NS_HOJA}" xmlns:r="{NS_R}">'
+                           f'<dimension ref="A1:{ultima}"/><sheetData>').encode("utf-8"))
+            encabezado = "".join(
+                f'<c r="{columna["letra"]}1" s="{ESTILO_ENCABEZADO}" t="inlineStr"><is><t xml:space="preserve">{_texto_celda(nombre)}</t></is></c>'
+                for columna, nombre in zip(columnas, nombres)
+            )
+            archivo.write(f'<row r="1">{encabezado}</row>'.encode("utf-8"))
+            for inicio in range(0, len(df), tamano_bloque):
+                bloque = df.iloc[inicio:inicio + tamano_bloque]
+                filas = np.arange(inicio + 2, inicio + 2 + len(bloque)).astype(str).astype(object)
+                partes = [_celdas_columna(bloque.iloc[:, i], columna, filas) for i, columna in enumerate(columnas)]
+                archivo.write("".join(
+                    f'<row r="{fila}">{"".join(celdas)}</row>' for fila, *celdas in zip(filas, *partes)
+                ).encode("utf-8"))
+            archivo.write(b'</sheetData><tableParts count="1"><tablePart r:id="rId1"/></tableParts></worksheet>')
+
+        salida.writestr("xl/worksheets/_rels/sheet1.xml.rels", RELACIONES_HOJA)
+        columnas_tabla = "".join(f'<tableColumn id="{i + 1}" name={quoteattr(nombre)}/>' for i, nombre in enumerate(nombres))
+        salida.writestr("xl/tables/table1.xml", ENCABEZADO_XML + (
+            f'<table xmlns="{NS_HOJA}" id="1" name={quoteattr(nombre_tabla)} displayName={quoteattr(nombre_tabla)} ref="A1:{ultima}">'
+            f'<autoFilter ref="A1:{ultima}"/><tableColumns count="{len(nombres)}">{columnas_tabla}</tableColumns>'
+            f'<tableStyleInfo name={quoteattr(estilo_tabla)} showFirstColumn="0" showLastColumn="0" showRowStripes="1" showColumnStripes="0"/>'
+            '</table>'))
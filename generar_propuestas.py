@@ -0,0 +1,50 @@
+"""Genera por lote las propuestas (CSV, Excel y presentación) de un archivo de clientes.
+
+El inventario se normaliza una vez y se guarda en el almacén local; cada proceso del
+pool lo abre de ahí una sola vez y atiende varios clientes.
+
+Uso: python generar_propuestas.py inventario.csv clientes.json [--salida propuestas]
+     [--procesos N] [--formatos csv xlsx pptx] [--almacen DIRECTORIO]
+
+clientes.json es una lista (o clientes.jsonl, uno por línea) de objetos como:
+  {"nombre": "Cafetería Centro", "radio_km": 3, "presupuesto_max": 50000,
+   "tipos": ["UNIPOLAR"], "lugares": [{"nombre": "Zócalo", "lat": 19.4326, "lon": -99.1332}]}
+"""
+import argparse
+import os
+import sys
+import time
+
+from almacen_inventario import DIRECTORIO_ALMACEN
+from motor import FORMATOS, leer_clientes, preparar_inventario, generar_lote
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inventario")
+    parser.add_argument("clientes")
+    parser.add_argument("--salida", default="propuestas")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    parser.add_argument("--formatos", nargs="+", default=list(FORMATOS), choices=FORMATOS)
+    parser.add_argument("--almacen", default=DIRECTORIO_ALMACEN)
+    args = parser.parse_args()
+
+    try:
+        clientes = leer_clientes(args.clientes)
+        hash_archivo = preparar_inventario(args.inventario, args.almacen)
+    except (OSError, ValueError) as e:
+        sys.exit(f"❌ {e}")
+
+    inicio = time.perf_counter()
+    generadas = 0
+    for propuesta in generar_lote(clientes, hash_archivo, args.salida, args.formatos, args.procesos, args.almacen):
+        generadas += 1 if propuesta["archivos"] else 0
+        print(f"{'✅' if propuesta['archivos'] else '⚠️'} {propuesta['folio']}: {propuesta['resultados']} espectaculares "
+              f"({propuesta['segundos']:.1f} s)")
+        for aviso in propuesta["avisos"]:
+            print(f"   ⚠️ {aviso}")
+    segundos = time.perf_counter() - inicio
+    print(f"📦 {generadas} de {len(clientes)} propuestas en {segundos:.1f} s con {args.procesos} procesos "
+          f"({len(clientes) / segundos * 60:.1f} propuestas por minuto) → {args.salida}")
+
+if __name__ == "__main__":
+    main()
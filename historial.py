@@ -0,0 +1,112 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# ================================
+# Historial de consultas
+# ================================
+
+# Cada consulta guarda referencias al inventario normalizado (posición de la fila,
+# distancia y lugar) en lugar de una copia del DataFrame de resultados; las filas se
+# vuelven a armar solo cuando se necesitan (presentación combinada)
+MAXIMO_CONSULTAS = int(os.environ.get("ESPECTACULARES_MAXIMO_CONSULTAS", 20))
+
+def crear_historial(maximo=MAXIMO_CONSULTAS):
+    """Historial LRU de consultas.
+
+    `union` es el índice de la presentación combinada: {CLAVE: [huellas de las consultas
+    que la contienen, de la más antigua a la más reciente]}. Se mantiene al agregar y al
+    sacar consultas, así que combinar no vuelve a concatenar todo el historial.
+    """
+    return {"consultas": OrderedDict(), "maximo": maximo, "union": {}}
+
+def huella_consulta(inventario_hash, lugares, radio_km, presupuesto_min, presupuesto_max, tipos_seleccionados, modo=None):
+    """La misma búsqueda sobre el mismo inventario ocupa una sola entrada. `modo` distingue
+    otras formas de buscar (por ejemplo ("mejores", N, criterio, peso, distancia máxima)); None es por radio"""
+    return (
+        inventario_hash,
+        tuple((lugar["nombre"], float(lugar["lat"]), float(lugar["lon"])) for lugar in lugares),
+        float(radio_km), float(presupuesto_min), float(presupuesto_max),
+        tuple(sorted(tipos_seleccionados or [])),
+        modo,
+    )
+
+def crear_entrada(datos, claves, filas, distancias, lugar_fila, lugares_en_radio):
+    """Entrada compacta: `datos` son los textos que muestra el historial (negocio, fecha, ...);
+    filas, distancias y lugar_fila son arreglos con una posición por resultado"""
+    claves = [str(clave) for clave in claves]
+    textos_en_radio, codigos_en_radio = np.unique(np.asarray(lugares_en_radio, dtype=object).astype(str), return_inverse=True)
+    primera_fila = {}
+    for fila, clave in enumerate(claves):
+        primera_fila.setdefault(clave, fila)
+    entrada = dict(datos)
+    entrada.update({
+        "resultados": len(claves),
+        "claves": claves,
+        "primera_fila": primera_fila,
+        "filas": np.asarray(filas, dtype=np.int32),
+        "distancias": np.asarray(distancias, dtype=np.float32),
+        "lugar_fila": np.asarray(lugar_fila, dtype=np.int16),
+        "textos_en_radio": textos_en_radio.tolist(),
+        "codigos_en_radio": codigos_en_radio.astype(np.int16),
+    })
+    return entrada
+
+def _agregar_a_union(historial, huella):
+    for clave in historial["consultas"][huella]["primera_fila"]:
+        historial["union"].setdefault(clave, []).append(huella)
+
+def _quitar_de_union(historial, huella):
+    union = historial["union"]
+    for clave in historial["consultas"][huella]["primera_fila"]:
+        huellas = union[clave]
+        huellas.remove(huella)
+        if not huellas:
+            del union[clave]
+
+def registrar_consulta(historial, huella, entrada):
+    """Agrega la consulta como la más reciente; si ya existía se reemplaza y, si el
+    historial se pasa del máximo, se saca la usada hace más tiempo"""
+    consultas = historial["consultas"]
+    if huella in consultas:
+        _quitar_de_union(historial, huella)
+        del consultas[huella]
+    consultas[huella] = entrada
+    _agregar_a_union(historial, huella)
+    while len(consultas) > historial["maximo"]:
+        mas_antigua = next(iter(consultas))
+        _quitar_de_union(historial, mas_antigua)
+        del consultas[mas_antigua]
+
+def reemplazar_consulta(historial, huella_anterior, huella, entrada):
+    """Cambia la consulta `huella_anterior` por `entrada` (la misma búsqueda con otros
+    filtros) sin ocupar otro lugar del historial"""
+    if huella_anterior != huella and huella_anterior in historial["consultas"]:
+        _quitar_de_union(historial, huella_anterior)
+        del historial["consultas"][huella_anterior]
+    registrar_consulta(historial, huella, entrada)
+
+def consultas_en_orden(historial):
+    """Entradas de la más antigua a la más reciente"""
+    return list(historial["consultas"].values())
+
+def aportes_union(historial, excluir=None, claves_excluidas=()):
+    """Filas que aporta cada consulta a la presentación combinada.
+
+    Cada CLAVE sale una sola vez, de la consulta más antigua que la tiene (sin contar
+    `excluir`, la consulta actual) y solo si no está en `claves_excluidas` (lo ya
+    seleccionado). Devuelve [(entrada, filas de la entrada)] en orden del historial.
+    """
+    claves_excluidas = {str(clave) for clave in claves_excluidas}
+    por_consulta = {}
+    for clave, huellas in historial["union"].items():
+        if clave in claves_excluidas:
+            continue
+        duena = next((huella for huella in huellas if huella != excluir), None)
+        if duena is not None:
+            por_consulta.setdefault(duena, []).append(historial["consultas"][duena]["primera_fila"][clave])
+    return [
+        (entrada, np.sort(np.array(por_consulta[huella], dtype=np.int64)))
+        for huella, entrada in historial["consultas"].items() if huella in por_consulta
+    ]
@@ -0,0 +1,85 @@
+import numpy as np
+
+# ================================
+# Índice espacial por rejilla
+# ================================
+
+# Tamaño de celda en grados (~11 km en latitud); un radio de 50 km revisa ~10x10 celdas
+TAMANO_CELDA_GRADOS = 0.1
+# Kilómetros mínimos por grado de latitud en WGS-84 (en el ecuador); se usa para acotar por exceso
+KM_POR_GRADO_MINIMO = 110.5
+
+def construir_indice_espacial(latitudes, longitudes, tamano_celda=TAMANO_CELDA_GRADOS, validos=None):
+    """Agrupa los puntos válidos en celdas de una rejilla lat/lon.
+
+    Devuelve un diccionario con las posiciones ordenadas por celda; las posiciones son
+    las de los arreglos recibidos, así que sirven directo con `iloc` sobre el inventario.
+    `validos` es la máscara de puntos a indexar (COORDENADA_VALIDA del inventario); sin
+    ella se revisa el rango de cada punto.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    if validos is not None:
+        validos = np.asarray(validos, dtype=bool)
+    else:
+        with np.errstate(invalid="ignore"):
+            validos = (latitudes >= -90) & (latitudes <= 90) & (longitudes >= -180) & (longitudes <= 180)
+    posiciones = np.flatnonzero(validos)
+
+    columnas = int(np.ceil(360 / tamano_celda))
+    filas = int(np.ceil(180 / tamano_celda))
+    fila = np.minimum(((latitudes[posiciones] + 90) // tamano_celda).astype(np.int64), filas - 1)
+    columna = np.minimum(((longitudes[posiciones] + 180) // tamano_celda).astype(np.int64), columnas - 1)
+    celdas = fila * columnas + columna
+
+    orden = np.argsort(celdas, kind="stable")
+    return {
+        "tamano_celda": tamano_celda,
+        "filas": filas,
+        "columnas": columnas,
+        "celdas": celdas[orden],
+        "posiciones": posiciones[orden],
+        "total": len(latitudes),
+    }
+
+def _rangos_columnas(lon, delta_lon, indice):
+    """Rangos de columnas [inicio, fin] a revisar; parte el rango si cruza el antimeridiano"""
+    tamano, columnas = indice["tamano_celda"], indice["columnas"]
+    if delta_lon >= 180:
+        return [(0, columnas - 1)]
+    inicio = int(np.floor((lon - delta_lon + 180) / tamano))
+    fin = int(np.floor((lon + delta_lon + 180) / tamano))
+    if inicio < 0:
+        return [(inicio % columnas, columnas - 1), (0, fin)]
+    if fin >= columnas:
+        return [(inicio, columnas - 1), (0, fin % columnas)]
+    return [(inicio, fin)]
+
+def consultar_indice(indice, lat, lon, radio_km):
+    """Posiciones de los puntos en las celdas que tocan el círculo de `radio_km`.
+
+    Es un superconjunto de los puntos dentro del radio; la distancia exacta se revisa
+    después (distancias.filtrar_por_radio).
+    """
+    tamano, columnas = indice["tamano_celda"], indice["columnas"]
+    delta_lat = radio_km / KM_POR_GRADO_MINIMO * 1.01
+    lat_extrema = min(abs(lat) + delta_lat, 90.0)
+    coseno = np.cos(np.radians(lat_extrema))
+    delta_lon = 360.0 if coseno < 1e-6 else delta_lat / coseno
+
+    fila_inicio = max(int(np.floor((lat - delta_lat + 90) / tamano)), 0)
+    fila_fin = min(int(np.floor((lat + delta_lat + 90) / tamano)), indice["filas"] - 1)
+    rangos = _rangos_columnas(lon, delta_lon, indice)
+
+    claves_inicio, claves_fin = [], []
+    for fila in range(fila_inicio, fila_fin + 1):
+        for inicio, fin in rangos:
+            claves_inicio.append(fila * columnas + inicio)
+            claves_fin.append(fila * columnas + fin)
+    desde = np.searchsorted(indice["celdas"], claves_inicio, side="left")
+    hasta = np.searchsorted(indice["celdas"], claves_fin, side="right")
+
+    tramos = [indice["posiciones"][a:b] for a, b in zip(desde, hasta) if b > a]
+    if not tramos:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(tramos))
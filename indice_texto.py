@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+from texto import ABREVIATURAS, PALABRAS_VACIAS, normalizar_texto, tokens
+
+# ================================
+# Índice invertido de texto
+# ================================
+
+# Palabra -> posiciones de las caras que la tienen en DIRECCION, CIUDAD, MUNICIPIO o
+# CLAVE. Las palabras se guardan ordenadas y sus posiciones en un solo arreglo (un tramo
+# por palabra), así que todas las palabras que empiezan con un prefijo son un solo tramo
+# contiguo que se encuentra con búsqueda binaria. Se construye una vez por versión del
+# inventario; una consulta solo toca los tramos de sus palabras.
+COLUMNAS_TEXTO = ["DIRECCION", "CIUDAD", "MUNICIPIO", "CLAVE"]
+# Las palabras sin coincidencia exacta ni de prefijo se buscan con una letra de
+# diferencia (falta, sobra, cambia o se voltean dos seguidas), solo desde este largo
+LONGITUD_MINIMA_DIFUSA = 4
+PUNTOS_EXACTA = 3
+PUNTOS_PREFIJO = 2
+PUNTOS_DIFUSA = 1
+# Tipos de vialidad y otras palabras que el proveedor a veces no escribe ("Av. Lázaro
+# Cárdenas" debe encontrar "LAZARO CARDENAS 508"): suman puntos pero no son obligatorias,
+# salvo que la consulta solo tenga palabras de estas
+PALABRAS_OPCIONALES = {
+    "AVENIDA", "BOULEVARD", "CALLE", "CALZADA", "CARRETERA", "PROLONGACION", "PERIFERICO",
+    "AUTOPISTA", "LIBRAMIENTO", "COLONIA", "FRACCIONAMIENTO", "ESQUINA", "NUMERO",
+}
+# Mayor que cualquier carácter de un texto normalizado: [palabra, palabra + FIN) es su rango de prefijos
+FIN_PREFIJO = "~"
+
+def _palabras_columna(serie, es_clave):
+    """(código de cada fila, palabras de cada valor distinto como Serie indexada por el
+    código del valor); el código es -1 en las filas vacías"""
+    codigos, valores = pd.factorize(serie)
+    normalizados = normalizar_texto(pd.Series(valores, dtype=object))
+    palabras = normalizados.str.split().explode().dropna()
+    if es_clave:
+        # Las claves se buscan por sus partes y completas sin separadores ("ABC-12" -> ABC, 12, ABC12)
+        palabras = pd.concat([palabras, normalizados.str.replace(" ", "", regex=False)])
+    else:
+        # Lo mismo que texto.tokens, para todos los valores a la vez
+        palabras = palabras[~palabras.isin(PALABRAS_VACIAS)]
+        palabras = palabras.map(ABREVIATURAS).fillna(palabras)
+    return codigos, palabras[palabras != ""].astype(object)
+
+def _variantes(palabra):
+    """La palabra sin una de sus letras, en cada posición"""
+    return {palabra[:k] + palabra[k + 1:] for k in range(len(palabra))}
+
+def construir_indice_texto(df):
+    """Índice invertido de las columnas de COLUMNAS_TEXTO que tenga `df`.
+
+    Las posiciones son las de `df`, así que sirven directo con `iloc` (como las del
+    índice espacial).
+    """
+    n = len(df)
+    columnas = [columna for columna in COLUMNAS_TEXTO if columna in df.columns]
+    por_columna = [_palabras_columna(df[columna], columna == "CLAVE") for columna in columnas]
+    todas = pd.concat([palabras for _, palabras in por_columna]) if por_columna else pd.Series([], dtype=object)
+    # Vocabulario ordenado: el identificador de cada palabra es su lugar en el orden
+    identificadores, palabras = pd.factorize(todas, sort=True)
+    palabras = np.asarray(palabras, dtype=str)
+
+    pares_fila, pares_palabra, desde_par = [], [], 0
+    for (codigos, palabras_valor), columna in zip(por_columna, columnas):
+        palabra_par = identificadores[desde_par:desde_par + len(palabras_valor)]
+        desde_par += len(palabras_valor)
+        if not len(palabras_valor):
+            continue
+        # Cada par (valor, palabra) se reparte en las filas que tienen ese valor
+        valor_par = palabras_valor.index.to_numpy(dtype=np.int64)
+        con_valor = np.flatnonzero(codigos >= 0)
+        filas_por_valor = con_valor[np.argsort(codigos[con_valor], kind="stable")]
+        cuantos = np.bincount(codigos[con_valor], minlength=int(valor_par.max()) + 1)
+        desde = np.cumsum(cuantos) - cuantos
+        repeticiones = cuantos[valor_par]
+        total = int(repeticiones.sum())
+        dentro_del_tramo = np.arange(total) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+        pares_fila.append(filas_por_valor[np.repeat(desde[valor_par], repeticiones) + dentro_del_tramo])
+        pares_palabra.append(np.repeat(palabra_par.astype(np.int64), repeticiones))
+
+    if pares_fila:
+        # Una misma palabra en dos columnas (o dos veces) de la misma fila cuenta una sola vez
+        combinados = np.sort(np.concatenate(pares_palabra) * max(n, 1) + np.concatenate(pares_fila))
+        combinados = combinados[np.concatenate([[True], combinados[1:] != combinados[:-1]])]
+    else:
+        combinados = np.empty(0, dtype=np.int64)
+    palabra_de_par, filas = np.divmod(combinados, max(n, 1))
+
+    # Las claves no entran a la búsqueda difusa: una letra de diferencia ya es otra clave
+    difusas = set()
+    for (_, palabras_valor), columna in zip(por_columna, columnas):
+        if columna != "CLAVE":
+            difusas.update(palabra for palabra in palabras_valor.unique()
+                           if len(palabra) >= LONGITUD_MINIMA_DIFUSA and not palabra.isdigit())
+    difusas = sorted(difusas)
+    variantes = {}
+    for palabra, identificador in zip(difusas, np.searchsorted(palabras, difusas).tolist()):
+        for variante in _variantes(palabra):
+            variantes.setdefault(variante, []).append(identificador)
+    return {
+        "palabras": palabras,
+        "inicio": np.searchsorted(palabra_de_par, np.arange(len(palabras) + 1), side="left"),
+        "filas": filas.astype(np.int32),
+        "variantes": variantes,
+        "total": n,
+    }
+
+def _tramo(indice, desde, hasta):
+    """Posiciones de las palabras con identificador en [desde, hasta)"""
+    return indice["filas"][indice["inicio"][desde]:indice["inicio"][hasta]]
+
+def _parecidas(indice, palabra):
+    """Identificadores de las palabras del índice a una letra de `palabra`"""
+    encontradas = set(indice["variantes"].get(palabra, ()))
+    palabras = indice["palabras"]
+    for variante in _variantes(palabra):
+        encontradas.update(indice["variantes"].get(variante, ()))
+        posicion = np.searchsorted(palabras, variante)
+        if posicion < len(palabras) and palabras[posicion] == variante and len(variante) >= LONGITUD_MINIMA_DIFUSA:
+            encontradas.add(int(posicion))
+    return sorted(encontradas)
+
+def _puntos_palabra(indice, palabra):
+    """Puntos de cada cara para una palabra de la consulta (0 si no coincide)"""
+    palabras = indice["palabras"]
+    puntos = np.zeros(indice["total"], dtype=np.int8)
+    desde = int(np.searchsorted(palabras, palabra, side="left"))
+    hasta = int(np.searchsorted(palabras, palabra + FIN_PREFIJO, side="left"))
+    if hasta > desde:
+        puntos[_tramo(indice, desde, hasta)] = PUNTOS_PREFIJO
+        if palabras[desde] == palabra:
+            puntos[_tramo(indice, desde, desde + 1)] = PUNTOS_EXACTA
+    elif len(palabra) >= LONGITUD_MINIMA_DIFUSA:
+        for identificador in _parecidas(indice, palabra):
+            puntos[_tramo(indice, identificador, identificador + 1)] = PUNTOS_DIFUSA
+    return puntos
+
+def buscar_texto(indice, consulta, candidatos=None):
+    """(posiciones, puntos) de las caras que coinciden con todas las palabras de `consulta`.
+
+    Cada palabra coincide completa, como prefijo o, si no hay ninguna así, con una letra
+    de diferencia; las de PALABRAS_OPCIONALES solo suman puntos. Las caras salen de más a
+    menos puntos y en el orden del inventario.
+    `candidatos` es una máscara (por ejemplo inventario.filtrar_candidatos) que limita
+    el resultado.
+    """
+    palabras_consulta = list(dict.fromkeys(tokens(normalizar_texto([consulta]).iloc[0])))
+    if not palabras_consulta:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int16)
+    total = np.zeros(indice["total"], dtype=np.int16)
+    coincide = np.ones(indice["total"], dtype=bool) if candidatos is None else np.asarray(candidatos, dtype=bool).copy()
+    obligatorias = [palabra for palabra in palabras_consulta if palabra not in PALABRAS_OPCIONALES] or palabras_consulta
+    for palabra in palabras_consulta:
+        puntos = _puntos_palabra(indice, palabra)
+        if palabra in obligatorias:
+            coincide &= puntos > 0
+        total += puntos
+    posiciones = np.flatnonzero(coincide)
+    orden = np.argsort(-total[posiciones], kind="stable")
+    return posiciones[orden], total[posiciones][orden]
@@ -0,0 +1,141 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from calidad import columnas_calidad
+from coordenadas import normalizar_coordenadas, combinar_perfiles
+
+# ================================
+# Inventario normalizado
+# ================================
+
+# Tipos por columna (nombres ya sin espacios). Las columnas repetitivas van como
+# categorías; BASE, ALTURA, IMPRESION e INSTALACION se dejan como texto porque los
+# proveedores escriben "13 x 3", "$55.00 M2", etc.
+ESQUEMA_INVENTARIO = {
+    "# CARAS": "float64",
+    "CIUDAD": "category",
+    "MUNICIPIO": "category",
+    "CLAVE": "str",
+    "VISTA": "category",
+    "DIRECCION": "str",
+    "TIPO": "category",
+    "BASE": "str",
+    "ALTURA": "str",
+    "LONGITUD": "str",
+    "LATITUD": "str",
+    "TARIFA PUBLICO": "str",
+    "IMPRESION": "str",
+    "INSTALACION": "str",
+    "PROVEEDOR": "category",
+    "TELÉFONO PROVEEDOR": "str",
+}
+COLUMNAS_REQUERIDAS = ["TARIFA PUBLICO", "LATITUD", "LONGITUD"]
+TAMANO_BLOQUE_FILAS = 50000
+
+def hash_contenido(contenido):
+    """Huella del contenido del archivo subido; identifica una versión del inventario"""
+    return hashlib.sha256(contenido).hexdigest()
+
+def limpiar_tarifa(serie):
+    """Convierte textos como "$16,537.50" a float (vacío cuenta como 0)"""
+    return serie.astype(str).str.replace(r"[^\d.]", "", regex=True).replace("", "0").astype(float)
+
+def mascara_coordenadas_validas(latitudes, longitudes):
+    """Coordenadas numéricas dentro de rango; NaN siempre es inválido"""
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return (latitudes >= -90) & (latitudes <= 90) & (longitudes >= -180) & (longitudes <= 180)
+
+def normalizar_inventario(df):
+    """Agrega al inventario las columnas que usa la búsqueda.
+
+    LATITUD_DECIMAL/LONGITUD_DECIMAL (float, NaN si no se pudo interpretar),
+    TARIFA (float) y el registro de calidad de cada cara (calidad.COLUMNAS_CALIDAD,
+    con COORDENADA_VALIDA). Se calcula una vez por archivo; el resumen de formatos de
+    LATITUD/LONGITUD queda en `attrs["perfil_formatos"]`.
+    """
+    df = df.copy()
+    if "TARIFA PUBLICO" in df.columns:
+        df["TARIFA"] = limpiar_tarifa(df["TARIFA PUBLICO"])
+    coordenadas = normalizar_coordenadas(df["LATITUD"], df["LONGITUD"])
+    df["LATITUD_DECIMAL"] = coordenadas["LATITUD_DECIMAL"]
+    df["LONGITUD_DECIMAL"] = coordenadas["LONGITUD_DECIMAL"]
+    calidad = columnas_calidad(
+        coordenadas["FORMATO_LAT"].to_numpy(), coordenadas["FORMATO_LON"].to_numpy(), coordenadas["INVERTIDA"].to_numpy(),
+        coordenadas["AJUSTE_UTM"].to_numpy(), coordenadas["LATITUD_DECIMAL"].to_numpy(), coordenadas["LONGITUD_DECIMAL"].to_numpy()
+    )
+    for columna, valores in calidad.items():
+        df[columna] = pd.Series(valores, index=df.index) if isinstance(valores, pd.Categorical) else valores
+    df.attrs["perfil_formatos"] = coordenadas.attrs["perfil_formatos"]
+    return df
+
+def filtrar_candidatos(df_normalizado, presupuesto_min=None, presupuesto_max=None, tipos_seleccionados=None, solo_validas=True):
+    """Máscara de filas con coordenada válida que pasan los filtros de tipo y presupuesto.
+    Con `solo_validas=False` no se exige coordenada (búsqueda por texto)"""
+    if solo_validas:
+        mascara = df_normalizado["COORDENADA_VALIDA"].to_numpy(dtype=bool).copy()
+    else:
+        mascara = np.ones(len(df_normalizado), dtype=bool)
+    if tipos_seleccionados and "TIPO" in df_normalizado.columns:
+        mascara &= df_normalizado["TIPO"].isin(tipos_seleccionados).to_numpy()
+    if "TARIFA" in df_normalizado.columns:
+        tarifa = pd.to_numeric(df_normalizado["TARIFA"], errors="coerce").to_numpy(dtype=float)
+        if presupuesto_min is not None:
+            mascara &= ~(tarifa < presupuesto_min)
+        if presupuesto_max is not None:
+            mascara &= ~(tarifa > presupuesto_max)
+    return mascara
+
+def concatenar_bloques(bloques):
+    """Une bloques normalizados; las categorías se unen sin pasar por texto"""
+    if len(bloques) == 1:
+        return bloques[0].reset_index(drop=True)
+    columnas = {}
+    for columna in bloques[0].columns:
+        partes = [bloque[columna] for bloque in bloques]
+        if all(isinstance(parte.dtype, pd.CategoricalDtype) for parte in partes):
+            columnas[columna] = pd.Series(pd.api.types.union_categoricals(partes), name=columna)
+        else:
+            columnas[columna] = pd.concat(partes, ignore_index=True)
+    return pd.DataFrame(columnas)
+
+def leer_inventario(fuente, tamano_bloque=TAMANO_BLOQUE_FILAS, al_avanzar=None):
+    """Lee y normaliza un CSV de inventario por bloques con tipos explícitos.
+
+    `fuente` es un archivo binario con seek/tell (BytesIO, UploadedFile). Cada bloque se
+    normaliza al leerse, así que la memoria extra depende del tamaño del bloque y no del
+    archivo. `al_avanzar(fraccion, filas)` recibe el avance después de cada bloque.
+    Lanza ValueError si faltan columnas requeridas.
+    """
+    encabezado = pd.read_csv(fuente, sep=",", nrows=0).columns
+    fuente.seek(0, 2)
+    total_bytes = max(fuente.tell(), 1)
+    fuente.seek(0)
+
+    nombres = {columna: columna.strip() for columna in encabezado}
+    faltantes = [columna for columna in COLUMNAS_REQUERIDAS if columna not in nombres.values()]
+    if faltantes:
+        raise ValueError(f"No se encuentra la columna '{faltantes[0]}' en el CSV.")
+    tipos = {original: ESQUEMA_INVENTARIO[limpio] for original, limpio in nombres.items() if limpio in ESQUEMA_INVENTARIO}
+
+    bloques, perfiles, filas = [], [], 0
+    for bloque in pd.read_csv(fuente, sep=",", dtype=tipos, chunksize=tamano_bloque):
+        bloque.columns = bloque.columns.str.strip()
+        bloque = normalizar_inventario(bloque)
+        perfiles.append(bloque.attrs["perfil_formatos"])
+        bloques.append(bloque)
+        filas += len(bloque)
+        if al_avanzar is not None:
+            al_avanzar(min(fuente.tell() / total_bytes, 1.0), filas)
+
+    if not bloques:
+        df = normalizar_inventario(pd.DataFrame(columns=[nombres[c] for c in encabezado]).astype({c: "str" for c in COLUMNAS_REQUERIDAS}))
+    else:
+        df = concatenar_bloques(bloques)
+        df.attrs["perfil_formatos"] = {
+            columna: combinar_perfiles([perfil[columna] for perfil in perfiles]) for columna in ["LATITUD", "LONGITUD"]
+        }
+    return df
@@ -0,0 +1,218 @@
+import html
+import json
+
+import folium
+import numpy as np
+import pandas as pd
+from folium.plugins import FastMarkerCluster, MarkerCluster
+
+# ================================
+# Mapa de resultados
+# ================================
+
+COLORES_LUGARES = ["red", "blue", "green", "purple", "orange", "darkred", "lightred", "beige", "darkblue", "darkgreen"]
+OPCIONES_CLUSTER = {
+    'maxClusterRadius': 50,  # Radio máximo para clustering
+    'disableClusteringAtZoom': 18,  # Desactivar clustering en zoom alto
+    'showCoverageOnHover': True,
+    'zoomToBoundsOnClick': True
+}
+# A partir de cuántos resultados el mapa manda los puntos como un solo arreglo y arma
+# los popups en el navegador (modo compacto) en lugar de un folium.Marker por fila
+UMBRAL_MAPA_COMPACTO = 500
+
+# Cada fila del arreglo: [lat, lon, color, clave, distancia, tarifa, lugar, tipo, dirección];
+# color, lugar y tipo son índices a las tablas para no repetir textos. Los enlaces de
+# Google Maps y Street View se arman con lat/lon igual que en construir_resultados.
+CALLBACK_COMPACTO = """(function () {
+    var tablas = %s;
+    function escapar(texto) {
+        return String(texto).replace(/[&<>"']/g, function (c) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+        });
+    }
+    function popup(row) {
+        var lat = row[0], lon = row[1];
+        return '<div style="min-width: 250px;">' +
+            '<h4 style="margin: 0; color: #333;">' + escapar(row[3]) + '</h4>' +
+            '<hr style="margin: 5px 0;">' +
+            '<p style="margin: 2px 0;"><b>Distancia:</b> ' + row[4].toFixed(2) + ' km</p>' +
+            '<p style="margin: 2px 0;"><b>Tarifa:</b> ' + escapar(row[5]) + '</p>' +
+            '<p style="margin: 2px 0;"><b>Lugar:</b> ' + escapar(tablas.lugares[row[6]]) + '</p>' +
+            '<p style="margin: 2px 0;"><b>Tipo:</b> ' + escapar(tablas.tipos[row[7]]) + '</p>' +
+            '<p style="margin: 2px 0;"><b>Dirección:</b> ' + escapar(row[8]) + '</p>' +
+            '<div style="margin-top: 8px;">' +
+            "<a href='https://www.google.com/maps/place/" + lat + "," + lon + "' target='_blank' style='color: blue; text-decoration: none;'>📍 Google Maps</a><br>" +
+            "<a href='https://www.google.com/maps/@?api=1&map_action=pano&viewpoint=" + lat + "," + lon + "' target='_blank' style='color: green; text-decoration: none;'>🌐 Street View</a>" +
+            '</div></div>';
+    }
+    return function (row) {
+        var marker = L.marker(new L.LatLng(row[0], row[1]), {
+            icon: L.AwesomeMarkers.icon({icon: "info-sign", markerColor: tablas.colores[row[2]], prefix: "glyphicon"})
+        });
+        marker.bindPopup(function () { return popup(row); }, {maxWidth: 300});
+        marker.bindTooltip(escapar(row[3]) + " - " + escapar(row[5]));
+        return marker;
+    };
+})()"""
+
+def _texto_html(valor):
+    """Texto del inventario listo para un popup: folium mete el HTML del popup dentro de
+    un <script>, así que un "</script>" sin escapar en un campo cortaría la página"""
+    return html.escape(str(valor))
+
+def _json_en_script(valor):
+    """JSON para pegar dentro de un <script>: "</" no puede cerrar la etiqueta"""
+    return json.dumps(valor, ensure_ascii=False).replace("</", "<\\/")
+
+def mascara_marcadores_validos(df_filtrado):
+    """Filas con LATITUD/LONGITUD numéricas y dentro de rango; solo para resultados que no
+    traen el registro de calidad del inventario (calidad.py)"""
+    def numericos(serie):
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            return serie.to_numpy(dtype=float)
+        return np.array([float(v) if isinstance(v, (int, float)) else np.nan for v in serie], dtype=float)
+    lat, lon = numericos(df_filtrado["LATITUD"]), numericos(df_filtrado["LONGITUD"])
+    with np.errstate(invalid="ignore"):
+        return (lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180)
+
+def _indices_lugar(df_filtrado, lugares):
+    """Índice del lugar de búsqueda de cada fila (0 si no aparece, como antes)"""
+    posiciones = {}
+    for indice, lugar in enumerate(lugares):
+        posiciones.setdefault(lugar["nombre"], indice)
+    if "LUGAR_BUSQUEDA" not in df_filtrado.columns:
+        return np.zeros(len(df_filtrado), dtype=int), ["Principal"] * len(df_filtrado)
+    nombres = df_filtrado["LUGAR_BUSQUEDA"].tolist()
+    return np.array([posiciones.get(nombre, 0) for nombre in nombres], dtype=int), nombres
+
+def _agregar_marcadores_detallados(mapa, df_filtrado, lugares, validos):
+    """Un folium.Marker con popup HTML por fila válida; devuelve (agregados, fallados)"""
+    cluster = MarkerCluster(name="Espectaculares", options=OPCIONES_CLUSTER).add_to(mapa)
+    marcadores_agregados = 0
+    marcadores_fallados = int((~validos).sum())
+    for i, r in df_filtrado[validos].iterrows():
+        try:
+            lat = float(r["LATITUD"])
+            lon = float(r["LONGITUD"])
+
+            lugar_busqueda = r.get("LUGAR_BUSQUEDA", "Principal")
+            color_index = next((idx for idx, lugar in enumerate(lugares)
+                              if lugar["nombre"] == lugar_busqueda), 0)
+            color_marker = COLORES_LUGARES[color_index % len(COLORES_LUGARES)]
+
+            # Crear contenido del popup más informativo
+            popup_html = f"""
+            <div style="min-width: 250px;">
+                <h4 style="margin: 0; color: #333;">{_texto_html(r['CLAVE'])}</h4>
+                <hr style="margin: 5px 0;">
+                <p style="margin: 2px 0;"><b>Distancia:</b> {r['DISTANCIA_KM']:.2f} km</p>
+                <p style="margin: 2px 0;"><b>Tarifa:</b> {_texto_html(r['TARIFA_PUBLICO'])}</p>
+                <p style="margin: 2px 0;"><b>Lugar:</b> {_texto_html(lugar_busqueda)}</p>
+                <p style="margin: 2px 0;"><b>Tipo:</b> {_texto_html(r.get('TIPO', 'N/A'))}</p>
+                <p style="margin: 2px 0;"><b>Dirección:</b> {_texto_html(r.get('DIRECCION', 'N/A'))}</p>
+                <div style="margin-top: 8px;">
+                    <a href='{_texto_html(r['MAPS_'])}' target='_blank' style='color: blue; text-decoration: none;'>📍 Google Maps</a><br>
+                    <a href='{_texto_html(r['STREET_VIEW'])}' target='_blank' style='color: green; text-decoration: none;'>🌐 Street View</a>
+                </div>
+            </div>
+            """
+
+            folium.Marker(
+                location=[lat, lon],
+                popup=folium.Popup(popup_html, max_width=300),
+                icon=folium.Icon(color=color_marker, icon="info-sign"),
+                tooltip=f"{_texto_html(r['CLAVE'])} - {_texto_html(r['TARIFA_PUBLICO'])}"
+            ).add_to(cluster)
+
+            marcadores_agregados += 1
+
+        except Exception as e:
+            marcadores_fallados += 1
+    return marcadores_agregados, marcadores_fallados
+
+def _agregar_marcadores_compactos(mapa, df_filtrado, lugares, validos):
+    """Todos los puntos en un arreglo; el navegador crea los marcadores y arma cada popup
+    al abrirlo. Devuelve (agregados, fallados)"""
+    df_validos = df_filtrado[validos]
+    indices_lugar, nombres_lugar = _indices_lugar(df_validos, lugares)
+
+    def columna(nombre, defecto="N/A"):
+        if nombre not in df_validos.columns:
+            return [defecto] * len(df_validos)
+        return [str(v) for v in df_validos[nombre].tolist()]
+
+    tipos = columna("TIPO")
+    tabla_tipos = list(dict.fromkeys(tipos))
+    posicion_tipo = {tipo: i for i, tipo in enumerate(tabla_tipos)}
+    tabla_lugares = list(dict.fromkeys(str(nombre) for nombre in nombres_lugar))
+    posicion_lugar = {nombre: i for i, nombre in enumerate(tabla_lugares)}
+
+    datos = [
+        [lat, lon, int(color), clave, distancia, tarifa, posicion_lugar[str(lugar)], posicion_tipo[tipo], direccion]
+        for lat, lon, color, clave, distancia, tarifa, lugar, tipo, direccion in zip(
+            df_validos["LATITUD"].astype(float).tolist(), df_validos["LONGITUD"].astype(float).tolist(),
+            indices_lugar % len(COLORES_LUGARES), columna("CLAVE"),
+            pd.to_numeric(df_validos["DISTANCIA_KM"], errors="coerce").astype(float).round(2).tolist(),
+            columna("TARIFA_PUBLICO"), nombres_lugar, tipos, columna("DIRECCION"),
+        )
+    ]
+    tablas = {"colores": COLORES_LUGARES, "lugares": tabla_lugares, "tipos": tabla_tipos}
+    # Las tablas van como JSON dentro del <script>; `datos` lo serializa la plantilla de
+    # folium con el filtro tojson, que ya escapa "<"
+    FastMarkerCluster(
+        datos, callback=CALLBACK_COMPACTO % _json_en_script(tablas),
+        name="Espectaculares", options=OPCIONES_CLUSTER
+    ).add_to(mapa)
+    return len(datos), int((~validos).sum())
+
+def construir_mapa(df_filtrado, lugares, radio_km, modo="detallado", validos=None):
+    """HTML del mapa con los lugares de búsqueda, su radio y los resultados.
+
+    `modo` es "detallado" (un folium.Marker por fila) o "compacto" (un solo arreglo y
+    popups armados en el navegador). `validos` es la máscara de filas con coordenada
+    válida según el registro de calidad; sin ella se revisa cada fila con
+    mascara_marcadores_validos. Devuelve (html, marcadores_agregados, marcadores_fallados).
+    """
+    if validos is None:
+        validos = mascara_marcadores_validos(df_filtrado)
+    validos = np.asarray(validos, dtype=bool)
+
+    # Centro del mapa con las filas que se pueden ubicar
+    latitudes_validas = df_filtrado["LATITUD"][validos]
+    longitudes_validas = df_filtrado["LONGITUD"][validos]
+
+    if len(latitudes_validas) > 0 and len(longitudes_validas) > 0:
+        centro_lat = latitudes_validas.mean()
+        centro_lon = longitudes_validas.mean()
+    else:
+        centro_lat = 19.4326
+        centro_lon = -99.1332
+
+    mapa = folium.Map(location=[centro_lat, centro_lon], zoom_start=12)
+
+    # Primero agregar los lugares de búsqueda
+    for i, lugar in enumerate(lugares):
+        color = COLORES_LUGARES[i % len(COLORES_LUGARES)]
+        folium.Marker(
+            location=[lugar["lat"], lugar["lon"]],
+            popup=folium.Popup(f"<b>📍 {_texto_html(lugar['nombre'])}</b>", max_width=300),
+            icon=folium.Icon(color=color, icon="star")
+        ).add_to(mapa)
+        folium.Circle(
+            location=[lugar["lat"], lugar["lon"]],
+            radius=radio_km * 1000,
+            color=color,
+            fill=True,
+            fill_opacity=0.1,
+            popup=f"Radio de búsqueda: {radio_km} km"
+        ).add_to(mapa)
+
+    if modo == "compacto":
+        marcadores_agregados, marcadores_fallados = _agregar_marcadores_compactos(mapa, df_filtrado, lugares, validos)
+    else:
+        marcadores_agregados, marcadores_fallados = _agregar_marcadores_detallados(mapa, df_filtrado, lugares, validos)
+
+    # Agregar control de capas
+    folium.LayerControl().add_to(mapa)
+    return folium.Figure().add_child(mapa).render(), marcadores_agregados, marcadores_fallados
@@ -0,0 +1,158 @@
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from almacen_inventario import DIRECTORIO_ALMACEN, guardar_inventario, cargar_inventario
+from busqueda import procesar_busqueda_multiple
+from exportacion import escribir_excel
+from indice_espacial import construir_indice_espacial
+from inventario import hash_contenido, leer_inventario
+from plantilla_pptx import compilar_plantilla, generar_presentacion
+
+# ================================
+# Motor de propuestas sin interfaz
+# ================================
+
+# Lo mismo que hace la app (búsqueda, CSV, Excel y presentación) sin Streamlit, para
+# generar propuestas por lote. Cada proceso del pool abre el inventario una sola vez
+# desde el almacén local (con mmap, así que los procesos comparten la memoria).
+FORMATOS = ("csv", "xlsx", "pptx")
+RUTA_PLANTILLA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plantilla2.pptx")
+
+def folio_propuesta(nombre_negocio="", lugares=None, ahora=None):
+    """Folio NOMBRE-AAAAMMDD-HHMM con el nombre del negocio o, si no hay, el del primer lugar"""
+    ahora = ahora or datetime.now()
+    if nombre_negocio and nombre_negocio.strip():
+        nombre_limpio = re.sub(r'[^a-zA-Z0-9]', '', nombre_negocio.strip())[:15]
+    elif lugares:
+        primer_lugar = lugares[0].get("nombre", "LUGAR")
+        nombre_limpio = re.sub(r'[^a-zA-Z0-9]', '', primer_lugar)[:15] if primer_lugar else "LUGAR"
+    else:
+        nombre_limpio = "NEGOCIO"
+    return f"{nombre_limpio}-{ahora.year}{ahora.month:02d}{ahora.day:02d}-{ahora.hour:02d}{ahora.minute:02d}"
+
+def leer_clientes(ruta):
+    """Clientes de un archivo JSON (lista) o JSON Lines (uno por línea).
+
+    Cada cliente: {"nombre", "lugares": [{"nombre", "lat", "lon"}], "radio_km"} y
+    opcionalmente "presupuesto_min", "presupuesto_max" y "tipos" (lista; vacía = todos).
+    """
+    with open(ruta, encoding="utf-8") as archivo:
+        texto = archivo.read()
+    if ruta.endswith(".jsonl"):
+        registros = [json.loads(linea) for linea in texto.splitlines() if linea.strip()]
+    else:
+        registros = json.loads(texto)
+    clientes = []
+    for numero, registro in enumerate(registros, start=1):
+        try:
+            lugares = [
+                {"nombre": str(lugar.get("nombre", "")), "lat": float(lugar["lat"]), "lon": float(lugar["lon"])}
+                for lugar in registro["lugares"]
+            ]
+            if not lugares:
+                raise ValueError("sin lugares")
+            clientes.append({
+                "nombre": str(registro.get("nombre", "")),
+                "lugares": lugares,
+                "radio_km": float(registro.get("radio_km", 5.0)),
+                "presupuesto_min": float(registro.get("presupuesto_min", 0.0)),
+                "presupuesto_max": float(registro.get("presupuesto_max", 100000.0)),
+                "tipos": list(registro.get("tipos") or []),
+            })
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Cliente {numero} de {ruta} no es válido: {e}")
+    return clientes
+
+def preparar_inventario(ruta_csv, directorio=DIRECTORIO_ALMACEN):
+    """Normaliza el CSV (si esa versión no está ya en el almacén) y devuelve su hash"""
+    with open(ruta_csv, "rb") as archivo:
+        contenido = archivo.read()
+    hash_archivo = hash_contenido(contenido)
+    if cargar_inventario(hash_archivo, directorio) is None:
+        df = leer_inventario(io.BytesIO(contenido))
+        indice = construir_indice_espacial(df["LATITUD_DECIMAL"], df["LONGITUD_DECIMAL"], validos=df["COORDENADA_VALIDA"])
+        guardar_inventario(df, hash_archivo, indice, directorio)
+    return hash_archivo
+
+def generar_propuesta(df_inventario, indice_espacial, plantilla, cliente, directorio_salida, formatos=FORMATOS, folio=None):
+    """Busca los espectaculares del cliente y escribe sus archivos en `directorio_salida`.
+
+    Devuelve {"nombre", "folio", "resultados", "archivos", "avisos"}; sin resultados no
+    se escribe nada.
+    """
+    avisos = []
+    busqueda_combinada, _, _ = procesar_busqueda_multiple(
+        df_inventario, cliente["lugares"], cliente["radio_km"], cliente["presupuesto_min"],
+        cliente["presupuesto_max"], cliente["tipos"], indice_espacial, avisos
+    )
+    folio = folio or folio_propuesta(cliente["nombre"], cliente["lugares"])
+    propuesta = {"nombre": cliente["nombre"], "folio": folio, "resultados": len(busqueda_combinada),
+                 "archivos": [], "avisos": avisos}
+    if busqueda_combinada.empty:
+        avisos.append("No se encontraron espectaculares en ninguno de los lugares.")
+        return propuesta
+
+    ruta_base = os.path.join(directorio_salida, folio)
+    if "csv" in formatos:
+        busqueda_combinada.to_csv(f"{ruta_base}_resultados.csv", index=False, encoding="utf-8")
+        propuesta["archivos"].append(f"{ruta_base}_resultados.csv")
+    if "xlsx" in formatos:
+        escribir_excel(busqueda_combinada, f"{ruta_base}_resultados.xlsx", hoja="Lugares cercanos")
+        propuesta["archivos"].append(f"{ruta_base}_resultados.xlsx")
+    if "pptx" in formatos:
+        contenido, avisos_pptx = generar_presentacion(plantilla["ruta"], plantilla, busqueda_combinada, cliente["nombre"], 1)
+        with open(f"{ruta_base}.pptx", "wb") as archivo:
+            archivo.write(contenido)
+        avisos.extend(avisos_pptx)
+        propuesta["archivos"].append(f"{ruta_base}.pptx")
+    return propuesta
+
+def folios_unicos(clientes, ahora=None):
+    """Un folio por cliente; los repetidos dentro del lote llevan -2, -3, ..."""
+    ahora = ahora or datetime.now()
+    vistos = {}
+    folios = []
+    for cliente in clientes:
+        folio = folio_propuesta(cliente["nombre"], cliente["lugares"], ahora)
+        vistos[folio] = vistos.get(folio, 0) + 1
+        folios.append(folio if vistos[folio] == 1 else f"{folio}-{vistos[folio]}")
+    return folios
+
+# Estado de cada proceso del pool: inventario y plantilla se abren una vez por proceso
+_TRABAJADOR = {}
+
+def _iniciar_trabajador(hash_archivo, directorio, ruta_plantilla):
+    almacenado = cargar_inventario(hash_archivo, directorio)
+    if almacenado is None:
+        raise ValueError(f"El inventario {hash_archivo} no está en el almacén {directorio}")
+    _TRABAJADOR["inventario"], _TRABAJADOR["indice"] = almacenado
+    _TRABAJADOR["plantilla"] = compilar_plantilla(ruta_plantilla) if ruta_plantilla else None
+
+def _propuesta_en_trabajador(argumentos):
+    cliente, directorio_salida, formatos, folio = argumentos
+    inicio = time.perf_counter()
+    propuesta = generar_propuesta(_TRABAJADOR["inventario"], _TRABAJADOR["indice"], _TRABAJADOR["plantilla"],
+                                  cliente, directorio_salida, formatos, folio)
+    propuesta["segundos"] = time.perf_counter() - inicio
+    return propuesta
+
+def generar_lote(clientes, hash_archivo, directorio_salida, formatos=FORMATOS, procesos=None,
+                 directorio=DIRECTORIO_ALMACEN, ruta_plantilla=RUTA_PLANTILLA):
+    """Genera las propuestas de todos los clientes repartidas en `procesos` procesos
+    (None = uno por núcleo; 1 = en este mismo proceso). Va devolviendo cada propuesta
+    en el orden de `clientes`."""
+    os.makedirs(directorio_salida, exist_ok=True)
+    iniciales = (hash_archivo, directorio, ruta_plantilla if "pptx" in formatos else None)
+    tareas = [(cliente, directorio_salida, formatos, folio) for cliente, folio in zip(clientes, folios_unicos(clientes))]
+    if procesos == 1:
+        _iniciar_trabajador(*iniciales)
+        for tarea in tareas:
+            yield _propuesta_en_trabajador(tarea)
+        return
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador, initargs=iniciales) as pool:
+        yield from pool.map(_propuesta_en_trabajador, tareas)
@@ -0,0 +1,260 @@
+import io
+import os
+import posixpath
+import re
+import zipfile
+from copy import deepcopy
+from xml.sax.saxutils import quoteattr
+
+from lxml import etree
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.oxml.ns import qn
+
+# ================================
+# Plantilla PPTX compilada
+# ================================
+
+PATRON_MARCADOR = re.compile(r"\{\{(.*?)\}\}")
+MARCADOR_NEGOCIO = "{{NOMBRE_NEGOCIO}}"
+
+def compilar_plantilla(ruta_plantilla):
+    """Recorre la plantilla una sola vez y anota qué runs tienen marcadores {{campo}}.
+
+    Devuelve {"ruta", "modificada", "diapositivas"}; cada diapositiva guarda el número de
+    shapes y la lista de runs con marcadores como (shape, párrafo, run, nombres). Igual
+    que antes, solo se revisan los shapes de primer nivel con texto.
+    """
+    prs = Presentation(ruta_plantilla)
+    diapositivas = []
+    for slide in prs.slides:
+        runs = []
+        for indice_shape, shape in enumerate(slide.shapes):
+            if not shape.has_text_frame:
+                continue
+            for indice_parrafo, para in enumerate(shape.text_frame.paragraphs):
+                for indice_run, run in enumerate(para.runs):
+                    nombres = PATRON_MARCADOR.findall(run.text)
+                    if nombres:
+                        runs.append((indice_shape, indice_parrafo, indice_run, nombres))
+        diapositivas.append({"total_shapes": len(slide.shapes), "runs": runs})
+    return {
+        "ruta": ruta_plantilla,
+        "modificada": os.path.getmtime(ruta_plantilla),
+        "diapositivas": diapositivas,
+    }
+
+def resolver_campos(plantilla, columnas):
+    """Para cada diapositiva, los runs con las columnas que les tocan (en el orden de `columnas`).
+
+    Se calcula una vez por presentación; los marcadores sin columna se dejan como están.
+    """
+    columnas = list(columnas)
+    resueltas = []
+    for diapositiva in plantilla["diapositivas"]:
+        runs = []
+        for indice_shape, indice_parrafo, indice_run, nombres in diapositiva["runs"]:
+            campos = [campo for campo in columnas if campo.strip() in nombres]
+            negocio = "NOMBRE_NEGOCIO" in nombres
+            if campos or negocio:
+                runs.append((indice_shape, indice_parrafo, indice_run, negocio, campos))
+        resueltas.append({"total_shapes": diapositiva["total_shapes"], "runs": runs})
+    return resueltas
+
+def duplicar_slide(prs, slide, avisos=None):
+    """Agrega al final una copia de `slide` (shapes y relaciones de imagen e hipervínculo)"""
+    new_slide = prs.slides.add_slide(slide.slide_layout)
+    for shp in slide.shapes:
+        el = deepcopy(shp.element)
+        new_slide.shapes._spTree.insert_element_before(el, 'p:extLst')
+    for rel in slide.part.rels.values():
+        try:
+            if rel.reltype == RT.IMAGE:
+                image_part = rel.target_part
+                new_slide.part.relate_to(image_part, RT.IMAGE)
+            elif rel.reltype == RT.HYPERLINK:
+                new_slide.part.relate_to(rel.target_ref, RT.HYPERLINK)
+        except Exception as e:
+            if avisos is not None:
+                avisos.append(f"No se pudo copiar relación: {e}")
+    return new_slide
+
+def _reemplazar_marcadores(texto, negocio, campos, fila, nombre_negocio):
+    """Texto del run con los valores de la fila; indica también si se reemplazó LATITUD"""
+    latitud = False
+    if negocio and nombre_negocio:
+        texto = texto.replace(MARCADOR_NEGOCIO, nombre_negocio)
+    for campo in campos:
+        marcador = f"{{{{{campo.strip()}}}}}"
+        if marcador in texto:
+            texto = texto.replace(marcador, str(fila.get(campo, "")))
+            latitud = latitud or campo.strip().upper() == "LATITUD"
+    return texto, latitud
+
+def aplicar_plantilla(slide, diapositiva_resuelta, fila, nombre_negocio=""):
+    """Escribe los valores de `fila` solo en los runs anotados de la diapositiva.
+
+    Los shapes copiados de la plantilla son los últimos de `slide`, así que la posición
+    se cuenta desde el final. El marcador de LATITUD además lleva el hipervínculo a
+    STREET_VIEW. Devuelve los avisos de hipervínculos que no se pudieron crear.
+    """
+    shapes = list(slide.shapes)
+    desfase = len(shapes) - diapositiva_resuelta["total_shapes"]
+    avisos = []
+    for indice_shape, indice_parrafo, indice_run, negocio, campos in diapositiva_resuelta["runs"]:
+        run = shapes[desfase + indice_shape].text_frame.paragraphs[indice_parrafo].runs[indice_run]
+        texto, latitud = _reemplazar_marcadores(run.text, negocio, campos, fila, nombre_negocio)
+        if texto != run.text:
+            run.text = texto
+        if latitud:
+            try:
+                run.hyperlink.address = fila.get("STREET_VIEW", "#")
+            except Exception as e:
+                avisos.append(f"No se pudo crear el hipervínculo para LATITUD: {e}")
+    return avisos
+
+# ================================
+# Presentación por flujo (memoria acotada)
+# ================================
+
+NS_RELACIONES = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_TIPOS = "http://schemas.openxmlformats.org/package/2006/content-types"
+TIPO_SLIDE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+# Relaciones que pertenecen a una sola diapositiva y no se comparten con las copias
+RELACIONES_PROPIAS = {RT.NOTES_SLIDE, RT.COMMENTS}
+# A partir de cuántas diapositivas la app genera la presentación por flujo
+UMBRAL_PRESENTACION_POR_FLUJO = 200
+
+def _xml_relaciones(relaciones):
+    """Archivo .rels a partir de tuplas (rId, tipo, destino, externo)"""
+    partes = [f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{NS_RELACIONES}">']
+    for rid, tipo, destino, externo in relaciones:
+        modo = ' TargetMode="External"' if externo else ""
+        partes.append(f"<Relationship Id={quoteattr(rid)} Type={quoteattr(tipo)} Target={quoteattr(destino)}{modo}/>")
+    partes.append("</Relationships>")
+    return "".join(partes).encode("utf-8")
+
+def _siguiente_rid(rids):
+    numeros = [int(rid[3:]) for rid in rids if rid.startswith("rId") and rid[3:].isdigit()]
+    return max(numeros, default=0) + 1
+
+def escribir_presentacion(ruta_plantilla, plantilla, df, destino, nombre_negocio="", indice_base=1):
+    """Genera la presentación escribiendo cada diapositiva directo al ZIP de salida.
+
+    Escribe los mismos textos e hipervínculos que duplicar la diapositiva base con
+    python-pptx por cada fila, pero solo una diapositiva vive en memoria a la vez: se copia
+    el XML de la base, se escriben los runs anotados y se comprime. A diferencia de
+    duplicar_slide, cada copia tiene solo los shapes de la base: no lleva los placeholders
+    vacíos que add_slide agrega desde el layout. Las imágenes de la plantilla se comparten
+    (todas las copias apuntan a la misma parte). `destino` es una ruta o archivo binario.
+    Devuelve los avisos de hipervínculos que no se pudieron crear.
+    """
+    prs = Presentation(ruta_plantilla)
+    diapositivas = resolver_campos(plantilla, df.columns)
+    avisos = []
+    if not df.empty:
+        avisos += aplicar_plantilla(prs.slides[0], diapositivas[0], df.iloc[0].to_dict(), nombre_negocio)
+
+    # Posición de cada run con marcadores dentro del recorrido del XML de la diapositiva base
+    slide_base = prs.slides[indice_base]
+    base = slide_base._element
+    orden = {elemento: posicion for posicion, elemento in enumerate(base.iter())}
+    shapes = list(slide_base.shapes)
+    runs = []
+    for indice_shape, indice_parrafo, indice_run, negocio, campos in diapositivas[indice_base]["runs"]:
+        r = shapes[indice_shape].text_frame.paragraphs[indice_parrafo].runs[indice_run]._r
+        runs.append((orden[r], negocio, campos))
+
+    relaciones_base = [
+        (rel.rId, rel.reltype, rel.target_ref, rel.is_external)
+        for rel in slide_base.part.rels.values() if rel.reltype not in RELACIONES_PROPIAS
+    ]
+    rid_hipervinculo = f"rId{_siguiente_rid([rel[0] for rel in relaciones_base])}"
+    carpeta_slides = posixpath.dirname(slide_base.part.partname)[1:]
+    nombre_presentacion = prs.part.partname[1:]
+    rels_presentacion = prs.part.partname.rels_uri[1:]
+
+    esqueleto = io.BytesIO()
+    prs.save(esqueleto)
+    del prs, slide_base, shapes
+
+    with zipfile.ZipFile(esqueleto) as origen, zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as salida:
+        nombres = origen.namelist()
+        patron_slide = re.compile(rf"^{re.escape(carpeta_slides)}/slide(\d+)\.xml$")
+        numero = max((int(m.group(1)) for m in map(patron_slide.match, nombres) if m), default=0)
+        nuevas = [f"{carpeta_slides}/slide{numero + i + 1}.xml" for i in range(len(df))]
+
+        # Índices del paquete: se conocen de antemano porque el número de filas ya se sabe
+        tipos = etree.fromstring(origen.read("[Content_Types].xml"))
+        for nombre in nuevas:
+            etree.SubElement(tipos, f"{{{NS_TIPOS}}}Override", PartName=f"/{nombre}", ContentType=TIPO_SLIDE)
+        salida.writestr("[Content_Types].xml", etree.tostring(tipos, xml_declaration=True, encoding="UTF-8", standalone=True))
+
+        relaciones = etree.fromstring(origen.read(rels_presentacion))
+        presentacion = etree.fromstring(origen.read(nombre_presentacion))
+        lista_slides = presentacion.find(qn("p:sldIdLst"))
+        if lista_slides is None:
+            lista_slides = etree.SubElement(presentacion, qn("p:sldIdLst"))
+        siguiente_rid = _siguiente_rid([rel.get("Id") for rel in relaciones])
+        siguiente_id = max([int(sld.get("id")) for sld in lista_slides] + [255]) + 1
+        for i, nombre in enumerate(nuevas):
+            rid = f"rId{siguiente_rid + i}"
+            etree.SubElement(relaciones, f"{{{NS_RELACIONES}}}Relationship", Id=rid, Type=RT.SLIDE,
+                             Target=posixpath.relpath(nombre, posixpath.dirname(nombre_presentacion)))
+            etree.SubElement(lista_slides, qn("p:sldId"), {"id": str(siguiente_id + i), qn("r:id"): rid})
+        salida.writestr(rels_presentacion, etree.tostring(relaciones, xml_declaration=True, encoding="UTF-8", standalone=True))
+        salida.writestr(nombre_presentacion, serialize_part_xml(presentacion))
+        del tipos, relaciones, presentacion, lista_slides
+
+        for nombre in nombres:
+            if nombre not in ("[Content_Types].xml", rels_presentacion, nombre_presentacion):
+                salida.writestr(origen.getinfo(nombre), origen.read(nombre))
+
+        for nombre, fila in zip(nuevas, df.to_dict("records")):
+            copia = deepcopy(base)
+            elementos = list(copia.iter())
+            relaciones_slide = list(relaciones_base)
+            # Todos los runs de LATITUD de la diapositiva apuntan a la misma dirección: una sola relación
+            con_hipervinculo = False
+            for posicion, negocio, campos in runs:
+                r = elementos[posicion]
+                texto, latitud = _reemplazar_marcadores(r.text, negocio, campos, fila, nombre_negocio)
+                if texto != r.text:
+                    r.text = texto
+                direccion = fila.get("STREET_VIEW", "#") if latitud else None
+                if direccion:
+                    try:
+                        rPr = r.get_or_add_rPr()
+                        if rPr.hlinkClick is not None:
+                            rPr._remove_hlinkClick()
+                        rPr.add_hlinkClick(rid_hipervinculo)
+                        if not con_hipervinculo:
+                            relaciones_slide.append((rid_hipervinculo, RT.HYPERLINK, str(direccion), True))
+                            con_hipervinculo = True
+                    except Exception as e:
+                        avisos.append(f"No se pudo crear el hipervínculo para LATITUD: {e}")
+            salida.writestr(nombre, serialize_part_xml(copia))
+            carpeta, archivo = posixpath.split(nombre)
+            salida.writestr(f"{carpeta}/_rels/{archivo}.rels", _xml_relaciones(relaciones_slide))
+    return avisos
+
+def generar_presentacion(ruta_plantilla, plantilla, df, nombre_negocio="", indice_base=1):
+    """Bytes de la presentación y avisos; desde UMBRAL_PRESENTACION_POR_FLUJO filas usa el modo por flujo"""
+    salida = io.BytesIO()
+    if len(df) >= UMBRAL_PRESENTACION_POR_FLUJO:
+        avisos = escribir_presentacion(ruta_plantilla, plantilla, df, salida, nombre_negocio, indice_base)
+        return salida.getvalue(), avisos
+
+    prs = Presentation(ruta_plantilla)
+    slide_base = prs.slides[indice_base]
+    # Los runs con marcadores se resuelven una vez por presentación, no por diapositiva
+    diapositivas = resolver_campos(plantilla, df.columns)
+    avisos = []
+    for fila in df.to_dict("records"):
+        nueva_slide = duplicar_slide(prs, slide_base, avisos)
+        avisos += aplicar_plantilla(nueva_slide, diapositivas[indice_base], fila, nombre_negocio)
+    if not df.empty:
+        avisos += aplicar_plantilla(prs.slides[0], diapositivas[0], df.iloc[0].to_dict(), nombre_negocio)
+    prs.save(salida)
+    return salida.getvalue(), avisos
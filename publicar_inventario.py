@@ -0,0 +1,32 @@
+"""Proceso cargador: normaliza un CSV de inventario y lo publica en el almacén local.
+
+Los procesos de la app que no tienen un archivo subido por el usuario abren la versión
+publicada con mmap (sin copiarla) y cambian a la nueva en cuanto se vuelve a publicar.
+
+Uso: python publicar_inventario.py inventario.csv [--almacen DIRECTORIO]
+"""
+import argparse
+import sys
+
+from almacen_inventario import DIRECTORIO_ALMACEN, publicar_version
+from motor import preparar_inventario
+
+def publicar(ruta_csv, directorio=DIRECTORIO_ALMACEN):
+    """Normaliza y publica el CSV; devuelve su hash. Si esa versión ya estaba guardada solo se publica"""
+    hash_archivo = preparar_inventario(ruta_csv, directorio)
+    publicar_version(hash_archivo, directorio)
+    return hash_archivo
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv")
+    parser.add_argument("--almacen", default=DIRECTORIO_ALMACEN)
+    args = parser.parse_args()
+    try:
+        hash_archivo = publicar(args.csv, args.almacen)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    print(f"✅ Inventario publicado: {hash_archivo}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+
+# ================================
+# Registro compartido de inventarios
+# ================================
+
+# Un inventario normalizado (DataFrame + índice espacial) por hash de contenido para todo
+# el proceso; las sesiones solo guardan el hash y sus filtros/selecciones. Las entradas
+# que ninguna sesión activa usa se sacan (la usada hace más tiempo primero) cuando hay
+# más de MAXIMO_INVENTARIOS.
+MAXIMO_INVENTARIOS = 4
+
+def crear_registro(maximo=MAXIMO_INVENTARIOS, sesion_activa=None):
+    """Registro vacío. `sesion_activa(id)` indica si una sesión sigue abierta; las que ya
+    se cerraron dejan de contar como referencia al momento de desalojar"""
+    return {
+        "entradas": OrderedDict(),
+        "maximo": maximo,
+        "sesion_activa": sesion_activa or (lambda sesion: True),
+        "candado": threading.Lock(),
+    }
+
+def _desalojar(registro):
+    """Saca entradas sin sesiones activas mientras se pase del máximo (llamar con el candado)"""
+    entradas = registro["entradas"]
+    for hash_archivo in list(entradas):
+        if len(entradas) <= registro["maximo"]:
+            break
+        entrada = entradas[hash_archivo]
+        entrada["sesiones"] = {sesion for sesion in entrada["sesiones"] if registro["sesion_activa"](sesion)}
+        if not entrada["sesiones"] and entrada["inventario"] is not None:
+            del entradas[hash_archivo]
+
+def adquirir_inventario(registro, hash_archivo, sesion, cargar):
+    """(df, indice_espacial) del inventario `hash_archivo`, registrando a `sesion` como usuaria.
+
+    Si no está en el registro se arma con `cargar()` una sola vez: otras sesiones que lo
+    pidan al mismo tiempo esperan a que termine en lugar de volver a leerlo. Si `cargar`
+    falla, la excepción sale tal cual y la entrada no queda registrada.
+    """
+    with registro["candado"]:
+        entrada = registro["entradas"].get(hash_archivo)
+        if entrada is None:
+            entrada = {"inventario": None, "sesiones": set(), "candado": threading.Lock()}
+            registro["entradas"][hash_archivo] = entrada
+        registro["entradas"].move_to_end(hash_archivo)
+        entrada["sesiones"].add(sesion)
+
+    with entrada["candado"]:
+        if entrada["inventario"] is None:
+            try:
+                entrada["inventario"] = cargar()
+            except BaseException:
+                with registro["candado"]:
+                    entrada["sesiones"].discard(sesion)
+                    if not entrada["sesiones"] and registro["entradas"].get(hash_archivo) is entrada:
+                        del registro["entradas"][hash_archivo]
+                raise
+
+    with registro["candado"]:
+        _desalojar(registro)
+    return entrada["inventario"]
+
+def liberar_inventario(registro, hash_archivo, sesion):
+    """La sesión deja de usar el inventario (por ejemplo, al subir otro archivo)"""
+    with registro["candado"]:
+        entrada = registro["entradas"].get(hash_archivo)
+        if entrada is not None:
+            entrada["sesiones"].discard(sesion)
+            _desalojar(registro)
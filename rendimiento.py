@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+from itertools import count
+from contextlib import contextmanager
+from datetime import datetime
+
+# ================================
+# Medición de etapas
+# ================================
+
+# Cada etapa medida deja un registro {etapa, segundos, filas_entrada, filas_salida,
+# pico_mb, hora} en el medidor y una línea JSON en el logger "espectaculares.rendimiento".
+# Con el medidor apagado (o sin medidor) `etapa` no mide nada.
+MAXIMO_REGISTROS = 200
+# ESPECTACULARES_RENDIMIENTO=1 prende la medición desde el arranque (si no, se prende en la app)
+ACTIVO_POR_OMISION = os.environ.get("ESPECTACULARES_RENDIMIENTO", "") not in ("", "0")
+
+logger = logging.getLogger("espectaculares.rendimiento")
+if not logger.handlers:
+    _manejador = logging.StreamHandler()
+    _manejador.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_manejador)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# tracemalloc es de todo el proceso: se guardan los medidores (sesiones) que miden memoria
+# y solo se detiene cuando ya no queda ninguno. Un medidor que se descarta (la sesión se
+# cerró con la medición prendida) sale del conjunto al recolectarse. El candado es
+# reentrante porque la recolección puede correr mientras el mismo hilo lo tiene.
+_bloqueo_memoria = threading.RLock()
+_medidores_con_memoria = set()
+_numeros_medidor = count()
+
+class _Testigo:
+    """Vive lo mismo que su medidor (un dict no admite weakref)"""
+
+def _soltar_memoria(numero):
+    with _bloqueo_memoria:
+        _medidores_con_memoria.discard(numero)
+        if not _medidores_con_memoria and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+def crear_medidor(activo=ACTIVO_POR_OMISION, memoria=False, maximo=MAXIMO_REGISTROS):
+    """Medidor con los últimos `maximo` registros.
+
+    `memoria` agrega la memoria pico de Python de cada etapa con tracemalloc; hace más lentas
+    las etapas medidas y no ve la memoria que reserva Arrow, así que es opcional. Se cambia
+    con cambiar_memoria.
+    """
+    medidor = {"activo": activo, "memoria": False, "registros": deque(maxlen=maximo), "hilo": threading.local(),
+               "numero": next(_numeros_medidor), "testigo": _Testigo()}
+    weakref.finalize(medidor["testigo"], _soltar_memoria, medidor["numero"])
+    cambiar_memoria(medidor, memoria)
+    return medidor
+
+def cambiar_memoria(medidor, memoria):
+    """Prende o apaga la medición de memoria de este medidor; tracemalloc se detiene
+    hasta que ningún medidor del proceso la usa"""
+    with _bloqueo_memoria:
+        medidor["memoria"] = bool(memoria)
+        if medidor["memoria"]:
+            _medidores_con_memoria.add(medidor["numero"])
+        else:
+            _soltar_memoria(medidor["numero"])
+
+# Se entrega cuando no se mide, para que el código de la etapa no tenga que preguntar
+_MEDICION_NULA = {}
+
+@contextmanager
+def etapa(medidor, nombre, filas_entrada=None):
+    """Mide el bloque como una etapa. Dentro se puede anotar medicion["filas_salida"]:
+
+        with etapa(medidor, "mapa", len(df)) as medicion:
+            html = construir_mapa(...)
+            medicion["filas_salida"] = marcadores
+    """
+    if medidor is None or not medidor["activo"]:
+        yield _MEDICION_NULA
+        return
+
+    medicion = {"filas_salida": None}
+    pila = getattr(medidor["hilo"], "pila", None)
+    if pila is None:
+        pila = medidor["hilo"].pila = []
+    memoria = medidor["memoria"]
+    if memoria:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # El pico de la etapa que contiene a esta se guarda antes de reiniciar el contador
+        if pila:
+            pila[-1]["pico"] = max(pila[-1]["pico"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    # La memoria pico se reporta por encima de la que ya estaba ocupada al empezar la etapa
+    pila.append({"pico": 0, "base": tracemalloc.get_traced_memory()[0] if memoria else 0})
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        segundos = time.perf_counter() - inicio
+        propia = pila.pop()
+        pico_mb = None
+        if memoria and tracemalloc.is_tracing():
+            pico = max(propia["pico"], tracemalloc.get_traced_memory()[1])
+            if pila:
+                pila[-1]["pico"] = max(pila[-1]["pico"], pico)
+            pico_mb = round(max(pico - propia["base"], 0) / 1024 / 1024, 2)
+        registro = {
+            "etapa": nombre,
+            "segundos": round(segundos, 4),
+            "filas_entrada": filas_entrada,
+            "filas_salida": medicion["filas_salida"],
+            "pico_mb": pico_mb,
+            "hora": datetime.now().strftime("%H:%M:%S"),
+        }
+        medidor["registros"].append(registro)
+        logger.info(json.dumps(registro, ensure_ascii=False, default=str))
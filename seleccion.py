@@ -0,0 +1,57 @@
+import pandas as pd
+
+from exportacion import tarifa_a_numero
+
+# ================================
+# Selección de espectaculares por lugar
+# ================================
+
+# La selección es un dict {lugar: set(CLAVE)}: agregar y quitar son O(1) y no depende
+# de la posición de la fila en la tabla de resultados
+
+def claves_lugar(df_lugar):
+    """CLAVE de cada fila como texto (la llave de la selección)"""
+    return df_lugar["CLAVE"].astype(str)
+
+def opciones_lugar(df_lugar):
+    """(claves sin repetir en el orden de la tabla, {clave: etiqueta}) para el multiselect"""
+    claves = claves_lugar(df_lugar)
+    etiquetas = (claves + " - " + df_lugar["TARIFA_PUBLICO"].astype(str) + " - "
+                 + df_lugar["DISTANCIA_KM"].astype(str) + " km - " + df_lugar["TIPO"].astype(str))
+    unicas = ~claves.duplicated()
+    return claves[unicas].tolist(), dict(zip(claves[unicas].tolist(), etiquetas[unicas].tolist()))
+
+def seleccion_de(selecciones, lugar):
+    """Conjunto de claves seleccionadas en un lugar (se crea vacío si no existe)"""
+    return selecciones.setdefault(lugar, set())
+
+def agregar_claves(selecciones, lugar, claves):
+    seleccion_de(selecciones, lugar).update(claves)
+
+def quitar_claves(selecciones, lugar, claves):
+    seleccion_de(selecciones, lugar).difference_update(claves)
+
+def claves_dentro_de(df_lugar, distancia_km):
+    """Claves a no más de `distancia_km` del lugar"""
+    dentro = pd.to_numeric(df_lugar["DISTANCIA_KM"], errors="coerce") <= distancia_km
+    return set(claves_lugar(df_lugar)[dentro.to_numpy()])
+
+def claves_bajo_presupuesto(df_lugar, tarifa_maxima):
+    """Claves con TARIFA_PUBLICO menor o igual a `tarifa_maxima` (las tarifas no numéricas quedan fuera)"""
+    dentro = tarifa_a_numero(df_lugar["TARIFA_PUBLICO"]) <= tarifa_maxima
+    return set(claves_lugar(df_lugar)[dentro.to_numpy()])
+
+def filas_seleccionadas(df_lugar, claves):
+    """Filas del lugar cuya CLAVE está en la selección, en el orden de la tabla"""
+    if not claves:
+        return df_lugar.iloc[:0]
+    return df_lugar[claves_lugar(df_lugar).isin(claves).to_numpy()]
+
+def combinar_selecciones(selecciones, df_por_lugar):
+    """Un solo DataFrame con las filas seleccionadas de todos los lugares"""
+    partes = [filas_seleccionadas(df_lugar, selecciones.get(lugar, set()))
+              for lugar, df_lugar in df_por_lugar.items()]
+    partes = [parte for parte in partes if not parte.empty]
+    if not partes:
+        return pd.DataFrame()
+    return pd.concat(partes)
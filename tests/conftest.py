@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos viven en la raíz del repositorio
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+RUTA_INVENTARIO = os.path.join(RAIZ, "inventario.csv")
+
+@pytest.fixture(scope="session")
+def inventario():
+    """inventario.csv normalizado"""
+    from inventario import leer_inventario
+    with open(RUTA_INVENTARIO, "rb") as archivo:
+        return leer_inventario(archivo)
+
+@pytest.fixture(scope="session")
+def indice(inventario):
+    """Índice espacial del inventario, como lo arma la app"""
+    from indice_espacial import construir_indice_espacial
+    return construir_indice_espacial(inventario["LATITUD_DECIMAL"], inventario["LONGITUD_DECIMAL"],
+                                     validos=inventario["COORDENADA_VALIDA"])
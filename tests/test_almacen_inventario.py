@@ -0,0 +1,33 @@
+import threading
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from almacen_inventario import _tabla_a_dataframe, cargar_inventario, guardar_inventario
+
+def test_guardar_y_cargar_sin_copiar_columnas_con_nan(inventario, indice, tmp_path):
+    guardar_inventario(inventario, "inventario", indice, str(tmp_path))
+    cargado, indice_cargado = cargar_inventario("inventario", str(tmp_path))
+    pd.testing.assert_frame_equal(cargado, inventario)
+    np.testing.assert_array_equal(indice_cargado["posiciones"], indice["posiciones"])
+
+    tabla = feather.read_table(os.path.join(str(tmp_path), "inventario", "inventario.feather"), memory_map=True)
+    df = _tabla_a_dataframe(tabla)
+    for columna in ["LATITUD_DECIMAL", "LONGITUD_DECIMAL", "TARIFA"]:
+        assert df[columna].isna().any()
+        # La columna apunta al buffer del archivo mapeado, no a una copia
+        datos = tabla.column(columna).chunk(0).buffers()[1]
+        assert df[columna].to_numpy().ctypes.data == datos.address
+
+def test_escrituras_simultaneas_de_la_misma_version(tmp_path):
+    df = pd.DataFrame({"A": np.arange(1000.0), "B": ["x"] * 1000})
+    hilos = [threading.Thread(target=guardar_inventario, args=(df, "misma", None, str(tmp_path), True)) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sorted(ruta.name for ruta in tmp_path.iterdir()) == ["misma", "publicada.txt", "ultima.txt"]
+    pd.testing.assert_frame_equal(cargar_inventario("misma", str(tmp_path))[0], df)
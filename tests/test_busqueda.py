@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from busqueda import _filtros_mejores, mejores_posiciones
+from distancias import filtrar_por_radio
+
+LUGARES = [(19.4326, -99.1332), (20.6736, -103.3440), (24.0338, -104.6540), (25.6866, -100.3161)]
+CRITERIOS = [("distancia", 0.5), ("tarifa", 0.5), ("puntaje", 0.7), ("puntaje", 0.2)]
+
+@pytest.fixture(scope="module")
+def filtros(inventario):
+    """(presupuesto_min, presupuesto_max, tipos): sin filtro, por presupuesto y por tipo"""
+    tipos = inventario["TIPO"].dropna().astype(str).value_counts().index[:1].tolist()
+    return [(None, None, []), (10000, 40000, []), (None, 30000, tipos)]
+
+def _a_fuerza_bruta(df, lat, lon, cuantos, candidatos, tarifas, escala, criterio, peso_distancia, radio_max_km):
+    """Todas las candidatas dentro del radio, con puntaje, ordenadas completas"""
+    latitudes = df["LATITUD_DECIMAL"].to_numpy(dtype=float)
+    longitudes = df["LONGITUD_DECIMAL"].to_numpy(dtype=float)
+    posiciones = np.flatnonzero(candidatos)
+    dentro, distancias = filtrar_por_radio(lat, lon, latitudes[posiciones], longitudes[posiciones], radio_max_km, exacto=False)
+    posiciones = posiciones[dentro]
+    peso_d, peso_t = {"distancia": (1.0, 0.0), "tarifa": (0.0, 1.0)}.get(criterio, (peso_distancia, 1.0 - peso_distancia))
+    puntajes = peso_d * distancias / radio_max_km
+    if peso_t > 0:
+        tarifa = tarifas[posiciones]
+        puntajes = puntajes + peso_t * np.where(np.isnan(tarifa), np.inf, tarifa) / escala
+    orden = np.lexsort((posiciones, distancias, puntajes))
+    return posiciones[orden][:cuantos]
+
+@pytest.mark.parametrize("criterio, peso_distancia", CRITERIOS)
+@pytest.mark.parametrize("con_indice", [True, False])
+def test_mejores_igual_que_ordenar_todo(criterio, peso_distancia, con_indice, inventario, indice, filtros):
+    indice_espacial = indice if con_indice else None
+    for presupuesto_min, presupuesto_max, tipos in filtros:
+        df, candidatos, tarifas, escala = _filtros_mejores(inventario, presupuesto_min, presupuesto_max, tipos)
+        for lat, lon in LUGARES:
+            for cuantos, radio_max_km in [(1, 50.0), (10, 50.0), (40, 15.0), (500, 5.0)]:
+                posiciones, distancias = mejores_posiciones(df, lat, lon, cuantos, candidatos, tarifas, indice_espacial,
+                                                            criterio, peso_distancia, radio_max_km, escala)
+                esperadas = _a_fuerza_bruta(df, lat, lon, cuantos, candidatos, tarifas, escala, criterio,
+                                            peso_distancia, radio_max_km)
+                np.testing.assert_array_equal(posiciones, esperadas)
+                assert np.all(distancias < radio_max_km)
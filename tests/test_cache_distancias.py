@@ -0,0 +1,53 @@
+import pytest
+
+from busqueda import procesar_busqueda_multiple, procesar_busqueda_multiple_en_cache
+from cache_distancias import crear_cache_distancias
+
+LUGARES = [
+    {"nombre": "Zócalo", "lat": 19.4326, "lon": -99.1332},
+    {"nombre": "Coyoacán", "lat": 19.3500, "lon": -99.1620},
+    {"nombre": "Guadalajara", "lat": 20.6736, "lon": -103.3440},
+]
+RADIOS_KM = [0.5, 2.0, 5.0, 15.0, 50.0]
+
+@pytest.fixture(scope="module")
+def filtros(inventario):
+    """(presupuesto_min, presupuesto_max, tipos): sin filtro, por presupuesto y por tipo"""
+    tipos = inventario["TIPO"].dropna().astype(str).value_counts().index[:2].tolist()
+    return [(None, None, []), (10000, 40000, []), (None, None, tipos), (5000, 30000, tipos[:1])]
+
+def _claves_y_distancias(df):
+    if df.empty:
+        return []
+    return sorted((str(clave), distancia, lugar) for clave, distancia, lugar in
+                  zip(df["CLAVE"], df["DISTANCIA_KM"], df["LUGAR_BUSQUEDA"]))
+
+@pytest.mark.parametrize("radio_km", RADIOS_KM)
+def test_cache_igual_que_busqueda_completa(radio_km, inventario, indice, filtros):
+    cache = crear_cache_distancias()
+    for presupuesto_min, presupuesto_max, tipos in filtros:
+        completa, por_lugar, _ = procesar_busqueda_multiple(inventario, LUGARES, radio_km, presupuesto_min,
+                                                            presupuesto_max, tipos, indice)
+        en_cache, por_lugar_cache, _ = procesar_busqueda_multiple_en_cache(
+            inventario, LUGARES, radio_km, presupuesto_min, presupuesto_max, tipos, cache, "inventario", indice
+        )
+        assert _claves_y_distancias(en_cache) == _claves_y_distancias(completa)
+        assert por_lugar_cache.keys() == por_lugar.keys()
+        for nombre in por_lugar:
+            assert _claves_y_distancias(por_lugar_cache[nombre]) == _claves_y_distancias(por_lugar[nombre])
+
+def test_cache_solo_revisa_con_geodesic_cerca_del_borde_o_del_redondeo(inventario, indice, monkeypatch):
+    import cache_distancias as modulo
+    llamadas = []
+    original = modulo.geodesic
+
+    def contar(*args):
+        llamadas.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(modulo, "geodesic", contar)
+    resultado, _, _ = procesar_busqueda_multiple_en_cache(
+        inventario, LUGARES[:1], 15.0, None, None, [], crear_cache_distancias(), "inventario", indice
+    )
+    assert len(resultado) > 50
+    assert len(llamadas) < len(resultado) / 10
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from consolidacion import VECINAS, _agrupar, _celdas, DESPLAZAMIENTO_CELDA, pares_cercanos
+from distancias import distancia_haversine
+
+def _pares_a_fuerza_bruta(latitudes, longitudes, distancia_m):
+    """Todos los pares i < j a menos de `distancia_m`, comparando cada punto con todos"""
+    i, j = np.triu_indices(len(latitudes), k=1)
+    metros = distancia_haversine(latitudes[i], longitudes[i], latitudes[j], longitudes[j]) * 1000
+    cerca = metros <= distancia_m
+    return set(zip(i[cerca].tolist(), j[cerca].tolist()))
+
+def _desplazamientos(latitudes, longitudes, i, j, distancia_m):
+    """(dx, dy) entre la celda de i y la de j, con el signo de VECINAS"""
+    celdas = _celdas(latitudes, longitudes, distancia_m)
+    desplazamientos = set()
+    for a, b in zip(i.tolist(), j.tolist()):
+        x_a, y_a = divmod(int(celdas[a]) + DESPLAZAMIENTO_CELDA // 2, DESPLAZAMIENTO_CELDA)
+        x_b, y_b = divmod(int(celdas[b]) + DESPLAZAMIENTO_CELDA // 2, DESPLAZAMIENTO_CELDA)
+        dx, dy = x_b - x_a, y_b - y_a
+        desplazamientos.add((dx, dy) if (dx, dy) in VECINAS else (-dx, -dy))
+    return desplazamientos
+
+def test_pares_igual_que_comparar_todos(inventario):
+    validas = inventario["COORDENADA_VALIDA"].to_numpy(dtype=bool)
+    latitudes = inventario["LATITUD_DECIMAL"].to_numpy(dtype=float)[validas][:2500]
+    longitudes = inventario["LONGITUD_DECIMAL"].to_numpy(dtype=float)[validas][:2500]
+    for distancia_m in [30.0, 200.0]:
+        i, j, metros = pares_cercanos(latitudes, longitudes, distancia_m)
+        assert len(set(zip(i.tolist(), j.tolist()))) == len(i)
+        assert set(zip(i.tolist(), j.tolist())) == _pares_a_fuerza_bruta(latitudes, longitudes, distancia_m)
+        assert np.all(metros <= distancia_m)
+
+@pytest.mark.parametrize("lat_centro", [0.0, 19.43, 60.0])
+def test_pares_entre_celdas_vecinas(lat_centro):
+    # Puntos apretados en ~300 m: muchos pares cruzan la orilla de su celda en todas direcciones
+    generador = np.random.default_rng(0)
+    latitudes = lat_centro + generador.uniform(0, 0.003, 1500)
+    longitudes = -99.13 + generador.uniform(0, 0.003, 1500)
+    i, j, _ = pares_cercanos(latitudes, longitudes, 30.0)
+    assert set(zip(i.tolist(), j.tolist())) == _pares_a_fuerza_bruta(latitudes, longitudes, 30.0)
+    assert _desplazamientos(latitudes, longitudes, i, j, 30.0) == set(VECINAS)
+
+def test_grupos_transitivos():
+    # Cadena cada 20 m: el primero y el último están a 80 m, pero son el mismo grupo
+    latitudes = 19.43 + np.arange(5) * 20 / 111195.0
+    longitudes = np.full(5, -99.13)
+    latitudes = np.append(latitudes, 19.5)
+    longitudes = np.append(longitudes, -99.2)
+    i, j, _ = pares_cercanos(latitudes, longitudes, 30.0)
+    assert set(zip(i.tolist(), j.tolist())) == {(0, 1), (1, 2), (2, 3), (3, 4)}
+    raices = _agrupar(len(latitudes), i, j)
+    np.testing.assert_array_equal(raices, [0, 0, 0, 0, 0, 5])
+    # Pares en cualquier orden y uniones que juntan dos grupos ya formados
+    raices = _agrupar(8, np.array([6, 3, 1, 4]), np.array([7, 6, 2, 3]))
+    np.testing.assert_array_equal(raices, [0, 1, 1, 3, 3, 5, 3, 3])
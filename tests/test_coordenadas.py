@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RUTA_INVENTARIO
+from coordenadas import (analizar_formato_coordenada, comparar_con_escalar, detectar_inversion_universal,
+                         normalizar_coordenadas, normalizar_fila_coordenadas)
+
+# (latitud, longitud) tal como las escriben los proveedores
+CASOS = [
+    ("19.4326", "-99.1332"),                                    # decimal
+    ("+19.4326", "-99.1332 "),                                  # signo y espacios
+    ("19,4326", "-99,1332"),                                    # decimal europeo
+    ("1,943,260", "-9,913,320"),                                # separadores de miles
+    ("19°25'57.4\"N", "99°07'59.5\"W"),                         # grados con dirección
+    ("19°25'57\"n", "99°7'59\"w"),                              # dirección en minúscula, sin decimales
+    ("19 25 57.4", "-99 7 59.5"),                               # DMS con espacios
+    ("19° 25.957", "-99° 7.992"),                               # grados y minutos decimales
+    ("19432600", "-99133200"),                                  # entero tipo UTM
+    ("1943260", "-991332"),                                     # UTM con otro número de dígitos
+    ("-9913320000", "194326000"),                               # UTM invertido
+    ("-99.1332", "19.4326"),                                    # latitud y longitud intercambiadas
+    ("99°07'59.5\"W", "19°25'57.4\"N"),                         # direcciones intercambiadas
+    ("", "-99.1332"),                                           # latitud vacía
+    ("   ", "   "),                                             # solo espacios
+    (None, None),                                               # nulos
+    ("N/A", "sin dato"),                                        # basura
+    ("lat 19.4326", "lon -99.1332"),                            # número dentro de texto
+    ("19.43.26", "-99.13.32"),                                  # varios puntos
+    ("abc12", "x-99"),                                          # número suelto en texto
+    ("95.5", "-99.1"),                                          # latitud fuera de rango
+    ("19.4", "-200.5"),                                         # longitud fuera de rango
+    ("0", "0"),
+    ("90", "180"),
+    ("-90.0000001", "180.0000001"),
+]
+
+def _iguales(esperado, obtenido):
+    esperado = np.nan if esperado is None else esperado
+    return (np.isnan(esperado) and np.isnan(obtenido)) or esperado == obtenido
+
+@pytest.fixture(scope="module")
+def crudo():
+    """LATITUD y LONGITUD de inventario.csv como texto, sin interpretar"""
+    df = pd.read_csv(RUTA_INVENTARIO, dtype=str, keep_default_na=False)
+    df.columns = df.columns.str.strip()
+    return df["LATITUD"].tolist(), df["LONGITUD"].tolist()
+
+def test_inventario_igual_que_escalar(crudo):
+    latitudes, longitudes = crudo
+    assert comparar_con_escalar(latitudes, longitudes) == []
+
+def test_inventario_mismo_formato_e_inversion(crudo):
+    latitudes, longitudes = crudo
+    vectorizado = normalizar_coordenadas(latitudes, longitudes)
+    for i, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+        invertidas, formato_lat, formato_lon, _ = detectar_inversion_universal(lat, lon)
+        assert vectorizado["FORMATO_LAT"].iat[i] == formato_lat, (i, lat)
+        assert vectorizado["FORMATO_LON"].iat[i] == formato_lon, (i, lon)
+        assert bool(vectorizado["INVERTIDA"].iat[i]) == invertidas, (i, lat, lon)
+
+@pytest.mark.parametrize("lat, lon", CASOS)
+def test_casos_limite_igual_que_escalar(lat, lon):
+    # Cada caso solo y también rodeado de filas decimales (la ruta rápida de la columna)
+    for latitudes, longitudes in [([lat], [lon]), (["19.1", lat, "20.2"] * 3, ["-99.1", lon, "-98.2"] * 3)]:
+        vectorizado = normalizar_coordenadas(latitudes, longitudes)
+        for i, (la, lo) in enumerate(zip(latitudes, longitudes)):
+            esperado = normalizar_fila_coordenadas(la, lo)
+            obtenido = (vectorizado["LATITUD_DECIMAL"].iat[i], vectorizado["LONGITUD_DECIMAL"].iat[i])
+            assert _iguales(esperado[0], obtenido[0]) and _iguales(esperado[1], obtenido[1]), (la, lo, esperado, obtenido)
+            assert vectorizado["FORMATO_LAT"].iat[i] == analizar_formato_coordenada(la)[0]
+            assert vectorizado["FORMATO_LON"].iat[i] == analizar_formato_coordenada(lo)[0]
+            assert bool(vectorizado["INVERTIDA"].iat[i]) == detectar_inversion_universal(la, lo)[0]
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+from distancias import (TOLERANCIA_RELATIVA, calcular_distancias, filtrar_por_radio, filtrar_por_radio_multiple,
+                        medir_error_relativo)
+
+RADIOS_KM = [0.5, 2.0, 5.0, 15.0, 50.0]
+
+@pytest.fixture(scope="module")
+def coordenadas(inventario):
+    validas = inventario["COORDENADA_VALIDA"].to_numpy(dtype=bool)
+    return (inventario["LATITUD_DECIMAL"].to_numpy(dtype=float)[validas],
+            inventario["LONGITUD_DECIMAL"].to_numpy(dtype=float)[validas])
+
+@pytest.fixture(scope="module")
+def origenes(coordenadas):
+    """Cuatro caras del inventario con muchas vecinas (centros de ciudad) como lugares"""
+    latitudes, longitudes = coordenadas
+    vecinas = np.array([
+        (calcular_distancias(lat, lon, latitudes, longitudes) < 5).sum()
+        for lat, lon in zip(latitudes[::25], longitudes[::25])
+    ])
+    elegidas = np.argsort(-vecinas, kind="stable")[::len(vecinas) // 4][:4] * 25
+    return [(latitudes[i], longitudes[i]) for i in elegidas]
+
+@pytest.fixture(scope="module")
+def exactas(coordenadas, origenes):
+    """geodesic de cada lugar a las caras a menos de 60 km (las demás quedan en inf)"""
+    latitudes, longitudes = coordenadas
+    resultado = []
+    for lat, lon in origenes:
+        distancias = np.full(len(latitudes), np.inf)
+        for j in np.flatnonzero(calcular_distancias(lat, lon, latitudes, longitudes) < 60):
+            distancias[j] = geodesic((lat, lon), (latitudes[j], longitudes[j])).km
+        resultado.append(distancias)
+    return resultado
+
+@pytest.mark.parametrize("modo", list(TOLERANCIA_RELATIVA))
+def test_error_relativo_dentro_de_la_tolerancia(modo, coordenadas, origenes, exactas):
+    latitudes, longitudes = coordenadas
+    for (lat, lon), distancias in zip(origenes, exactas):
+        cerca = np.isfinite(distancias) & (distancias > 0)
+        aproximadas = calcular_distancias(lat, lon, latitudes[cerca], longitudes[cerca], modo)
+        assert np.max(np.abs(aproximadas - distancias[cerca]) / distancias[cerca]) < TOLERANCIA_RELATIVA[modo]
+
+def test_medir_error_relativo_dentro_de_la_tolerancia():
+    # Pares aleatorios de todo México hasta 50 km (el máximo del slider)
+    errores = medir_error_relativo()
+    for modo, tolerancia in TOLERANCIA_RELATIVA.items():
+        assert errores[modo] < tolerancia, modo
+
+@pytest.mark.parametrize("modo", list(TOLERANCIA_RELATIVA))
+@pytest.mark.parametrize("radio_km", RADIOS_KM)
+def test_misma_pertenencia_y_distancia_que_geodesic(modo, radio_km, coordenadas, origenes, exactas):
+    latitudes, longitudes = coordenadas
+    for (lat, lon), distancias in zip(origenes, exactas):
+        posiciones, calculadas = filtrar_por_radio(lat, lon, latitudes, longitudes, radio_km, modo)
+        np.testing.assert_array_equal(posiciones, np.flatnonzero(distancias < radio_km))
+        # DISTANCIA_KM se muestra con 2 decimales
+        assert [round(float(d), 2) for d in calculadas] == [round(float(d), 2) for d in distancias[posiciones]]
+
+def test_multiple_igual_a_uno_por_uno(coordenadas, origenes):
+    latitudes, longitudes = coordenadas
+    dentro, distancias = filtrar_por_radio_multiple(
+        [lat for lat, _ in origenes], [lon for _, lon in origenes], latitudes, longitudes, 5.0
+    )
+    for i, (lat, lon) in enumerate(origenes):
+        posiciones, calculadas = filtrar_por_radio(lat, lon, latitudes, longitudes, 5.0)
+        np.testing.assert_array_equal(np.flatnonzero(dentro[i]), posiciones)
+        np.testing.assert_array_equal(distancias[i, posiciones], calculadas)
+
+def test_solo_revisa_con_geodesic_cerca_del_borde_o_del_redondeo(coordenadas, origenes, monkeypatch):
+    import distancias as modulo
+    llamadas = []
+    original = modulo.geodesic
+
+    def contar(*args):
+        llamadas.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(modulo, "geodesic", contar)
+    latitudes, longitudes = coordenadas
+    lat, lon = origenes[0]
+    posiciones, _ = filtrar_por_radio(lat, lon, latitudes, longitudes, 15.0)
+    assert len(posiciones) > 50
+    assert len(llamadas) < len(posiciones) / 10
+
+@pytest.mark.parametrize("modo", list(TOLERANCIA_RELATIVA))
+def test_coordenada_faltante_queda_fuera(modo):
+    latitudes = np.array([np.nan, 19.43, 19.4326])
+    longitudes = np.array([np.nan, np.nan, -99.1332])
+    assert np.isnan(calcular_distancias(19.4326, -99.1332, latitudes, longitudes, modo)[:2]).all()
+    posiciones, distancias = filtrar_por_radio(19.4326, -99.1332, latitudes, longitudes, 5.0, modo)
+    np.testing.assert_array_equal(posiciones, [2])
+    assert distancias[0] == 0
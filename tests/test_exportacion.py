@@ -0,0 +1,31 @@
+import io
+
+import openpyxl
+import pandas as pd
+
+from exportacion import escribir_excel
+
+def _abrir(df):
+    destino = io.BytesIO()
+    escribir_excel(df, destino)
+    destino.seek(0)
+    return openpyxl.load_workbook(destino)["Lugares cercanos"]
+
+def test_sin_columnas_hoja_vacia_sin_tabla():
+    for df in [pd.DataFrame(), pd.DataFrame(index=range(3))]:
+        hoja = _abrir(df)
+        assert hoja.max_row == 1 and hoja["A1"].value is None
+        assert not hoja.tables
+
+def test_sin_filas_conserva_encabezado_y_tabla():
+    hoja = _abrir(pd.DataFrame(columns=["CLAVE", "TARIFA_PUBLICO"]))
+    assert [celda.value for celda in hoja[1]] == ["CLAVE", "TARIFA_PUBLICO"]
+    assert hoja.tables["TablaEspectaculares"].ref == "A1:B2"
+
+def test_valores_y_tarifa_como_numero():
+    hoja = _abrir(pd.DataFrame({"CLAVE": ["A-1", "B<2>"], "DISTANCIA_KM": [1.25, 3.0],
+                                "TARIFA_PUBLICO": ["$16,537.50", "$1,000.00"]}))
+    assert [[celda.value for celda in fila] for fila in hoja.iter_rows(min_row=2)] == [
+        ["A-1", 1.25, 16537.5], ["B<2>", 3.0, 1000.0]
+    ]
+    assert hoja.tables["TablaEspectaculares"].ref == "A1:C3"
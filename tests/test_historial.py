@@ -0,0 +1,70 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from historial import aportes_union, crear_entrada, crear_historial, registrar_consulta, reemplazar_consulta
+
+def _resultados(generador):
+    """Resultados de una consulta: CLAVE (con repetidas) y un valor por fila"""
+    cuantos = int(generador.integers(0, 12))
+    return pd.DataFrame({
+        "CLAVE": [f"C{numero}" for numero in generador.integers(0, 30, cuantos)],
+        "VALOR": generador.random(cuantos),
+    })
+
+def _entrada(df):
+    n = len(df)
+    return crear_entrada({}, df["CLAVE"], np.arange(n), np.zeros(n), np.zeros(n), ["Principal"] * n)
+
+def _como_antes(consultas, actual, seleccionadas):
+    """La presentación combinada del baseline: seleccionadas + cada consulta anterior, sin CLAVE repetidas"""
+    partes = [seleccionadas] + [df for huella, df in consultas.items() if huella != actual]
+    return pd.concat(partes, ignore_index=True).drop_duplicates(subset=["CLAVE"]).reset_index(drop=True)
+
+def _con_union(historial, resultados, actual, seleccionadas):
+    partes = [seleccionadas]
+    for entrada, filas in aportes_union(historial, actual, seleccionadas["CLAVE"]):
+        partes.append(resultados[id(entrada)].iloc[filas])
+    return pd.concat(partes, ignore_index=True).drop_duplicates(subset=["CLAVE"]).reset_index(drop=True)
+
+def test_lru_saca_la_usada_hace_mas_tiempo():
+    historial = crear_historial(maximo=3)
+    for huella in ["a", "b", "c"]:
+        registrar_consulta(historial, huella, _entrada(pd.DataFrame({"CLAVE": [huella]})))
+    registrar_consulta(historial, "a", _entrada(pd.DataFrame({"CLAVE": ["a"]})))
+    registrar_consulta(historial, "d", _entrada(pd.DataFrame({"CLAVE": ["d"]})))
+    assert list(historial["consultas"]) == ["c", "a", "d"]
+    reemplazar_consulta(historial, "a", "e", _entrada(pd.DataFrame({"CLAVE": ["e", "c"]})))
+    assert list(historial["consultas"]) == ["c", "d", "e"]
+    assert historial["union"] == {"c": ["c", "e"], "d": ["d"], "e": ["e"]}
+
+def test_union_igual_que_concatenar_el_historial():
+    generador = np.random.default_rng(0)
+    historial = crear_historial(maximo=4)
+    consultas = OrderedDict()
+    resultados = {}
+    actual = None
+    for paso in range(150):
+        df = _resultados(generador)
+        entrada = _entrada(df)
+        resultados[id(entrada)] = df
+        huella = f"h{int(generador.integers(0, 8))}"
+        if actual is not None and generador.random() < 0.3:
+            # Mismos lugares con otros filtros: reemplaza la consulta actual
+            reemplazar_consulta(historial, actual, huella, entrada)
+            if actual != huella:
+                consultas.pop(actual, None)
+        else:
+            registrar_consulta(historial, huella, entrada)
+        consultas.pop(huella, None)
+        consultas[huella] = df
+        while len(consultas) > 4:
+            consultas.popitem(last=False)
+        actual = huella
+        assert list(historial["consultas"]) == list(consultas)
+
+        seleccionadas = _resultados(generador).drop_duplicates(subset=["CLAVE"])
+        for excluir in [actual, None]:
+            pd.testing.assert_frame_equal(_con_union(historial, resultados, excluir, seleccionadas),
+                                          _como_antes(consultas, excluir, seleccionadas), check_dtype=False)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from distancias import filtrar_por_radio
+from indice_espacial import TAMANO_CELDA_GRADOS, construir_indice_espacial, consultar_indice
+
+def _revisar(indice, latitudes, longitudes, centros, radios):
+    for (lat, lon), radio_km in zip(centros, radios):
+        esperadas, _ = filtrar_por_radio(lat, lon, latitudes, longitudes, radio_km, exacto=False)
+        encontradas = consultar_indice(indice, lat, lon, radio_km)
+        assert np.all(np.isin(esperadas, encontradas)), (lat, lon, radio_km)
+
+def test_consulta_contiene_al_recorrido_completo(inventario, indice):
+    validas = inventario["COORDENADA_VALIDA"].to_numpy(dtype=bool)
+    latitudes = np.where(validas, inventario["LATITUD_DECIMAL"].to_numpy(dtype=float), np.nan)
+    longitudes = np.where(validas, inventario["LONGITUD_DECIMAL"].to_numpy(dtype=float), np.nan)
+    generador = np.random.default_rng(0)
+    elegidas = generador.choice(np.flatnonzero(validas), 60, replace=False)
+    # Centros sobre caras, movidos al azar y pegados a la orilla o la esquina de su celda
+    centros = list(zip(latitudes[elegidas], longitudes[elegidas]))
+    centros += [(lat + generador.uniform(-0.3, 0.3), lon + generador.uniform(-0.3, 0.3)) for lat, lon in centros[:20]]
+    centros += [(np.floor(lat / TAMANO_CELDA_GRADOS) * TAMANO_CELDA_GRADOS, lon) for lat, lon in centros[:20]]
+    centros += [(np.ceil(lat / TAMANO_CELDA_GRADOS) * TAMANO_CELDA_GRADOS - 1e-9,
+                 np.floor(lon / TAMANO_CELDA_GRADOS) * TAMANO_CELDA_GRADOS) for lat, lon in centros[:20]]
+    radios = generador.uniform(0.5, 50.0, len(centros))
+    _revisar(indice, latitudes, longitudes, centros, radios)
+
+def test_consulta_en_la_orilla_de_la_rejilla():
+    # Puntos junto al antimeridiano y los polos, donde la rejilla se corta o se junta
+    generador = np.random.default_rng(1)
+    latitudes = np.concatenate([generador.uniform(-89.99, 89.99, 2000), generador.uniform(89.5, 90.0, 200),
+                                generador.uniform(-90.0, -89.5, 200), generador.uniform(-60, 60, 400)])
+    longitudes = np.concatenate([generador.uniform(-180, 180, 2400),
+                                 np.where(generador.random(400) < 0.5, generador.uniform(179.5, 180, 400),
+                                          generador.uniform(-180, -179.5, 400))])
+    indice = construir_indice_espacial(latitudes, longitudes)
+    centros = [(0.0, 180.0), (0.0, -180.0), (10.0, 179.95), (-10.0, -179.95), (89.9, 0.0), (-89.9, 45.0),
+               (90.0, 0.0), (-90.0, 0.0), (45.0, 179.99999)]
+    for radio_km in [0.5, 5.0, 50.0]:
+        _revisar(indice, latitudes, longitudes, centros, [radio_km] * len(centros))
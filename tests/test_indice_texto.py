@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from indice_texto import PUNTOS_DIFUSA, PUNTOS_EXACTA, PUNTOS_PREFIJO, buscar_texto, construir_indice_texto
+
+@pytest.fixture(scope="module")
+def indice_texto(inventario):
+    return construir_indice_texto(inventario)
+
+def _claves(inventario, posiciones):
+    return set(inventario["CLAVE"].iloc[posiciones].astype(str))
+
+def _filas(indice_texto, consulta):
+    return set(buscar_texto(indice_texto, consulta)[0].tolist())
+
+def test_acentos_y_mayusculas_no_importan(indice_texto):
+    esperadas = _filas(indice_texto, "LAZARO CARDENAS")
+    assert len(esperadas) > 10
+    for consulta in ["lázaro cárdenas", "Lázaro  Cárdenas", "CÁRDENAS lazaro"]:
+        assert _filas(indice_texto, consulta) == esperadas
+
+def test_prefijo(inventario, indice_texto):
+    posiciones, puntos = buscar_texto(indice_texto, "lazar")
+    assert _filas(indice_texto, "lazaro") <= set(posiciones.tolist())
+    assert np.all(puntos == PUNTOS_PREFIJO)
+    posiciones, puntos = buscar_texto(indice_texto, "durango")
+    assert {"15507", "15510", "15511"} <= _claves(inventario, posiciones)
+    assert np.all(puntos == PUNTOS_EXACTA)
+
+@pytest.mark.parametrize("consulta", ["cardenqs", "crdenas", "carrdenas", "cadrenas"])
+def test_una_letra_de_diferencia(indice_texto, consulta):
+    # Cambia, falta, sobra o se voltean dos letras de CARDENAS (CARDENAZ, también en el inventario, queda a dos)
+    posiciones, puntos = buscar_texto(indice_texto, consulta)
+    assert set(posiciones.tolist()) == _filas(indice_texto, "cardenas")
+    assert np.all(puntos == PUNTOS_DIFUSA)
+
+def test_dos_letras_de_diferencia_no_coinciden(indice_texto):
+    assert len(buscar_texto(indice_texto, "cadrenqs")[0]) == 0
+
+def test_clave_exacta(inventario, indice_texto):
+    posiciones, puntos = buscar_texto(indice_texto, "15507")
+    assert _claves(inventario, posiciones[:1]) == {"15507"} and puntos[0] == PUNTOS_EXACTA
+    # Con separadores, completa sin ellos o por partes
+    for consulta in ["0103-1", "01031"]:
+        posiciones, _ = buscar_texto(indice_texto, consulta)
+        assert _claves(inventario, posiciones) == {"0103-1"}
+    # Una letra de diferencia en una clave ya es otra clave
+    assert "15507" not in _claves(inventario, buscar_texto(indice_texto, "15508")[0])
+
+def test_candidatos_limitan_el_resultado(inventario, indice_texto):
+    candidatos = inventario["CIUDAD"].astype(str).str.contains("DURANGO", na=False).to_numpy()
+    posiciones, _ = buscar_texto(indice_texto, "lazaro cardenas", candidatos)
+    assert len(posiciones) and candidatos[posiciones].all()
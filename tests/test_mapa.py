@@ -0,0 +1,26 @@
+import re
+
+import pandas as pd
+import pytest
+
+from mapa import UMBRAL_MAPA_COMPACTO, construir_mapa
+
+CERRAR = "</script><script>alert(1)</script>"
+
+def _mapa(modo, filas, agregado):
+    df = pd.DataFrame({
+        "LATITUD": [19.43] * filas, "LONGITUD": [-99.13] * filas, "DISTANCIA_KM": [1.0] * filas,
+        "CLAVE": [f"C{i}{agregado}" for i in range(filas)], "TARIFA_PUBLICO": [f"$1{agregado}"] * filas,
+        "TIPO": [f"UNIPOLAR{agregado}"] * filas, "DIRECCION": [f"CALLE{agregado}"] * filas,
+        "LUGAR_BUSQUEDA": [f"Lugar{agregado}"] * filas, "MAPS_": ["https://maps"] * filas,
+        "STREET_VIEW": ["https://street"] * filas,
+    })
+    return construir_mapa(df, [{"nombre": f"Lugar{agregado}", "lat": 19.43, "lon": -99.13}], 5.0, modo)
+
+@pytest.mark.parametrize("modo, filas", [("detallado", 3), ("compacto", UMBRAL_MAPA_COMPACTO)])
+def test_campos_con_script_no_cortan_la_pagina(modo, filas):
+    html, agregados, fallados = _mapa(modo, filas, CERRAR)
+    assert (agregados, fallados) == (filas, 0)
+    # Los únicos </script> son los de folium: los mismos que con datos sin etiquetas
+    cierres = len(re.findall(r"</script", html, re.IGNORECASE))
+    assert cierres == len(re.findall(r"</script", _mapa(modo, filas, "")[0], re.IGNORECASE))
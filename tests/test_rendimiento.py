@@ -0,0 +1,26 @@
+import gc
+import tracemalloc
+
+from rendimiento import cambiar_memoria, crear_medidor, etapa
+
+def _medir(medidor):
+    with etapa(medidor, "prueba", 1) as medicion:
+        medicion["filas_salida"] = len([0] * 1000)
+
+def test_tracemalloc_sigue_mientras_algun_medidor_mide_memoria():
+    primero, segundo = crear_medidor(activo=True, memoria=True), crear_medidor(activo=True, memoria=True)
+    _medir(primero)
+    assert tracemalloc.is_tracing() and primero["registros"][-1]["pico_mb"] is not None
+    cambiar_memoria(primero, False)
+    assert tracemalloc.is_tracing()
+    cambiar_memoria(segundo, False)
+    assert not tracemalloc.is_tracing()
+
+def test_medidor_descartado_suelta_tracemalloc():
+    # Una sesión que se cierra con la memoria prendida nunca llama a cambiar_memoria
+    medidor = crear_medidor(activo=True, memoria=True)
+    _medir(medidor)
+    assert tracemalloc.is_tracing()
+    del medidor
+    gc.collect()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,40 @@
+import pandas as pd
+
+# ================================
+# Normalización de texto
+# ================================
+
+# Direcciones, ciudades y claves se comparan sin acentos, en mayúsculas y con las
+# abreviaturas más comunes de los proveedores escritas completas.
+ABREVIATURAS = {
+    "AV": "AVENIDA", "AVE": "AVENIDA", "AVDA": "AVENIDA",
+    "BLVD": "BOULEVARD", "BLV": "BOULEVARD", "BOUL": "BOULEVARD", "BULEVAR": "BOULEVARD",
+    "CARR": "CARRETERA", "CARRET": "CARRETERA", "CTRA": "CARRETERA",
+    "CALZ": "CALZADA", "PROL": "PROLONGACION", "ESQ": "ESQUINA", "COL": "COLONIA",
+    "FRACC": "FRACCIONAMIENTO", "PERIF": "PERIFERICO", "AUT": "AUTOPISTA", "LIB": "LIBRAMIENTO",
+    "GRAL": "GENERAL", "LIC": "LICENCIADO", "STA": "SANTA", "STO": "SANTO",
+    "NO": "NUMERO", "NUM": "NUMERO", "KM": "KILOMETRO",
+}
+# Palabras que no ayudan a distinguir una dirección de otra
+PALABRAS_VACIAS = {"DE", "DEL", "LA", "LAS", "EL", "LOS", "Y", "E", "A", "EN", "CON", "SN", "S", "N"}
+
+def normalizar_texto(serie):
+    """Serie en mayúsculas, sin acentos y con solo letras, números y espacios sencillos"""
+    texto = pd.Series(serie, dtype=object).fillna("").astype(str)
+    # Solo los valores con acentos u otros caracteres no ASCII pasan por la descomposición Unicode
+    acentos = ~texto.str.isascii().to_numpy(dtype=bool)
+    if acentos.any():
+        texto = texto.copy()
+        texto[acentos] = texto[acentos].str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    texto = texto.str.upper()
+    return texto.str.replace(r"[^A-Z0-9]+", " ", regex=True).str.strip()
+
+def tokens(texto_normalizado):
+    """Palabras de un texto ya normalizado, con las abreviaturas expandidas y sin palabras vacías"""
+    return [ABREVIATURAS.get(palabra, palabra) for palabra in texto_normalizado.split() if palabra not in PALABRAS_VACIAS]
+
+def similitud_tokens(a, b):
+    """Jaccard entre dos conjuntos de palabras (0 si alguno está vacío)"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)